@@ -0,0 +1,124 @@
+"""
+Authentication dependencies with cached token verification
+
+Decoded access tokens are kept in a small in-process LRU until they expire,
+and user records go through the read-through cache, so an authenticated
+request normally costs two dictionary lookups instead of a JWT decode plus a
+SELECT on users. Deactivating a user invalidates its cache entry.
+"""
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from collections import OrderedDict
+from typing import Optional, Tuple
+import time
+
+from app.core.cache import ReadThroughCache
+from app.core.config import settings
+from app.core.database import User, new_session
+from app.core.metrics import registry
+from app.schemas.auth import UserResponse
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/app/endpoints/auth/login", auto_error=False)
+
+token_cache_requests = registry.counter(
+    "auth_token_cache_requests_total", "Access token verifications by result (hit, miss, invalid)"
+)
+
+# token -> (cache expiry, username)
+_token_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+# Active user records by username
+user_cache: ReadThroughCache[UserResponse] = ReadThroughCache(
+    "auth_user",
+    dumps=lambda value: value.model_dump_json(),
+    loads=UserResponse.model_validate_json,
+    ttl=settings.AUTH_USER_CACHE_TTL
+)
+
+CREDENTIALS_EXCEPTION = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def encode_token(claims: dict) -> str:
+    """Sign claims as a JWT with the configured key"""
+    from jose import jwt
+    
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def decode_token(token: str, token_type: str = "access") -> Optional[dict]:
+    """Decode and validate a JWT of the given type; None if invalid or expired"""
+    from jose import JWTError, jwt
+    
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    # Tokens issued before refresh tokens existed carry no type and count as access tokens
+    if payload.get("type", "access") != token_type or not payload.get("sub"):
+        return None
+    return payload
+
+
+def verify_access_token(token: str) -> Optional[str]:
+    """Username of a valid access token, served from the token cache when possible"""
+    now = time.time()
+    cached = _token_cache.get(token)
+    if cached and cached[0] > now:
+        _token_cache.move_to_end(token)
+        token_cache_requests.inc(result="hit")
+        return cached[1]
+
+    payload = decode_token(token)
+    if payload is None:
+        token_cache_requests.inc(result="invalid")
+        return None
+    token_cache_requests.inc(result="miss")
+
+    # 缓存时间不超过令牌自身的过期时间
+    expires_at = min(now + settings.AUTH_TOKEN_CACHE_TTL, float(payload.get("exp", now)))
+    _token_cache[token] = (expires_at, payload["sub"])
+    if len(_token_cache) > settings.AUTH_TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+    return payload["sub"]
+
+
+async def load_active_user(username: str) -> Optional[UserResponse]:
+    """Active user record by username, through the user cache"""
+    async def load() -> Optional[UserResponse]:
+        async with new_session() as db:
+            result = await db.execute(select(User).where(User.username == username))
+            user = result.scalar_one_or_none()
+        if not user or not user.is_active:
+            return None
+        return UserResponse.model_validate(user)
+
+    return await user_cache.get_or_load(username, load)
+
+
+async def get_optional_user(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[UserResponse]:
+    """Current user if a valid bearer token was sent, otherwise None"""
+    if not token:
+        return None
+    username = verify_access_token(token)
+    if username is None:
+        return None
+    return await load_active_user(username)
+
+
+async def get_current_user(token: Optional[str] = Depends(oauth2_scheme)) -> UserResponse:
+    """Current user; 401 without a valid token for an active account"""
+    if not token:
+        raise CREDENTIALS_EXCEPTION
+    username = verify_access_token(token)
+    if username is None:
+        raise CREDENTIALS_EXCEPTION
+    user = await load_active_user(username)
+    if user is None:
+        raise CREDENTIALS_EXCEPTION
+    return user
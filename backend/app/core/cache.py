@@ -0,0 +1,217 @@
+"""
+Two-tier read-through cache: in-process LRU plus optional Redis
+
+Keys are versioned per entity ("<namespace>:<key>:v<version>"). Invalidation
+bumps the version instead of hunting down copies, so stale entries in any
+tier (or in another worker's LRU, when the version lives in Redis) are
+simply never read again and age out. Each worker reuses a version it read
+from Redis for CACHE_VERSION_TTL seconds, so local hits cost no round trip
+and an invalidation from another process is seen within that window.
+Concurrent misses for the same key share one loader call (singleflight), so
+an expired hot listing does not stampede the database.
+
+Without Redis the version only exists in the current process: invalidations
+from other workers or from CLI jobs cannot reach it. The production launcher
+therefore disables the in-process tier when it runs several workers without
+CACHE_REDIS_ENABLED.
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+cache_requests = registry.counter(
+    "cache_requests_total", "Read-through cache lookups by cache and result (hit_local, hit_redis, miss)"
+)
+cache_invalidations = registry.counter(
+    "cache_invalidations_total", "Cache invalidations by cache"
+)
+cache_entries = registry.gauge(
+    "cache_local_entries", "Entries held in the in-process cache tier"
+)
+
+_redis = None
+_redis_unavailable = False
+
+
+def get_redis():
+    """Shared async Redis client, or None when the Redis tier is disabled or unavailable"""
+    if not settings.CACHE_REDIS_ENABLED:
+        return None
+    return redis_client()
+
+
+def redis_client():
+    """Shared async Redis client regardless of the cache setting, or None if the package is missing"""
+    global _redis, _redis_unavailable
+    if _redis_unavailable:
+        return None
+    if _redis is None:
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            logger.warning("Redis is enabled but the redis package is not installed")
+            _redis_unavailable = True
+            return None
+        _redis = redis_asyncio.from_url(settings.REDIS_URL, socket_timeout=settings.CACHE_REDIS_TIMEOUT)
+    return _redis
+
+
+class ReadThroughCache(Generic[T]):
+    """Cache for one kind of value, e.g. property responses by id"""
+
+    def __init__(
+        self,
+        namespace: str,
+        dumps: Callable[[T], str],
+        loads: Callable[[str], T],
+        ttl: int = settings.CACHE_TTL,
+        max_size: int = settings.CACHE_LOCAL_SIZE
+    ):
+        self.namespace = namespace
+        self.dumps = dumps
+        self.loads = loads
+        self.ttl = ttl
+        self.max_size = max_size
+        self._local: "OrderedDict[str, Tuple[float, T]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._version_checked: Dict[str, float] = {}  # when each version was last read from Redis
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _version_key(self, key: Any) -> str:
+        return f"cache:{self.namespace}:version:{key}"
+
+    async def _version(self, key: Any) -> int:
+        redis = get_redis()
+        version_key = str(key)
+        now = time.monotonic()
+        if redis is not None and self._version_checked.get(version_key, 0.0) + settings.CACHE_VERSION_TTL <= now:
+            try:
+                value = await redis.get(self._version_key(key))
+                self._versions[version_key] = int(value or 0)
+                self._version_checked[version_key] = now
+                if len(self._version_checked) > max(self.max_size, 1024) * 4:
+                    # 只是重新读取的时间点，整体丢掉也无妨
+                    self._version_checked.clear()
+            except Exception as e:
+                logger.warning("Redis cache version lookup failed: %s", e)
+        return self._versions.get(version_key, 0)
+
+    def _get_local(self, full_key: str) -> Optional[T]:
+        entry = self._local.get(full_key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._local[full_key]
+            return None
+        self._local.move_to_end(full_key)
+        return value
+
+    def _set_local(self, full_key: str, value: T):
+        self._local[full_key] = (time.monotonic() + self.ttl, value)
+        self._local.move_to_end(full_key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+        cache_entries.set(len(self._local), cache=self.namespace)
+
+    async def get_or_load(self, key: Any, loader: Callable[[], Awaitable[Optional[T]]]) -> Optional[T]:
+        """Return the cached value for key, calling loader once on a miss
+
+        None results (e.g. unknown ids) are not cached.
+        """
+        full_key = f"{self.namespace}:{key}:v{await self._version(key)}"
+
+        while True:
+            value = self._get_local(full_key)
+            if value is not None:
+                cache_requests.inc(cache=self.namespace, result="hit_local")
+                return value
+
+            inflight = self._inflight.get(full_key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    # This request itself was cancelled
+                    raise
+                # 加载的请求被取消（客户端断开等），由等待者之一重新加载
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            value = await self._load(full_key, loader)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[full_key]
+
+    async def _load(self, full_key: str, loader: Callable[[], Awaitable[Optional[T]]]) -> Optional[T]:
+        redis = get_redis()
+        if redis is not None:
+            try:
+                payload = await redis.get(f"cache:{full_key}")
+                if payload is not None:
+                    value = self.loads(payload)
+                    self._set_local(full_key, value)
+                    cache_requests.inc(cache=self.namespace, result="hit_redis")
+                    return value
+            except Exception as e:
+                logger.warning("Redis cache read failed: %s", e)
+
+        cache_requests.inc(cache=self.namespace, result="miss")
+        value = await loader()
+        if value is None:
+            return None
+
+        self._set_local(full_key, value)
+        if redis is not None:
+            try:
+                await redis.set(f"cache:{full_key}", self.dumps(value), ex=self.ttl)
+            except Exception as e:
+                logger.warning("Redis cache write failed: %s", e)
+        return value
+
+    async def invalidate(self, key: Any):
+        """Make every cached copy of key stale, in all tiers and workers"""
+        cache_invalidations.inc(cache=self.namespace)
+        self._versions[str(key)] = self._versions.get(str(key), 0) + 1
+        prefix = f"{self.namespace}:{key}:v"
+        for full_key in [k for k in self._local if k.startswith(prefix)]:
+            del self._local[full_key]
+        cache_entries.set(len(self._local), cache=self.namespace)
+
+        redis = get_redis()
+        if redis is not None:
+            try:
+                version = await redis.incr(self._version_key(key))
+                # 本地版本号与 Redis 保持一致，Redis 不可用时也不会回退到旧版本
+                self._versions[str(key)] = max(self._versions[str(key)], version)
+                self._version_checked[str(key)] = time.monotonic()
+            except Exception as e:
+                logger.warning("Redis cache invalidation failed: %s", e)
+
+    def clear(self):
+        """Drop the in-process tier (tests and admin tooling)"""
+        self._local.clear()
+        cache_entries.set(0, cache=self.namespace)
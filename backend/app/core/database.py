@@ -2,27 +2,156 @@
 Database configuration and models
 """
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, Index, JSON, event, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy.sql import func
+from typing import Optional
+import asyncio
+import time
+
 from app.core.config import settings
+from app.core.metrics import registry
+from app.core.profiling import install_query_timing
+from app.core.tracing import install_query_tracing
 
-# Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,
-    pool_recycle=300
-)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
 
-# Create async session factory
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time to get a connection from the pool, including opening a new one",
+    buckets=POOL_WAIT_BUCKETS
+)
+db_pool_hold = registry.histogram(
+    "db_pool_connection_hold_seconds", "How long connections stay checked out of the pool"
+)
+db_pool_checked_out = registry.gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool"
+)
+db_pool_size = registry.gauge(
+    "db_pool_size", "Configured pool size (DB_POOL_SIZE)"
 )
+db_pool_overflow = registry.gauge(
+    "db_pool_overflow", "Connections open beyond the pool size (negative while the pool is not yet full)"
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waits"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start)
+
+
+def install_pool_metrics(sync_engine):
+    """Track checked-out connections and how long they are held"""
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        db_pool_checked_out.inc()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            db_pool_hold.observe(time.perf_counter() - checked_out_at)
+            db_pool_checked_out.dec()
+
+
+@registry.collector
+def _collect_pool_metrics():
+    if _engine is not None and isinstance(_engine.sync_engine.pool, QueuePool):
+        db_pool_size.set(_engine.sync_engine.pool.size())
+        db_pool_overflow.set(_engine.sync_engine.pool.overflow())
+
+# Engine and session factory are created on first use (or in the app lifespan),
+# so importing the models does not load the database driver.
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_engine() -> AsyncEngine:
+    """Get the async engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        engine_options = {
+            "echo": settings.DEBUG,
+            "pool_pre_ping": True,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+        }
+        if not is_sqlite():
+            engine_options.update(
+                poolclass=InstrumentedQueuePool,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+            )
+        _engine = create_async_engine(settings.DATABASE_URL, **engine_options)
+        install_query_timing(_engine.sync_engine)
+        install_pool_metrics(_engine.sync_engine)
+        if settings.TRACING_ENABLED:
+            install_query_tracing(_engine.sync_engine)
+    return _engine
+
+
+def get_session_factory() -> async_sessionmaker:
+    """Get the session factory bound to the engine"""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(
+            get_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False
+        )
+    return _session_factory
+
+
+def new_session() -> AsyncSession:
+    """Create a new database session"""
+    return get_session_factory()()
+
+
+def is_sqlite() -> bool:
+    """Whether the configured database is SQLite (local development and tests)"""
+    return settings.DATABASE_URL.startswith("sqlite")
+
+
+async def init_db():
+    """Create the engine and open DB_POOL_WARMUP pooled connections up front"""
+    engine = get_engine()
+    if is_sqlite():
+        # SQLite has no init.sql, so create the schema and search index here
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            for statement in SQLITE_SCHEMA_DDL:
+                await connection.execute(text(statement))
+    
+    warmup = min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+
+    async def open_connection():
+        connection = await engine.connect()
+        await connection.execute(text("SELECT 1"))
+        return connection
+
+    connections = await asyncio.gather(*(open_connection() for _ in range(max(warmup, 1))))
+    # 关闭后连接回到连接池，后续请求直接复用
+    for connection in connections:
+        await connection.close()
+
+
+async def dispose_db():
+    """Close all pooled connections"""
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _session_factory = None
 
 # Create base class for models
 Base = declarative_base()
@@ -62,6 +191,9 @@ class Property(Base):
     city = Column(String(100), nullable=False)
     plz = Column(String(20))
     country = Column(String(100), default="Germany")
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String(12), index=True)  # spatial index via prefix range scans
     
     # Property details
     price = Column(Float)
@@ -74,7 +206,9 @@ class Property(Base):
     year_built = Column(Integer)
     
     # Features
-    features = Column(Text)  # JSON string of features
+    # List of lower-case feature names, e.g. ["balkon", "aufzug"]; JSONB with a
+    # GIN (jsonb_path_ops) index on Postgres, JSON1 text on SQLite
+    features = Column(JSON().with_variant(JSONB(), "postgresql"))
     energy_class = Column(String(10))
     
     # Owner info
@@ -85,11 +219,22 @@ class Property(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on every update, used as ETag
     
     # Relationships
     owner = relationship("User", back_populates="properties")
     images = relationship("PropertyImage", back_populates="property")
     exposes = relationship("Expose", back_populates="property")
+    
+    __table_args__ = (
+        # Keyset pagination on (created_at, id)
+        Index("idx_properties_created_at_id", created_at.desc(), id.desc()),
+        # Faceted search filters (see infra/init.sql)
+        Index("idx_properties_city_type_price", city, property_type, price),
+        Index("idx_properties_plz_type_price", plz, property_type, price),
+        Index("idx_properties_type_area_rooms", property_type, area_sqm, rooms),
+        Index("idx_properties_year_built_energy", year_built, energy_class),
+    )
 
 
 class PropertyImage(Base):
@@ -129,10 +274,53 @@ class Expose(Base):
     property = relationship("Property", back_populates="exposes")
 
 
+class RefreshToken(Base):
+    """Issued refresh token; single use, revoked on rotation, logout or password change"""
+    __tablename__ = "refresh_tokens"
+    
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# SQLite-only schema objects that Postgres gets from infra/init.sql
+SQLITE_SCHEMA_DDL = [
+    # FTS5 full-text index over the searchable property columns
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+        title, description, address, city,
+        content='properties', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS properties_fts_ai AFTER INSERT ON properties BEGIN
+        INSERT INTO properties_fts(rowid, title, description, address, city)
+        VALUES (new.id, new.title, new.description, new.address, new.city);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS properties_fts_ad AFTER DELETE ON properties BEGIN
+        INSERT INTO properties_fts(properties_fts, rowid, title, description, address, city)
+        VALUES ('delete', old.id, old.title, old.description, old.address, old.city);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS properties_fts_au AFTER UPDATE ON properties BEGIN
+        INSERT INTO properties_fts(properties_fts, rowid, title, description, address, city)
+        VALUES ('delete', old.id, old.title, old.description, old.address, old.city);
+        INSERT INTO properties_fts(rowid, title, description, address, city)
+        VALUES (new.id, new.title, new.description, new.address, new.city);
+    END
+    """,
+]
+
+
 # Dependency to get database session
 async def get_db() -> AsyncSession:
     """Get database session"""
-    async with AsyncSessionLocal() as session:
+    async with new_session() as session:
         try:
             yield session
         finally:
@@ -0,0 +1,101 @@
+"""
+Geohash encoding and distance helpers
+"""
+
+from typing import List, Set, Tuple
+import math
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~5 m cells, stored on every property
+EARTH_RADIUS_KM = 6371.0088
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        # 偶数位编码经度，奇数位编码纬度
+        value, value_range = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits <<= 1
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width of a geohash cell in degrees"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def _cover_cells(min_lat: float, min_lon: float, max_lat: float, max_lon: float, precision: int, rows: int, cols: int) -> List[str]:
+    """Every geohash cell of one precision overlapping a bounding box"""
+    height, width = geohash_cell_size(precision)
+    cells: Set[str] = set()
+    for row in range(rows):
+        lat = min(min_lat + row * height, max_lat)
+        for col in range(cols):
+            lon = min(min_lon + col * width, max_lon)
+            cells.add(geohash_encode(lat, lon, precision))
+        cells.add(geohash_encode(lat, max_lon, precision))
+    for col in range(cols):
+        cells.add(geohash_encode(max_lat, min(min_lon + col * width, max_lon), precision))
+    cells.add(geohash_encode(max_lat, max_lon, precision))
+    return sorted(cells)
+
+
+def geohash_cover(min_lat: float, min_lon: float, max_lat: float, max_lon: float, max_cells: int = 16) -> List[str]:
+    """Geohash prefixes that together cover a bounding box
+
+    Uses the finest precision that needs at most max_cells prefixes, so the
+    candidate query is a handful of index range scans. Boxes too large for
+    that get every overlapping precision-1 cell (at most 32).
+    """
+    best: List[str] = []
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = geohash_cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+        if rows * cols > max_cells and best:
+            break
+        best = _cover_cells(min_lat, min_lon, max_lat, max_lon, precision, rows, cols)
+        if rows * cols > max_cells:
+            break
+    return best
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two coordinates in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) around a circle"""
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    d_lon = math.degrees(radius_km / (EARTH_RADIUS_KM * max(math.cos(math.radians(latitude)), 1e-6)))
+    return (
+        max(latitude - d_lat, -90.0),
+        max(longitude - d_lon, -180.0),
+        min(latitude + d_lat, 90.0),
+        min(longitude + d_lon, 180.0),
+    )
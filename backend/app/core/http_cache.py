@@ -0,0 +1,64 @@
+"""
+Conditional GET helpers: ETags, If-None-Match and Cache-Control
+"""
+
+from fastapi import Request, Response, status
+from typing import Any, Optional
+import hashlib
+
+from app.core.serialization import ORJSONResponse
+
+# Cache-Control policies per kind of resource
+CACHE_REVALIDATE = "no-cache"  # shared listings: cache, but always revalidate with the ETag
+CACHE_SHORT = "public, max-age=30, must-revalidate"  # image lists, change rarely
+CACHE_PRIVATE = "private, no-cache"  # per-user drafts and previews
+
+
+def strong_etag(value: str) -> str:
+    """Quote an opaque value as a strong ETag"""
+    return f'"{value}"'
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag from a hash of the response body"""
+    return strong_etag(hashlib.blake2b(body, digest_size=16).hexdigest())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check using the weak comparison RFC 9110 prescribes for it"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """Empty 304 carrying the validators the client should keep"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def conditional_json_response(
+    request: Request,
+    content: Any,
+    cache_control: str,
+    etag: Optional[str] = None
+) -> Response:
+    """JSON response with ETag and Cache-Control, or 304 if the client copy is current
+
+    Pass etag when it is known from a version counter; otherwise it is
+    derived from the encoded body.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+
+    response = ORJSONResponse(content=content)
+    etag = etag or content_etag(response.body)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
@@ -0,0 +1,61 @@
+"""
+Per-route HTTP request metrics
+
+Requests are labelled with the route's path template rather than the raw
+path, so ids in URLs do not create a series per property; requests that
+match no route share the "unmatched" label.
+"""
+
+import time
+
+from app.core.metrics import registry
+from app.core.profiling import route_template
+
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by method, route template and status code"
+)
+http_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request duration by method and route template, until the last body chunk is sent",
+    buckets=HTTP_LATENCY_BUCKETS
+)
+http_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled by this process"
+)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording request counts, durations and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        finished = None
+
+        async def send_wrapper(message):
+            nonlocal status_code, finished
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            # Background tasks run after the body is complete and are not counted
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = time.perf_counter()
+
+        method = scope["method"]
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = (finished or time.perf_counter()) - start
+            http_in_flight.dec()
+            route = route_template(scope) or "unmatched"
+            http_requests.inc(method=method, route=route, status=status_code)
+            http_duration.observe(duration, method=method, route=route)
@@ -0,0 +1,216 @@
+"""
+Shared LLM client used by the services and background jobs
+
+Every call goes through chat_completion, which records latency, time to first
+token, token usage, errors and cache hits in the metrics registry and writes
+one structured log line per call.
+"""
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+import hashlib
+import json
+import logging
+import time
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.profiling import record_time
+from app.core.tracing import end_span, start_span
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+
+llm_requests = registry.counter(
+    "llm_requests_total", "LLM calls by model, operation and outcome (success, error, cache_hit)"
+)
+llm_latency = registry.histogram(
+    "llm_request_duration_seconds", "End-to-end latency of LLM calls", buckets=LLM_LATENCY_BUCKETS
+)
+llm_ttft = registry.histogram(
+    "llm_time_to_first_token_seconds", "Time until the first streamed token arrives", buckets=LLM_LATENCY_BUCKETS
+)
+llm_tokens = registry.counter(
+    "llm_tokens_total", "Prompt and completion tokens reported by the provider"
+)
+llm_errors = registry.counter(
+    "llm_errors_total", "Failed LLM calls by model, operation and exception type"
+)
+llm_fallbacks = registry.counter(
+    "llm_fallbacks_total", "Template fallbacks used after a failed LLM call"
+)
+llm_cache = registry.counter(
+    "llm_cache_requests_total", "Response cache lookups by operation and result (hit, miss)"
+)
+
+_client: Optional["AsyncOpenAI"] = None
+_response_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+def get_llm_client() -> "AsyncOpenAI":
+    """Get the process-wide OpenAI client
+
+    Reusing one client keeps the HTTP connection pool warm instead of opening
+    a new one for every generated description. The openai package is only
+    imported here, on the first LLM call, since it dominates import time.
+    """
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+        
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            timeout=settings.OPENAI_TIMEOUT
+        )
+    return _client
+
+
+def _log_call(model: str, operation: str, outcome: str, **fields):
+    """Write one structured log line for an LLM call (fields become record attributes)"""
+    logger.info(
+        "llm_call %s %s: %s", operation, model, outcome,
+        extra={"event": "llm_call", "model": model, "operation": operation, "outcome": outcome, **fields}
+    )
+
+
+def _cache_key(model: str, system_prompt: str, user_prompt: str, max_tokens: int, temperature: float) -> str:
+    payload = json.dumps([model, system_prompt, user_prompt, max_tokens, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def record_fallback(operation: str, error: Exception):
+    """Record that a caller fell back to a template after an LLM failure"""
+    llm_fallbacks.inc(operation=operation)
+    logger.warning(
+        "llm_fallback %s: %s", operation, type(error).__name__,
+        extra={
+            "event": "llm_fallback",
+            "operation": operation,
+            "error_type": type(error).__name__,
+            "error": str(error)
+        }
+    )
+
+
+async def chat_completion(
+    system_prompt: str,
+    user_prompt: str,
+    model: str,
+    max_tokens: int = 500,
+    temperature: float = 0.7,
+    operation: str = "chat",
+    use_cache: bool = False
+) -> str:
+    """Run a single chat completion and return the stripped answer text
+
+    With use_cache the answer is served from an in-process LRU keyed on the
+    full request; only use it where a repeated identical answer is acceptable.
+    """
+    cache_key = None
+    if use_cache and settings.LLM_CACHE_SIZE > 0:
+        cache_key = _cache_key(model, system_prompt, user_prompt, max_tokens, temperature)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            _response_cache.move_to_end(cache_key)
+            llm_cache.inc(operation=operation, result="hit")
+            llm_requests.inc(model=model, operation=operation, outcome="cache_hit")
+            _log_call(model=model, operation=operation, outcome="cache_hit")
+            return cached
+        llm_cache.inc(operation=operation, result="miss")
+
+    messages = [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": user_prompt
+        }
+    ]
+    client = get_llm_client()
+    call_span = start_span(
+        f"llm {operation}", "client",
+        **{"llm.model": model, "llm.operation": operation, "llm.max_tokens": max_tokens, "llm.streaming": settings.LLM_STREAMING}
+    )
+    start = time.perf_counter()
+    ttft = None
+    prompt_tokens = completion_tokens = None
+    try:
+        if settings.LLM_STREAMING:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                extra_body={"stream_options": {"include_usage": True}}
+            )
+            parts = []
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    parts.append(chunk.choices[0].delta.content)
+                usage = getattr(chunk, "usage", None)
+                if usage:
+                    prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+            content = "".join(parts)
+        else:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+            content = response.choices[0].message.content
+            if response.usage:
+                prompt_tokens, completion_tokens = response.usage.prompt_tokens, response.usage.completion_tokens
+    except Exception as e:
+        duration = time.perf_counter() - start
+        record_time("llm", duration)
+        llm_latency.observe(duration, model=model, operation=operation)
+        llm_requests.inc(model=model, operation=operation, outcome="error")
+        llm_errors.inc(model=model, operation=operation, error_type=type(e).__name__)
+        _log_call(
+            model=model, operation=operation, outcome="error",
+            duration_ms=round(duration * 1000, 1), error_type=type(e).__name__, error=str(e)
+        )
+        end_span(call_span, e)
+        raise
+
+    duration = time.perf_counter() - start
+    record_time("llm", duration)
+    llm_latency.observe(duration, model=model, operation=operation)
+    llm_requests.inc(model=model, operation=operation, outcome="success")
+    if ttft is not None:
+        llm_ttft.observe(ttft, model=model, operation=operation)
+    if prompt_tokens is not None:
+        llm_tokens.inc(prompt_tokens, model=model, operation=operation, kind="prompt")
+        llm_tokens.inc(completion_tokens, model=model, operation=operation, kind="completion")
+    if call_span is not None:
+        if ttft is not None:
+            call_span.set_attribute("llm.ttft_ms", round(ttft * 1000, 1))
+        if prompt_tokens is not None:
+            call_span.set_attribute("llm.prompt_tokens", prompt_tokens)
+            call_span.set_attribute("llm.completion_tokens", completion_tokens)
+        end_span(call_span)
+    _log_call(
+        model=model, operation=operation, outcome="success",
+        duration_ms=round(duration * 1000, 1),
+        ttft_ms=round(ttft * 1000, 1) if ttft is not None else None,
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+    )
+
+    content = content.strip()
+    if cache_key is not None:
+        _response_cache[cache_key] = content
+        if len(_response_cache) > settings.LLM_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+    return content
@@ -0,0 +1,174 @@
+"""
+Non-blocking structured logging with per-request ids
+
+configure_logging routes every record through a bounded queue: the calling
+code only merges the message (and only for enabled levels, so
+`logger.debug("... %s", value)` costs a level check when debug is off) and
+enqueues it; a QueueListener thread formats and writes it to stderr, as JSON
+lines by default. When the queue is full the record is dropped and counted
+in log_records_dropped_total instead of blocking the request.
+
+RequestIdMiddleware assigns each request an id (an incoming X-Request-ID
+when it looks sane, a new one otherwise), returns it in X-Request-ID and
+stamps it on every record logged while the request is handled.
+
+Structured events pass their fields via extra= (e.g.
+`logger.info("llm_call", extra={"model": model, ...})`): they become
+top-level keys of the JSON line, or key=value pairs after the message in
+the text format.
+"""
+
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import atexit
+import json
+import logging
+import queue
+import re
+import sys
+import uuid
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+
+dropped_records = registry.counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp the current request id on each record (runs in the logging thread of the caller)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get() or "-"
+        return True
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including fields passed via extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """TEXT_FORMAT followed by the fields passed via extra= as key=value pairs"""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        fields = _extra_fields(record)
+        if fields:
+            message += " " + " ".join(
+                f"{key}={json.dumps(value, ensure_ascii=False, default=str)}" for key, value in fields.items()
+            )
+        return message
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records rather than wait for space in the queue"""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records.inc()
+
+
+def log_level() -> int:
+    """LOG_LEVEL, defaulting to DEBUG in debug mode and INFO otherwise"""
+    if settings.LOG_LEVEL:
+        return logging.getLevelName(settings.LOG_LEVEL.upper())
+    return logging.DEBUG if settings.DEBUG else logging.INFO
+
+
+def configure_logging():
+    """Send all logging through the background writer (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(log_level())
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    # 进程退出时写完队列里剩余的记录
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """ASGI middleware assigning a request id and echoing it in X-Request-ID"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = None
+        for name, header in scope.get("headers", []):
+            if name == b"x-request-id":
+                value = header.decode("latin-1")
+                break
+        if value is None or not REQUEST_ID_RE.match(value):
+            value = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", value.encode())]
+            await send(message)
+
+        token = request_id.set(value)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(token)
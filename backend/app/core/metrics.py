@@ -0,0 +1,313 @@
+"""
+In-process metrics registry rendered in the Prometheus text format
+
+With several server workers each process has its own registry. When
+METRICS_MULTIPROCESS_DIR is set (python -m app.server sets it for more than
+one worker), every worker periodically writes a snapshot of its series to
+that directory and /metrics renders the snapshots of all live workers, each
+series labelled with worker="<pid>". Aggregate across workers in PromQL,
+e.g. sum without (worker) (rate(http_requests_total[5m])).
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class for a named metric with labelled series"""
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def series(self) -> List[Tuple[LabelKey, Any]]:
+        """Current (labels, value) pairs"""
+        raise NotImplementedError
+
+    def format_samples(self, series: List[Tuple[LabelKey, Any]]) -> Iterable[str]:
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[str]:
+        return self.format_samples(self.series())
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+
+    def render(self) -> str:
+        lines = self.header()
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing counter"""
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def series(self) -> List[Tuple[LabelKey, Any]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def format_samples(self, series: List[Tuple[LabelKey, Any]]) -> Iterable[str]:
+        for key, value in series:
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Cumulative bucket histogram"""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # 每个桶的计数 + sum + count
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def series(self) -> List[Tuple[LabelKey, Any]]:
+        with self._lock:
+            return [(key, list(series)) for key, series in self._series.items()]
+
+    def format_samples(self, series: List[Tuple[LabelKey, Any]]) -> Iterable[str]:
+        for key, series in series:
+            for bound, count in zip(self.buckets, series):
+                le = ("le", _format_value(bound))
+                yield f"{self.name}_bucket{_format_labels(key, le)} {int(count)}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}"
+            yield f"{self.name}_count{_format_labels(key)} {int(series[-1])}"
+
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def series(self) -> List[Tuple[LabelKey, Any]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def format_samples(self, series: List[Tuple[LabelKey, Any]]) -> Iterable[str]:
+        for key, value in series:
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Holds all metrics of the process"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._get_or_create(Counter, name, documentation)
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, buckets=buckets)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation)
+
+    def collector(self, func: Callable[[], None]) -> Callable[[], None]:
+        """Register a function that refreshes gauges right before each scrape (usable as a decorator)
+
+        For values that are cheaper to read on demand than to track on every
+        change, e.g. the size of an in-memory store.
+        """
+        with self._lock:
+            self._collectors.append(func)
+        return func
+
+    def _collect(self) -> List[Metric]:
+        """Run the collectors and return all metrics"""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collect in collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", getattr(collect, "__name__", collect), e)
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self._collect()) + "\n"
+
+    def snapshot(self) -> Dict[str, List[Tuple[LabelKey, Any]]]:
+        """Current series of every metric, by metric name"""
+        return {metric.name: metric.series() for metric in self._collect()}
+
+    def render_snapshots(self, snapshots: Dict[str, Dict[str, List[Tuple[LabelKey, Any]]]]) -> str:
+        """Render per-worker snapshots, adding a worker label to every series
+
+        Metric names and types come from this registry; every worker runs the
+        same code, so they register the same metrics.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        blocks = []
+        for metric in metrics:
+            lines = metric.header()
+            for worker, snapshot in snapshots.items():
+                series = [
+                    (tuple(sorted(key + (("worker", worker),))), value)
+                    for key, value in snapshot.get(metric.name, [])
+                ]
+                lines.extend(metric.format_samples(series))
+            blocks.append("\n".join(lines))
+        return "\n".join(blocks) + "\n"
+
+
+# Process-wide registry
+registry = MetricsRegistry()
+
+# Metrics shared by several modules
+upload_bytes = registry.counter(
+    "upload_bytes_total", "Bytes received in file uploads by kind (property_image, cached_image, import)"
+)
+work_queue_depth = registry.gauge(
+    "work_queue_depth", "Jobs waiting or running in this process by queue (password_hash, expose, import)"
+)
+memory_store_entries = registry.gauge(
+    "memory_store_entries", "Entries in the temporary in-memory stores by store"
+)
+
+
+class MultiprocessMetrics:
+    """Shares metric snapshots between the workers of one server through a directory"""
+
+    def __init__(self, registry: MetricsRegistry, directory: str):
+        self.registry = registry
+        self.directory = directory
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def write(self):
+        """Atomically replace this worker's snapshot"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def remove(self, pid: Optional[int] = None):
+        """Drop a worker's snapshot, by default this worker's (on shutdown)"""
+        try:
+            os.remove(self._path(pid or os.getpid()))
+        except FileNotFoundError:
+            pass
+
+    def render(self) -> str:
+        """Render the snapshots of all live workers, this one freshly taken"""
+        self.write()
+        snapshots = {}
+        for name in os.listdir(self.directory):
+            pid_text, ext = os.path.splitext(name)
+            if ext != ".json" or not pid_text.isdigit():
+                continue
+            pid = int(pid_text)
+            if not _process_alive(pid):
+                # 已退出的 worker 留下的快照，不再上报
+                self.remove(pid)
+                continue
+            try:
+                with open(self._path(pid), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            snapshots[pid_text] = {
+                metric: [(tuple(tuple(pair) for pair in key), value) for key, value in series]
+                for metric, series in data.items()
+            }
+        return self.registry.render_snapshots(snapshots)
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
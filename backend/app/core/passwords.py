@@ -0,0 +1,142 @@
+"""
+Password hashing off the event loop
+
+bcrypt/argon2 take hundreds of milliseconds of CPU by design. Hashes are
+computed in a small dedicated thread pool (both libraries release the GIL),
+and a semaphore caps how many hash jobs may be queued so a login burst
+cannot pile up unbounded work; callers that cannot get a slot within
+PASSWORD_HASH_QUEUE_TIMEOUT get PasswordHashingBusy.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Optional, Tuple, TypeVar
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.metrics import registry, work_queue_depth
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+SUPPORTED_SCHEMES = ("bcrypt", "argon2")
+
+hash_duration = registry.histogram(
+    "password_hash_duration_seconds", "Time spent hashing or verifying a password, excluding queueing"
+)
+hash_queue_wait = registry.histogram(
+    "password_hash_queue_seconds", "Time spent waiting for a password hashing slot"
+)
+hash_rejected = registry.counter(
+    "password_hash_rejected_total", "Hash operations rejected because the hashing queue was full"
+)
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when no hashing slot frees up within PASSWORD_HASH_QUEUE_TIMEOUT"""
+
+
+def build_crypt_context() -> "CryptContext":
+    """CryptContext for the configured scheme and cost
+
+    The configured scheme hashes new passwords; the other one is still
+    accepted for verification but marked deprecated, and hashes with other
+    cost parameters are flagged too, so verify_and_update rehashes them.
+    """
+    from passlib.context import CryptContext
+    
+    if settings.PASSWORD_SCHEME not in SUPPORTED_SCHEMES:
+        raise ValueError(f"Unsupported PASSWORD_SCHEME: {settings.PASSWORD_SCHEME}")
+    schemes = [settings.PASSWORD_SCHEME] + [s for s in SUPPORTED_SCHEMES if s != settings.PASSWORD_SCHEME]
+    return CryptContext(
+        schemes=schemes,
+        default=settings.PASSWORD_SCHEME,
+        deprecated="auto",
+        bcrypt__rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+        argon2__type="ID",
+        argon2__time_cost=settings.ARGON2_TIME_COST,
+        argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+        argon2__parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+
+# Built on first use: passlib and the hash backends are only needed by the auth routes
+pwd_context: Optional["CryptContext"] = None
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_in_flight = 0  # hash jobs waiting for a slot or running
+
+
+def get_crypt_context() -> "CryptContext":
+    global pwd_context
+    if pwd_context is None:
+        pwd_context = build_crypt_context()
+    return pwd_context
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _executor
+
+
+async def _run_hashing(operation: str, func: Callable[..., T], *args) -> T:
+    """Run a hashing call in the dedicated pool, bounded by the queue cap"""
+    global _slots, _in_flight
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+    _in_flight += 1
+    try:
+        wait_start = time.perf_counter()
+        try:
+            await asyncio.wait_for(_slots.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            hash_rejected.inc(operation=operation)
+            raise PasswordHashingBusy("Too many concurrent password operations, retry shortly")
+        hash_queue_wait.observe(time.perf_counter() - wait_start, operation=operation)
+
+        try:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            result = await loop.run_in_executor(_get_executor(), func, *args)
+            hash_duration.observe(time.perf_counter() - start, operation=operation, scheme=settings.PASSWORD_SCHEME)
+            return result
+        finally:
+            _slots.release()
+    finally:
+        _in_flight -= 1
+
+
+@registry.collector
+def _collect_queue_depth():
+    work_queue_depth.set(_in_flight, queue="password_hash")
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password with the configured scheme"""
+    return await _run_hashing("hash", get_crypt_context().hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; on success also returns a new hash if the stored one is outdated"""
+    return await _run_hashing("verify", get_crypt_context().verify_and_update, password, hashed_password)
+
+
+async def dummy_verify():
+    """Spend the same time as a real verify, so unknown usernames are not revealed by timing"""
+    await _run_hashing("verify", get_crypt_context().dummy_verify)
+
+
+def shutdown_hashing():
+    """Stop the hashing pool (application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
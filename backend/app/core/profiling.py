@@ -0,0 +1,285 @@
+"""
+Per-request timing breakdown, slow-request log and on-demand profiling
+
+RequestProfilingMiddleware puts a RequestTimings object into a context
+variable for every request. Database queries (SQLAlchemy cursor events), LLM
+calls and blocking file/image work add their time to it via record_time or
+timed, so a request slower than SLOW_REQUEST_THRESHOLD_MS is logged with the
+route and how its duration split into db / llm / io / other.
+
+A request carrying `X-Profile: <PROFILING_TOKEN>`, or picked by
+PROFILING_SAMPLE_RATE, additionally runs under a sampling profiler. With
+pyinstrument installed the result is its HTML flame view; otherwise a
+built-in sampler of the event loop thread writes folded stacks
+(flamegraph.pl / speedscope format). Profiles are stored in PROFILING_DIR
+and the response carries their id in X-Profile-Id; fetch them from
+/app/endpoints/profiles/<id> with `X-Profile-Token: <PROFILING_TOKEN>`.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import asyncio
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger("app.slow_requests")
+
+TIMING_CATEGORIES = ("db", "llm", "io")
+
+slow_requests = registry.counter(
+    "slow_requests_total", "Requests slower than SLOW_REQUEST_THRESHOLD_MS by route"
+)
+profiled_requests = registry.counter(
+    "profiled_requests_total", "Requests run under the profiler by trigger (header, sample)"
+)
+
+
+@dataclass
+class RequestTimings:
+    """Time spent per category while handling one request"""
+    seconds: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, category: str, seconds: float):
+        self.seconds[category] = self.seconds.get(category, 0.0) + seconds
+        self.counts[category] = self.counts.get(category, 0) + 1
+
+
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_time(category: str, seconds: float):
+    """Add time to the current request's breakdown (no-op outside a request)"""
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add(category, seconds)
+
+
+@contextmanager
+def timed(category: str):
+    """Context manager recording the enclosed block's duration under category"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(category, time.perf_counter() - start)
+
+
+def install_query_timing(sync_engine):
+    """Attribute every query's execution time to the request that issued it"""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        record_time("db", time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            record_time("db", time.perf_counter() - starts.pop())
+
+
+class StackSampler:
+    """Fallback sampling profiler: folded stacks of one thread, sampled from a helper thread"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def output(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """pyinstrument when installed, StackSampler otherwise"""
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            self._profiler = StackSampler(settings.PROFILING_INTERVAL)
+            self.extension = "folded"
+        else:
+            self._profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+            self.extension = "html"
+
+    def start(self):
+        self._profiler.start()
+
+    def stop(self) -> str:
+        self._profiler.stop()
+        if self.extension == "html":
+            return self._profiler.output_html()
+        return self._profiler.output()
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """Stored profile file for an id, if it exists"""
+    for extension in ("html", "folded"):
+        path = os.path.join(settings.PROFILING_DIR, f"{profile_id}.{extension}")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _store_profile(profile_id: str, extension: str, content: str):
+    """Write a profile and prune old ones (blocking, run in a worker thread)"""
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    with open(os.path.join(settings.PROFILING_DIR, f"{profile_id}.{extension}"), "w", encoding="utf-8") as f:
+        f.write(content)
+    # 只保留最近的 PROFILING_MAX_STORED 份
+    stored = sorted(
+        (entry for entry in os.scandir(settings.PROFILING_DIR) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in stored[:max(0, len(stored) - settings.PROFILING_MAX_STORED)]:
+        os.remove(entry.path)
+
+
+def is_profiling_token(value: Optional[str]) -> bool:
+    """Whether value is the configured privileged profiling token"""
+    return bool(settings.PROFILING_TOKEN) and value is not None and hmac.compare_digest(value, settings.PROFILING_TOKEN)
+
+
+def route_template(scope) -> Optional[str]:
+    """Path template of the route that handled a request (e.g. /properties/{property_id}), None if unmatched"""
+    # Starlette 0.27 only records the endpoint in the scope; map it back to the path template
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is not None and app is not None:
+        for route in getattr(app, "routes", []):
+            # Mounts (static files) record their app as the endpoint
+            if getattr(route, "endpoint", None) is endpoint or getattr(route, "app", None) is endpoint:
+                return route.path
+    return None
+
+
+class RequestProfilingMiddleware:
+    """ASGI middleware: timing breakdown, slow-request log and opt-in profiling"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _profile_trigger(self, scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile":
+                return "header" if is_profiling_token(value.decode("latin-1")) else None
+        if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        trigger = self._profile_trigger(scope)
+        profiler = profile_id = None
+        if trigger:
+            profiler = RequestProfiler()
+            profile_id = uuid.uuid4().hex
+            profiled_requests.inc(trigger=trigger)
+
+        status_code = 500
+        duration = None
+        profile_output = None
+
+        def finish():
+            # Stop at the last body chunk: background tasks run afterwards but the client already has its response
+            nonlocal duration, timings, profile_output
+            if duration is not None:
+                return
+            duration = time.perf_counter() - start
+            timings = RequestTimings(dict(timings.seconds), dict(timings.counts))
+            if profiler:
+                profile_output = profiler.stop()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile_id:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        start = time.perf_counter()
+        if profiler:
+            profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            if profiler:
+                try:
+                    # 文件写入和清理放到线程里，不阻塞事件循环上的其他请求
+                    await asyncio.to_thread(_store_profile, profile_id, profiler.extension, profile_output)
+                except Exception as e:
+                    logger.warning("Storing profile %s failed: %s", profile_id, e)
+            request_timings.reset(token)
+            self._log_if_slow(scope, status_code, duration, timings, profile_id)
+
+    def _log_if_slow(self, scope, status_code: int, duration: float, timings: RequestTimings, profile_id: Optional[str]):
+        threshold = settings.SLOW_REQUEST_THRESHOLD_MS
+        if threshold <= 0 or duration * 1000 < threshold:
+            return
+        route = route_template(scope) or scope.get("path", "")
+        slow_requests.inc(method=scope["method"], route=route)
+        breakdown = {category: round(timings.seconds.get(category, 0.0) * 1000, 1) for category in TIMING_CATEGORIES}
+        breakdown["other"] = round(max(0.0, duration * 1000 - sum(breakdown.values())), 1)
+        logger.warning(
+            "slow_request %s %s took %.1f ms", scope["method"], route, duration * 1000,
+            extra={
+                "event": "slow_request",
+                "method": scope["method"],
+                "route": route,
+                "path": scope.get("path"),
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 1),
+                "breakdown_ms": breakdown,
+                "counts": timings.counts,
+                "profile_id": profile_id,
+            }
+        )
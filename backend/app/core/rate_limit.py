@@ -0,0 +1,131 @@
+"""
+Sliding-window rate limiting for credential endpoints
+
+Login and registration spend hundreds of milliseconds of CPU on password
+hashing, so excess attempts are rejected before any hashing (or database
+work) happens. Each limiter keeps the timestamps of the last `limit`
+attempts per key (client IP, username) in process memory, or in a Redis
+sorted set when RATE_LIMIT_BACKEND=redis so all workers share one window.
+Rejected attempts are not recorded, so a blocked client is let in again as
+soon as its oldest attempt leaves the window.
+"""
+
+from collections import OrderedDict, deque
+from fastapi import HTTPException, Request, status
+from typing import Deque, Optional
+import logging
+import math
+import time
+import uuid
+
+from app.core.cache import redis_client
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+rate_limit_rejections = registry.counter(
+    "rate_limit_rejections_total", "Requests rejected by a rate limiter"
+)
+
+# Atomic check-and-record on a sorted set of attempt timestamps; returns the
+# seconds until a slot frees up, or nil if the attempt was accepted
+_REDIS_SLIDING_WINDOW = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return tostring(tonumber(oldest[2]) + window - now)
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return false
+"""
+
+
+class SlidingWindowLimiter:
+    """At most `limit` attempts per key within any `window` seconds"""
+
+    def __init__(self, name: str, limit: int, window: int = settings.AUTH_RATE_LIMIT_WINDOW):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self._attempts: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._script = None
+
+    def _hit_local(self, key: str, now: float) -> Optional[float]:
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            attempts = deque(maxlen=self.limit)
+            self._attempts[key] = attempts
+            # 攻击时键的数量可能很大，超出上限时淘汰最久未访问的键
+            while len(self._attempts) > settings.RATE_LIMIT_MAX_KEYS:
+                self._attempts.popitem(last=False)
+        else:
+            self._attempts.move_to_end(key)
+
+        if len(attempts) >= self.limit and attempts[0] > now - self.window:
+            return attempts[0] + self.window - now
+        attempts.append(now)
+        return None
+
+    async def _hit_redis(self, redis, key: str) -> Optional[float]:
+        if self._script is None:
+            self._script = redis.register_script(_REDIS_SLIDING_WINDOW)
+        now = time.time()
+        retry_after = await self._script(
+            keys=[f"ratelimit:{self.name}:{key}"],
+            args=[now, self.window, self.limit, f"{now}:{uuid.uuid4().hex[:8]}"]
+        )
+        return float(retry_after) if retry_after is not None else None
+
+    async def hit(self, key: str) -> Optional[float]:
+        """Record an attempt for key; returns seconds to wait instead if the key is over its limit"""
+        if self.limit <= 0:
+            return None
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            redis = redis_client()
+            if redis is not None:
+                try:
+                    return await self._hit_redis(redis, key)
+                except Exception as e:
+                    logger.warning("Redis rate limiter failed, falling back to memory: %s", e)
+        return self._hit_local(key, time.monotonic())
+
+    def reset(self):
+        """Forget all in-memory attempts (tests and admin tooling)"""
+        self._attempts.clear()
+
+
+auth_ip_limiter = SlidingWindowLimiter("auth_ip", settings.AUTH_RATE_LIMIT_PER_IP)
+login_username_limiter = SlidingWindowLimiter("login_username", settings.AUTH_RATE_LIMIT_PER_USERNAME)
+
+
+def too_many_requests(retry_after: float, detail: str = "Too many attempts, retry later") -> HTTPException:
+    """429 with a whole-second Retry-After"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+async def enforce_auth_rate_limit(request: Request, username: Optional[str] = None):
+    """Reject the request with 429 if its client IP or the target username is over the limit
+
+    Runs the per-IP check first so a single source spraying many usernames
+    does not fill the username windows.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = await auth_ip_limiter.hit(client_ip)
+    if retry_after is not None:
+        rate_limit_rejections.inc(limiter=auth_ip_limiter.name)
+        raise too_many_requests(retry_after)
+
+    if username:
+        retry_after = await login_username_limiter.hit(username.strip().lower())
+        if retry_after is not None:
+            rate_limit_rejections.inc(limiter=login_username_limiter.name)
+            raise too_many_requests(retry_after)
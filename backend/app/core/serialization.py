@@ -0,0 +1,47 @@
+"""
+Fast response serialization: orjson responses and cached list validators
+
+ORJSONResponse is the application's default response class. It also accepts
+pydantic models anywhere in the content, so handlers that build responses
+themselves (conditional GETs) can skip jsonable_encoder. list_adapter builds
+a TypeAdapter(List[model]) once per model, so a page of rows is validated in
+a single pydantic-core call instead of one model_validate per row.
+"""
+
+from fastapi.responses import JSONResponse
+from functools import lru_cache
+from pydantic import BaseModel, TypeAdapter
+from typing import Any, List, Type
+import orjson
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    # orjson handles dicts, lists, datetimes, UUIDs and enums natively
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content (plain data or pydantic models) to JSON bytes"""
+    if isinstance(content, BaseModel):
+        # Serialized directly by pydantic-core, no intermediate dict
+        return content.model_dump_json(by_alias=True).encode("utf-8")
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Cached TypeAdapter validating a list of model (rows, ORM objects or dicts)"""
+    return TypeAdapter(List[model])
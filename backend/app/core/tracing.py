@@ -0,0 +1,435 @@
+"""
+Distributed tracing across requests, database queries, LLM calls, image work
+and background jobs
+
+With TRACING_ENABLED every HTTP request starts (or, given a W3C `traceparent`
+header, continues) a trace. Code adds child spans with `span(...)`; database
+queries get one span each through SQLAlchemy cursor events. Background work
+captures `current_traceparent()` when it is scheduled and opens its root span
+with `trace_job(name, traceparent)`, so the job shows up in the request's
+trace even when it runs later or in another process.
+
+The OpenTelemetry SDK is used when installed (spans go through its batch
+processor to the console, a JSON-lines file or OTLP). Otherwise a small
+built-in tracer with the same trace-context format writes one JSON span per
+line from a background thread. When tracing is disabled nothing is
+installed and `span` returns immediately; spans of traces that were not
+sampled are never created.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+from app.core.config import settings
+from app.core.profiling import route_template
+
+logger = logging.getLogger("app.tracing")
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+MAX_STATEMENT_LENGTH = 1000
+
+
+class _NoopSpan:
+    """Stand-in yielded when the current trace is not recorded"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def update_name(self, name: str):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+@dataclass
+class Span:
+    """Span of the built-in tracer, serialized like OpenTelemetry's JSON export"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    sampled: bool
+    kind: str = "internal"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time: int = field(default_factory=time.time_ns)
+    end_time: Optional[int] = None
+    status: str = "unset"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def update_name(self, name: str):
+        self.name = name
+
+    def record_exception(self, exc: BaseException):
+        self.status = "error"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_time,
+            "end_time_unix_nano": self.end_time,
+            "duration_ms": round((self.end_time - self.start_time) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "service.name": settings.TRACING_SERVICE_NAME,
+        }
+
+
+class SpanWriter:
+    """Exports finished built-in spans from a background thread, in batches"""
+
+    def __init__(self, exporter: str, path: str):
+        self.exporter = exporter
+        self.path = path
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        self._queue.put(span)
+
+    def _write(self, batch):
+        lines = [json.dumps(span.to_dict(), ensure_ascii=False, default=str) for span in batch]
+        if self.exporter == "console":
+            for line in lines:
+                logger.info(line)
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [span for span in batch if span is not None]
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.warning("Exporting %d spans failed: %s", len(batch), e)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class BuiltinTracer:
+    """Minimal W3C trace-context tracer used when the OpenTelemetry SDK is missing"""
+
+    def __init__(self):
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self._writer = SpanWriter(settings.TRACING_EXPORTER, settings.TRACING_FILE)
+        if settings.TRACING_EXPORTER not in ("file", "console"):
+            logger.warning(
+                "TRACING_EXPORTER=%s needs the OpenTelemetry SDK, writing to %s",
+                settings.TRACING_EXPORTER, settings.TRACING_FILE
+            )
+            self._writer.exporter = "file"
+
+    def start(self, name: str, kind: str, attributes: Dict[str, Any], traceparent: Optional[str], new_trace: bool):
+        if new_trace:
+            match = TRACEPARENT_RE.match(traceparent or "")
+            if match:
+                trace_id, parent_id, flags = match.groups()
+                sampled = bool(int(flags, 16) & 1)
+            else:
+                trace_id, parent_id = os.urandom(16).hex(), None
+                sampled = random.random() < settings.TRACING_SAMPLE_RATE
+        else:
+            parent = self._current.get()
+            if parent is None or not parent.sampled:
+                return None
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, True
+        return Span(name, trace_id, os.urandom(8).hex(), parent_id, sampled, kind, dict(attributes))
+
+    def activate(self, span):
+        return self._current.set(span)
+
+    def deactivate(self, token):
+        self._current.reset(token)
+
+    def end(self, span, error: Optional[BaseException]):
+        if not span.sampled:
+            return
+        span.end_time = time.time_ns()
+        if error is not None:
+            span.record_exception(error)
+        self._writer.submit(span)
+
+    def traceparent(self) -> Optional[str]:
+        span = self._current.get()
+        return span.traceparent if span is not None else None
+
+    def shutdown(self):
+        self._writer.close()
+
+
+class OpenTelemetryTracer:
+    """Adapter onto the OpenTelemetry SDK"""
+
+    def __init__(self):
+        from opentelemetry import context, trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+        from opentelemetry.trace import SpanKind, Status, StatusCode
+        from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+        self._context, self._trace = context, trace
+        self._kinds = {"server": SpanKind.SERVER, "client": SpanKind.CLIENT, "internal": SpanKind.INTERNAL}
+        self._error_status = Status(StatusCode.ERROR)
+        self._propagator = TraceContextTextMapPropagator()
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+            sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE))
+        )
+        if settings.TRACING_EXPORTER == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+            exporter = OTLPSpanExporter()
+        elif settings.TRACING_EXPORTER == "console":
+            exporter = ConsoleSpanExporter()
+        else:
+            directory = os.path.dirname(settings.TRACING_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(settings.TRACING_FILE, "a", encoding="utf-8")
+            exporter = ConsoleSpanExporter(out=self._file, formatter=lambda span: span.to_json(indent=None) + "\n")
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        self._provider = provider
+        self._tracer = provider.get_tracer("app")
+
+    def start(self, name: str, kind: str, attributes: Dict[str, Any], traceparent: Optional[str], new_trace: bool):
+        if new_trace:
+            # An empty context starts a new trace even inside another span
+            ctx = self._propagator.extract({"traceparent": traceparent}) if traceparent else self._context.Context()
+        else:
+            ctx = None
+            if not self._trace.get_current_span().is_recording():
+                return None
+        return self._tracer.start_span(name, context=ctx, kind=self._kinds.get(kind, self._kinds["internal"]), attributes=attributes)
+
+    def activate(self, span):
+        return self._context.attach(self._trace.set_span_in_context(span))
+
+    def deactivate(self, token):
+        self._context.detach(token)
+
+    def end(self, span, error: Optional[BaseException]):
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(self._error_status)
+        span.end()
+
+    def traceparent(self) -> Optional[str]:
+        carrier: Dict[str, str] = {}
+        self._propagator.inject(carrier)
+        return carrier.get("traceparent")
+
+    def shutdown(self):
+        self._provider.shutdown()
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide tracer, created on first use (None while tracing is disabled)"""
+    global _tracer
+    if not settings.TRACING_ENABLED:
+        return None
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                try:
+                    _tracer = OpenTelemetryTracer()
+                except ImportError:
+                    _tracer = BuiltinTracer()
+    return _tracer
+
+
+def start_span(name: str, kind: str = "internal", traceparent: Optional[str] = None, new_trace: bool = False, **attributes):
+    """Start a span without making it current; None if it is not recorded
+
+    Without new_trace the span is a child of the current one and only created
+    inside a sampled trace. With new_trace it is a root, or continues
+    traceparent when one is given.
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        return None
+    return tracer.start(name, kind, attributes, traceparent, new_trace)
+
+
+def end_span(span, error: Optional[BaseException] = None):
+    """Finish a span from start_span (None is ignored)"""
+    if span is not None:
+        _tracer.end(span, error)
+
+
+@contextmanager
+def _activated(span):
+    token = _tracer.activate(span)
+    try:
+        yield span
+    except BaseException as e:
+        end_span(span, e)
+        raise
+    else:
+        end_span(span)
+    finally:
+        _tracer.deactivate(token)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Child span of the current trace around the enclosed block (no-op outside a sampled trace)"""
+    current = start_span(name, kind, **attributes)
+    if current is None:
+        yield NOOP_SPAN
+        return
+    with _activated(current):
+        yield current
+
+
+@contextmanager
+def trace_job(name: str, traceparent: Optional[str] = None, **attributes):
+    """Root span of a background or worker job, continuing the trace that scheduled it"""
+    current = start_span(name, "internal", traceparent=traceparent, new_trace=True, **attributes)
+    if current is None:
+        yield NOOP_SPAN
+        return
+    with _activated(current):
+        yield current
+
+
+def current_traceparent() -> Optional[str]:
+    """W3C traceparent of the current span, to hand to work that runs later"""
+    tracer = get_tracer()
+    return tracer.traceparent() if tracer is not None else None
+
+
+def shutdown_tracing():
+    """Flush spans still waiting to be exported"""
+    if _tracer is not None:
+        _tracer.shutdown()
+
+
+def install_query_tracing(sync_engine):
+    """One client span per database query"""
+    from sqlalchemy import event
+
+    system = sync_engine.dialect.name
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "QUERY"
+        conn.info.setdefault("trace_spans", []).append(start_span(
+            f"db {operation}", "client",
+            **{"db.system": system, "db.operation": operation, "db.statement": statement[:MAX_STATEMENT_LENGTH]}
+        ))
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        end_span(conn.info["trace_spans"].pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+        if spans:
+            end_span(spans.pop(), exception_context.original_exception)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request, continuing an incoming traceparent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", []):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        server_span = start_span(
+            f"{scope['method']} {scope.get('path', '')}", "server", traceparent=traceparent, new_trace=True,
+            **{"http.method": scope["method"], "http.target": scope.get("path", "")}
+        )
+        if server_span is None:
+            await self.app(scope, receive, send)
+            return
+
+        finished = False
+        status_code = 500
+
+        def finish(error: Optional[BaseException] = None):
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            route = route_template(scope) or "unmatched"
+            server_span.update_name(f"{scope['method']} {route}")
+            server_span.set_attribute("http.route", route)
+            server_span.set_attribute("http.status_code", status_code)
+            if error is None and status_code >= 500:
+                error = RuntimeError(f"HTTP {status_code}")
+            end_span(server_span, error)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            # Background tasks run after the body is complete; jobs open their own span via trace_job
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        token = _tracer.activate(server_span)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            finish(e)
+            raise
+        finally:
+            finish()
+            _tracer.deactivate(token)
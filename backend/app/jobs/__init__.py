@@ -0,0 +1 @@
+# Long-running batch jobs
@@ -0,0 +1,291 @@
+"""
+Bulk regeneration of AI property descriptions
+
+Usage:
+    python -m app.jobs.description_regeneration --job-id prompt-v2 --city Berlin
+    python -m app.jobs.description_regeneration --job-id prompt-v2 --retry-failed
+    python -m app.jobs.description_regeneration --job-id smoke --mock
+
+Properties are paged by primary key, every page is sent through the LLM layer
+concurrently and written back in a single batched UPDATE. No database
+connection is held while the LLM calls run: a page is read in one session
+and written in another. After each page the last processed id is
+checkpointed, so re-running with the same job id resumes where the previous
+run stopped (with the filters it was started with). Properties whose
+generation failed are recorded and regenerated by --retry-failed.
+"""
+
+from sqlalchemy import select, update
+from pydantic import BaseModel
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from app.core.config import settings
+from app.core.database import Property, dispose_db, new_session
+from app.core.llm import chat_completion
+from app.core.logs import configure_logging
+from app.core.tracing import shutdown_tracing, span, trace_job
+from app.services.property_service import PropertyService, DESCRIPTION_SYSTEM_PROMPT, property_cache
+
+DescriptionGenerator = Callable[[Property], Awaitable[str]]
+
+logger = logging.getLogger(__name__)
+
+
+class RegenerationFilter(BaseModel):
+    """Selects the properties a regeneration job touches"""
+    ids: Optional[List[int]] = None
+    city: Optional[str] = None
+    property_type: Optional[str] = None
+    status: Optional[str] = None
+    owner_id: Optional[int] = None
+    updated_before: Optional[datetime] = None
+
+
+class RegenerationCheckpoint(BaseModel):
+    """Persisted progress of a regeneration job"""
+    job_id: str
+    filters: RegenerationFilter
+    last_id: int = 0
+    processed: int = 0
+    updated: int = 0
+    failed: int = 0
+    failed_ids: List[int] = []
+    finished: bool = False
+
+
+async def generate_with_llm(property_obj: Property) -> str:
+    """Generate a description through the OpenAI layer"""
+    prompt = PropertyService(None)._build_german_description_prompt(property_obj)
+    return await chat_completion(
+        system_prompt=DESCRIPTION_SYSTEM_PROMPT,
+        user_prompt=prompt,
+        model="gpt-4nano",
+        max_tokens=500,
+        operation="regeneration"
+    )
+
+
+async def generate_with_mock(property_obj: Property) -> str:
+    """Generate a template description without calling OpenAI (local runs and tests)"""
+    return PropertyService(None)._generate_fallback_description(property_obj, "formal")
+
+
+class DescriptionRegenerationJob:
+    """Regenerates descriptions for every property matching a filter"""
+
+    def __init__(
+        self,
+        job_id: str,
+        filters: Optional[RegenerationFilter] = None,
+        generate: DescriptionGenerator = generate_with_llm,
+        concurrency: int = settings.REGENERATION_CONCURRENCY,
+        batch_size: int = settings.REGENERATION_BATCH_SIZE,
+        checkpoint_dir: str = settings.REGENERATION_CHECKPOINT_DIR
+    ):
+        self.job_id = job_id
+        self.generate = generate
+        self.batch_size = batch_size
+        self.checkpoint_path = os.path.join(checkpoint_dir, f"regeneration_{job_id}.json")
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.checkpoint = self._load_checkpoint(filters or RegenerationFilter())
+
+    def _load_checkpoint(self, filters: RegenerationFilter) -> RegenerationCheckpoint:
+        """Resume from an existing checkpoint or start a new one
+
+        Resuming keeps the checkpoint's filters; passing different (non-empty)
+        filters for an existing job id is an error rather than silently
+        ignored.
+        """
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = RegenerationCheckpoint.model_validate_json(f.read())
+            if filters != RegenerationFilter() and filters != checkpoint.filters:
+                raise ValueError(
+                    f"Job {self.job_id} was started with filters {checkpoint.filters.model_dump(exclude_none=True)}, "
+                    f"not {filters.model_dump(exclude_none=True)}; use a new job id or omit the filters to resume"
+                )
+            return checkpoint
+        return RegenerationCheckpoint(job_id=self.job_id, filters=filters)
+
+    def _save_checkpoint(self):
+        """Atomically persist the checkpoint"""
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.checkpoint.model_dump_json())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _build_page_query(self):
+        """Build the keyset query for the next page of matching properties"""
+        filters = self.checkpoint.filters
+        query = select(Property).where(Property.id > self.checkpoint.last_id)
+        if filters.ids:
+            query = query.where(Property.id.in_(filters.ids))
+        if filters.city:
+            query = query.where(Property.city == filters.city)
+        if filters.property_type:
+            query = query.where(Property.property_type == filters.property_type)
+        if filters.status:
+            query = query.where(Property.status == filters.status)
+        if filters.owner_id is not None:
+            query = query.where(Property.owner_id == filters.owner_id)
+        if filters.updated_before:
+            query = query.where(Property.updated_at < filters.updated_before)
+        return query.order_by(Property.id).limit(self.batch_size)
+
+    async def _generate_one(self, property_obj: Property) -> Optional[str]:
+        """Generate one description, returning None on failure"""
+        async with self._semaphore:
+            try:
+                with span("regeneration.generate", **{"property.id": property_obj.id}):
+                    return await self.generate(property_obj)
+            except Exception as e:
+                logger.warning("Regeneration failed for property %s: %s", property_obj.id, e)
+                return None
+
+    async def _regenerate(self, page: Sequence[Property]) -> List[Dict]:
+        """Generate descriptions for a page and write the successful ones back
+
+        Returns the written rows; the page must already be loaded, the
+        session used for writing is only opened once generation is done.
+        """
+        descriptions = await asyncio.gather(*(self._generate_one(p) for p in page))
+        rows = [
+            {"id": property_obj.id, "description": description}
+            for property_obj, description in zip(page, descriptions)
+            if description is not None
+        ]
+
+        # 一次批量 UPDATE 写回整页结果
+        if rows:
+            async with new_session() as session:
+                await session.execute(update(Property), rows)
+                await session.execute(
+                    update(Property)
+                    .where(Property.id.in_([row["id"] for row in rows]))
+                    .values(version=Property.version + 1)
+                )
+                await session.commit()
+            for row in rows:
+                await property_cache.invalidate(row["id"])
+        return rows
+
+    async def run(self) -> RegenerationCheckpoint:
+        """Process all remaining pages and return the final checkpoint"""
+        while not self.checkpoint.finished:
+            async with new_session() as session:
+                result = await session.execute(self._build_page_query())
+                page = result.scalars().all()
+            if not page:
+                self.checkpoint.finished = True
+                self._save_checkpoint()
+                break
+
+            rows = await self._regenerate(page)
+            written = {row["id"] for row in rows}
+            self.checkpoint.failed_ids.extend(p.id for p in page if p.id not in written)
+
+            self.checkpoint.last_id = page[-1].id
+            self.checkpoint.processed += len(page)
+            self.checkpoint.updated += len(rows)
+            self.checkpoint.failed += len(page) - len(rows)
+            self._save_checkpoint()
+            logger.info(
+                "Regeneration %s: %d processed, %d failed, last id %d",
+                self.job_id, self.checkpoint.processed, self.checkpoint.failed, self.checkpoint.last_id
+            )
+
+        return self.checkpoint
+
+    async def retry_failed(self) -> RegenerationCheckpoint:
+        """Regenerate the properties whose generation failed, one page at a time
+
+        Ids that fail again stay in failed_ids for a later retry; ids that no
+        longer exist are dropped.
+        """
+        pending = list(self.checkpoint.failed_ids)
+        for start in range(0, len(pending), self.batch_size):
+            ids = pending[start:start + self.batch_size]
+            async with new_session() as session:
+                result = await session.execute(select(Property).where(Property.id.in_(ids)).order_by(Property.id))
+                page = result.scalars().all()
+
+            rows = await self._regenerate(page)
+            still_failed = {p.id for p in page} - {row["id"] for row in rows}
+            retried = set(ids)
+            self.checkpoint.failed_ids = [
+                property_id for property_id in self.checkpoint.failed_ids
+                if property_id not in retried or property_id in still_failed
+            ]
+            self.checkpoint.updated += len(rows)
+            self.checkpoint.failed = len(self.checkpoint.failed_ids)
+            self._save_checkpoint()
+            logger.info(
+                "Regeneration %s retry: %d of %d updated, %d still failed",
+                self.job_id, len(rows), len(ids), len(still_failed)
+            )
+
+        return self.checkpoint
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Regenerate AI property descriptions in bulk")
+    parser.add_argument("--job-id", required=True, help="Checkpoint name; reuse it to resume a run")
+    parser.add_argument("--ids", type=int, nargs="*")
+    parser.add_argument("--city")
+    parser.add_argument("--property-type")
+    parser.add_argument("--status")
+    parser.add_argument("--owner-id", type=int)
+    parser.add_argument("--updated-before", type=datetime.fromisoformat)
+    parser.add_argument("--concurrency", type=int, default=settings.REGENERATION_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=settings.REGENERATION_BATCH_SIZE)
+    parser.add_argument("--mock", action="store_true", help="Use template descriptions instead of OpenAI")
+    parser.add_argument("--retry-failed", action="store_true", help="Regenerate the properties that failed in this job")
+    args = parser.parse_args()
+    configure_logging()
+    if not settings.CACHE_REDIS_ENABLED:
+        logger.warning(
+            "CACHE_REDIS_ENABLED is off: running servers keep cached descriptions until CACHE_TTL expires"
+        )
+
+    try:
+        job = DescriptionRegenerationJob(
+            job_id=args.job_id,
+            filters=RegenerationFilter(
+                ids=args.ids,
+                city=args.city,
+                property_type=args.property_type,
+                status=args.status,
+                owner_id=args.owner_id,
+                updated_before=args.updated_before
+            ),
+            generate=generate_with_mock if args.mock else generate_with_llm,
+            concurrency=args.concurrency,
+            batch_size=args.batch_size
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    async def run_and_dispose() -> RegenerationCheckpoint:
+        try:
+            with trace_job("job.description_regeneration", **{"job.id": job.job_id}):
+                if args.retry_failed:
+                    return await job.retry_failed()
+                return await job.run()
+        finally:
+            await dispose_db()
+            shutdown_tracing()
+
+    checkpoint = asyncio.run(run_and_dispose())
+    print(json.dumps(checkpoint.model_dump(mode="json"), indent=2))
+
+
+if __name__ == "__main__":
+    main()
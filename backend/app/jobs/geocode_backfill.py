@@ -0,0 +1,64 @@
+"""
+Backfill coordinates for properties created before geocoding existed
+
+Usage:
+    python -m app.jobs.geocode_backfill --batch-size 500
+"""
+
+from sqlalchemy import select, update
+import argparse
+import asyncio
+
+from app.core.database import Property, dispose_db, new_session
+from app.core.tracing import shutdown_tracing, trace_job
+from app.services.geocoding_service import GeocodingService
+
+
+async def backfill_coordinates(batch_size: int = 500) -> int:
+    """Geocode every property without a geohash; returns the number of rows located"""
+    located = 0
+    last_id = 0
+    while True:
+        async with new_session() as db:
+            result = await db.execute(
+                select(Property.id, Property.plz, Property.city, Property.address)
+                .where(Property.geohash.is_(None), Property.id > last_id)
+                .order_by(Property.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                return located
+            last_id = rows[-1].id
+
+            geocoding_service = GeocodingService(db)
+            values = []
+            for row in rows:
+                location = await geocoding_service.locate(row.plz, row.city, row.address)
+                if location["geohash"]:
+                    values.append({"id": row.id, **location})
+            if values:
+                await db.execute(update(Property), values)
+            await db.commit()
+            located += len(values)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Geocode properties that have no coordinates yet")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    async def run_and_dispose() -> int:
+        try:
+            with trace_job("job.geocode_backfill"):
+                return await backfill_coordinates(args.batch_size)
+        finally:
+            await dispose_db()
+            shutdown_tracing()
+
+    print(f"Geocoded {asyncio.run(run_and_dispose())} properties")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""
+Bulk property import from CSV, NDJSON or OpenImmo XML
+
+Usage:
+    python -m app.jobs.property_import listings.csv --owner-id 1
+    python -m app.jobs.property_import feed.xml --format openimmo
+
+The file is parsed incrementally and never loaded as a whole. Every batch of
+IMPORT_BATCH_SIZE records is validated against PropertyCreate and inserted
+with one executemany INSERT in its own transaction, so memory stays flat and
+a bad batch only loses itself. Rows that fail validation are reported with
+their position in the file.
+
+Jobs started through the API publish their progress to an ImportJobStore
+after every batch, so any server worker can answer progress queries.
+"""
+
+from sqlalchemy import insert
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime
+from itertools import islice
+import xml.etree.ElementTree as ET
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import time
+
+from app.core.cache import redis_client
+from app.core.config import settings
+from app.core.database import Property, dispose_db, new_session
+from app.core.tracing import shutdown_tracing, span, trace_job
+from app.schemas.property import PropertyCreate
+from app.services.geocoding_service import GeocodingService
+
+IMPORT_FORMATS = ("csv", "ndjson", "openimmo")
+
+JOB_ID_RE = re.compile(r"^[0-9a-f-]{36}$")
+
+logger = logging.getLogger(__name__)
+
+# Properties columns an import may fill (PropertyCreate has more fields than the table)
+PROPERTY_COLUMNS = {column.name for column in Property.__table__.columns} - {"id", "created_at", "updated_at"}
+
+
+class ImportRowError(BaseModel):
+    """Validation or insert error for one record"""
+    row: int  # 1-based record number in the file (CSV header not counted)
+    errors: List[str]
+
+
+class ImportProgress(BaseModel):
+    """Progress and result of an import job"""
+    job_id: str
+    format: str
+    status: str = "pending"  # pending, running, completed, failed
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class StoredImport(BaseModel):
+    """Progress of an import job together with the account it imports into"""
+    owner_id: int
+    progress: ImportProgress
+
+
+class ImportJobStore:
+    """Import progress shared by all server workers
+
+    IMPORT_JOB_BACKEND=file keeps one JSON file per job under IMPORT_DIR,
+    which the workers of one host share; redis stores the jobs in Redis and
+    falls back to the files when Redis fails. Either way a job is forgotten
+    IMPORT_JOB_TTL seconds after its last update.
+    """
+
+    def __init__(self, directory: str = settings.IMPORT_DIR, ttl: int = settings.IMPORT_JOB_TTL):
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.progress.json")
+
+    def _redis(self):
+        return redis_client() if settings.IMPORT_JOB_BACKEND == "redis" else None
+
+    def _write(self, job_id: str, payload: str):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(job_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def _read(self, job_id: str) -> Optional[str]:
+        path = self._path(job_id)
+        try:
+            if os.path.getmtime(path) < time.time() - self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".progress.json") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+
+    async def save(self, owner_id: int, progress: ImportProgress):
+        """Publish a job's current progress"""
+        payload = StoredImport(owner_id=owner_id, progress=progress).model_dump_json()
+        redis = self._redis()
+        if redis is not None:
+            try:
+                await redis.set(f"import:{progress.job_id}", payload, ex=self.ttl)
+                return
+            except Exception as e:
+                logger.warning("Redis import store failed, falling back to files: %s", e)
+        await asyncio.to_thread(self._write, progress.job_id, payload)
+
+    async def load(self, job_id: str) -> Optional[StoredImport]:
+        """Latest published progress of a job, None if unknown or expired"""
+        if not JOB_ID_RE.match(job_id):
+            return None
+        payload = None
+        redis = self._redis()
+        if redis is not None:
+            try:
+                payload = await redis.get(f"import:{job_id}")
+            except Exception as e:
+                logger.warning("Redis import store failed, falling back to files: %s", e)
+        if payload is None:
+            payload = await asyncio.to_thread(self._read, job_id)
+        return StoredImport.model_validate_json(payload) if payload is not None else None
+
+    async def prune(self):
+        """Remove expired progress files (Redis entries expire by themselves)"""
+        if os.path.isdir(self.directory):
+            await asyncio.to_thread(self._prune)
+
+
+def detect_format(filename: str) -> str:
+    """Guess the import format from a file name"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if extension == ".xml":
+        return "openimmo"
+    raise ValueError(f"Cannot detect import format of {filename}, expected one of {', '.join(IMPORT_FORMATS)}")
+
+
+def iter_csv_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Rows of a CSV file with a header line; empty cells become None"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.DictReader(f, dialect=dialect):
+            yield {key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                   for key, value in row.items() if key}
+
+
+def iter_ndjson_records(path: str) -> Iterator[Dict[str, Any]]:
+    """One JSON object per line; unparseable lines are passed on as errors"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = e
+            yield record if isinstance(record, (dict, Exception)) else ValueError("Line is not a JSON object")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _openimmo_property_type(objektart: Optional[ET.Element]) -> Optional[str]:
+    """Map an OpenImmo <objektart> to our property_type"""
+    if objektart is None:
+        return None
+    for child in objektart:
+        kind = _local_name(child.tag)
+        subtype = " ".join(child.attrib.values()).upper()
+        if kind == "wohnung":
+            if "PENTHOUSE" in subtype:
+                return "penthouse"
+            if "MAISONETTE" in subtype:
+                return "duplex"
+            if "APARTMENT" in subtype:
+                return "studio"
+            return "apartment"
+        if kind == "haus":
+            return "villa" if "VILLA" in subtype else "house"
+    return None
+
+
+def _openimmo_record(immobilie: ET.Element) -> Dict[str, Any]:
+    """Flatten one OpenImmo <immobilie> element into PropertyCreate fields"""
+    fields: Dict[str, ET.Element] = {}
+    for element in immobilie.iter():
+        fields.setdefault(_local_name(element.tag), element)
+
+    def text(name: str) -> Optional[str]:
+        element = fields.get(name)
+        return element.text.strip() if element is not None and element.text and element.text.strip() else None
+
+    vermarktung = fields.get("vermarktungsart")
+    for_rent = vermarktung is not None and vermarktung.get("MIETE_PACHT", "").lower() in ("true", "1")
+    street = " ".join(part for part in (text("strasse"), text("hausnummer")) if part)
+
+    return {
+        "title": text("objekttitel"),
+        "description": text("objektbeschreibung"),
+        "property_type": _openimmo_property_type(fields.get("objektart")),
+        "status": "for_rent" if for_rent else "for_sale",
+        "address": street or None,
+        "city": text("ort"),
+        "plz": text("plz"),
+        "price": text("kaltmiete") if for_rent else text("kaufpreis"),
+        "area_sqm": text("wohnflaeche"),
+        "rooms": text("anzahl_zimmer"),
+        "bedrooms": text("anzahl_schlafzimmer"),
+        "bathrooms": text("anzahl_badezimmer"),
+        "year_built": text("baujahr"),
+        "grundstuecksgroesse": text("grundstuecksflaeche"),
+        "energy_class": (text("wertklasse") or "")[:1] or None,  # "A+" -> "A"
+        "contact_phone": text("tel_durchw"),
+        "contact_email": text("email_direkt"),
+    }
+
+
+def iter_openimmo_records(path: str) -> Iterator[Dict[str, Any]]:
+    """<immobilie> elements of an OpenImmo feed, parsed with iterparse"""
+    parents: List[ET.Element] = []
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if _local_name(element.tag) == "immobilie":
+            yield _openimmo_record(element)
+            # 释放已处理的元素，保持内存恒定
+            if parents:
+                parents[-1].remove(element)
+
+
+RECORD_READERS = {
+    "csv": iter_csv_records,
+    "ndjson": iter_ndjson_records,
+    "openimmo": iter_openimmo_records,
+}
+
+
+def _format_validation_error(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()]
+
+
+class PropertyImportJob:
+    """Imports a listing file into the properties table in chunked transactions"""
+
+    def __init__(
+        self,
+        path: str,
+        progress: ImportProgress,
+        owner_id: int = 1,
+        batch_size: int = settings.IMPORT_BATCH_SIZE,
+        max_errors: int = settings.IMPORT_MAX_ERRORS,
+        traceparent: Optional[str] = None,
+        store: Optional[ImportJobStore] = None
+    ):
+        self.path = path
+        self.progress = progress
+        self.owner_id = owner_id
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.traceparent = traceparent  # trace of the request that scheduled the job
+        self.store = store  # where progress is published for other workers (API jobs only)
+
+    async def _publish(self):
+        if self.store is None:
+            return
+        try:
+            await self.store.save(self.owner_id, self.progress)
+        except Exception as e:
+            # 进度写不出去不影响导入本身
+            logger.warning("Publishing progress of import %s failed: %s", self.progress.job_id, e)
+
+    def _record_error(self, row: int, errors: List[str]):
+        self.progress.failed += 1
+        if len(self.progress.errors) < self.max_errors:
+            self.progress.errors.append(ImportRowError(row=row, errors=errors))
+
+    def _validate(self, row: int, record: Any) -> Optional[PropertyCreate]:
+        if isinstance(record, Exception):
+            self._record_error(row, [str(record)])
+            return None
+        try:
+            return PropertyCreate.model_validate(record)
+        except ValidationError as e:
+            self._record_error(row, _format_validation_error(e))
+            return None
+
+    async def _insert_batch(self, first_row: int, records: List[Any]):
+        """Validate one batch and insert the valid rows in a single transaction"""
+        validated = [(first_row + offset, self._validate(first_row + offset, record)) for offset, record in enumerate(records)]
+        validated = [(row, data) for row, data in validated if data is not None]
+        if not validated:
+            return
+
+        async with new_session() as session:
+            geocoding_service = GeocodingService(session)
+            rows = []
+            for row, data in validated:
+                row_values = {key: value for key, value in data.model_dump().items() if key in PROPERTY_COLUMNS}
+                row_values.update(await geocoding_service.locate(data.plz, data.city, data.address))
+                row_values["owner_id"] = self.owner_id
+                rows.append((row, row_values))
+            self.progress.imported += await self._insert_rows(session, rows)
+
+    async def _insert_rows(self, session, rows: List[Tuple[int, Dict[str, Any]]]) -> int:
+        """Insert rows in one transaction, returning how many were inserted
+
+        When the transaction fails the rows are split in half and retried, so
+        a constraint violation only marks the offending rows as failed.
+        """
+        try:
+            # executemany: batched multi-row INSERTs in one round trip per page of rows
+            await session.execute(insert(Property), [values for _, values in rows])
+            await session.commit()
+            return len(rows)
+        except Exception as e:
+            await session.rollback()
+            if len(rows) == 1:
+                # DBAPI 错误只保留驱动的消息，不带整条 SQL
+                self._record_error(rows[0][0], [f"Insert failed: {getattr(e, 'orig', None) or e}"])
+                return 0
+        middle = len(rows) // 2
+        return await self._insert_rows(session, rows[:middle]) + await self._insert_rows(session, rows[middle:])
+
+    async def run(self) -> ImportProgress:
+        """Import the whole file and return the final progress"""
+        with trace_job("import.run", self.traceparent, **{"import.job_id": self.progress.job_id, "import.format": self.progress.format}) as job_span:
+            self.progress.status = "running"
+            self.progress.started_at = datetime.utcnow()
+            await self._publish()
+            try:
+                records = RECORD_READERS[self.progress.format](self.path)
+                row = 1
+                while True:
+                    # 解析是同步 IO，放到线程里避免阻塞事件循环
+                    with span("import.parse"):
+                        batch = await asyncio.to_thread(lambda: list(islice(records, self.batch_size)))
+                    if not batch:
+                        break
+                    with span("import.batch", **{"import.first_row": row, "import.rows": len(batch)}):
+                        await self._insert_batch(row, batch)
+                    row += len(batch)
+                    self.progress.processed += len(batch)
+                    await self._publish()
+                self.progress.status = "completed"
+            except Exception as e:
+                self.progress.status = "failed"
+                self.progress.error = str(e)
+            self.progress.finished_at = datetime.utcnow()
+            await self._publish()
+            job_span.set_attribute("import.status", self.progress.status)
+            job_span.set_attribute("import.imported", self.progress.imported)
+            job_span.set_attribute("import.failed", self.progress.failed)
+        return self.progress
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Import properties from CSV, NDJSON or OpenImmo XML")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--owner-id", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    progress = ImportProgress(job_id=os.path.basename(args.path), format=args.format or detect_format(args.path))
+    job = PropertyImportJob(args.path, progress, owner_id=args.owner_id, batch_size=args.batch_size)
+
+    async def run_and_dispose() -> ImportProgress:
+        try:
+            return await job.run()
+        finally:
+            await dispose_db()
+            shutdown_tracing()
+
+    result = asyncio.run(run_and_dispose())
+    print(json.dumps(result.model_dump(mode="json"), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,24 +6,71 @@ Main application entry point
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import uvicorn
+from fastapi.responses import PlainTextResponse
 import os
-from contextlib import asynccontextmanager
+import logging
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
+from app.core.config import settings
+from app.core.database import init_db, dispose_db
+from app.core.http_metrics import RequestMetricsMiddleware
+from app.core.logs import RequestIdMiddleware, configure_logging
+from app.core.metrics import MultiprocessMetrics, registry
+from app.core.passwords import shutdown_hashing
+from app.core.profiling import RequestProfilingMiddleware
+from app.core.serialization import ORJSONResponse
+from app.core.tracing import TracingMiddleware, shutdown_tracing
 from app.routes.routers import router
 
+configure_logging()
+logger = logging.getLogger("app")
+
+# Snapshots of all workers for /metrics when the server runs several of them
+multiprocess_metrics = (
+    MultiprocessMetrics(registry, settings.METRICS_MULTIPROCESS_DIR) if settings.METRICS_MULTIPROCESS_DIR else None
+)
+
+
+async def flush_metrics():
+    """Write this worker's metrics snapshot every METRICS_FLUSH_INTERVAL seconds"""
+    while True:
+        try:
+            await asyncio.to_thread(multiprocess_metrics.write)
+        except Exception as e:
+            logger.warning("Writing the metrics snapshot failed: %s", e)
+        await asyncio.sleep(settings.METRICS_FLUSH_INTERVAL)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
-    print("🚀 Starting Property Expose Generator Backend...")
+    logger.info("Starting Property Expose Generator Backend")
     
-    print("✅ Backend started successfully (database disabled for testing)")
+    if settings.DATABASE_ENABLED:
+        try:
+            await init_db()
+            logger.info("Database pool warmed up (%d connections)", settings.DB_POOL_WARMUP)
+        except Exception as e:
+            # 数据库暂不可用时不阻止启动，首个请求会重新建立连接
+            logger.warning("Database warm-up failed: %s", e)
+        logger.info("Backend started successfully")
+    else:
+        logger.info("Backend started successfully (database disabled for testing)")
+    flush_task = asyncio.create_task(flush_metrics()) if multiprocess_metrics else None
     yield
     
     # Shutdown
-    print("🛑 Shutting down Property Expose Generator Backend...")
+    logger.info("Shutting down Property Expose Generator Backend")
+    if flush_task is not None:
+        flush_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await flush_task
+        multiprocess_metrics.remove()
+    await dispose_db()
+    shutdown_hashing()
+    shutdown_tracing()
 
 
 # Create FastAPI app instance
@@ -33,6 +80,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -45,9 +93,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Timing breakdown, slow-request log and opt-in profiling for every request
+app.add_middleware(RequestProfilingMiddleware)
+
+# Server span per request, continuing an incoming traceparent (only installed when tracing is on)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+# Request id in X-Request-ID and on every log record of the request
+app.add_middleware(RequestIdMiddleware)
+
+# Per-route request counts and latency for /metrics (outermost, so it sees the full response)
+app.add_middleware(RequestMetricsMiddleware)
+
 # Mount static files for uploaded images - 使用绝对路径
 static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
-print(f"Static files directory: {static_dir}")
+logger.debug("Static files directory: %s", static_dir)
+# Only runtime output (uploads, image cache, job files) lives there, so it is not in the repository
+os.makedirs(static_dir, exist_ok=True)
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 # Include API routers
@@ -60,11 +123,29 @@ async def health_check():
     return {"status": "healthy", "service": "property-expose-backend"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics endpoint (all workers, labelled by worker pid, when running several)"""
+    if multiprocess_metrics is not None:
+        body = await asyncio.to_thread(multiprocess_metrics.render)
+    else:
+        body = registry.render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
+    if settings.DEBUG:
+        import uvicorn
+        
+        # 开发模式：单进程自动重载
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=True,
+            log_level="info"
+        )
+    else:
+        from app.server import run
+        
+        run()
@@ -1,5 +1,4 @@
 import os
-from langchain_openai import AzureChatOpenAI
 from component.llm import LLMBase
 from component.llm.prompts import BESCHREIBUNG_PROMPT_DE, LOCATION_PROMPT_DE
 from app.schemas.property import PropertyCreate
@@ -12,6 +11,9 @@ AZURE_OPENAI_API_VERSION = "2024-08-01-preview"
 
 class AzureOpenAILLM(LLMBase):
     def __init__(self):
+        # langchain is heavy; only import it when an Azure LLM is actually built
+        from langchain_openai import AzureChatOpenAI
+        
         self._llm = AzureChatOpenAI(
             azure_deployment="gpt4o",
             openai_api_version="2024-08-01-preview",
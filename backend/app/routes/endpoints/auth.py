@@ -2,12 +2,15 @@
 Authentication routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth import get_current_user
 from app.core.database import get_db
-from app.schemas.auth import UserCreate, UserLogin, TokenResponse
+from app.core.passwords import PasswordHashingBusy
+from app.core.rate_limit import enforce_auth_rate_limit, too_many_requests
+from app.schemas.auth import PasswordChangeRequest, RefreshTokenRequest, UserCreate, UserLogin, UserResponse, TokenResponse
 from app.services.auth_service import AuthService
 
 router = APIRouter()
@@ -15,14 +18,17 @@ router = APIRouter()
 
 @router.post("/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
 async def register(
+    request: Request,
     user_data: UserCreate,
     db: AsyncSession = Depends(get_db)
 ):
     """Register a new user"""
+    await enforce_auth_rate_limit(request)
     try:
         auth_service = AuthService(db)
-        token = await auth_service.register_user(user_data)
-        return TokenResponse(access_token=token, token_type="bearer")
+        return await auth_service.register_user(user_data)
+    except PasswordHashingBusy as e:
+        raise too_many_requests(1, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -32,23 +38,93 @@ async def register(
 
 @router.post("/login", response_model=TokenResponse)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
 ):
     """Login user"""
+    await enforce_auth_rate_limit(request, form_data.username)
     try:
         auth_service = AuthService(db)
-        token = await auth_service.authenticate_user(form_data.username, form_data.password)
-        if not token:
+        tokens = await auth_service.authenticate_user(form_data.username, form_data.password)
+        if not tokens:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password"
             )
-        return TokenResponse(access_token=token, token_type="bearer")
+        return tokens
     except HTTPException:
         raise
+    except PasswordHashingBusy as e:
+        raise too_many_requests(1, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(
+    request: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Exchange a refresh token for a new access/refresh token pair"""
+    auth_service = AuthService(db)
+    tokens = await auth_service.refresh_tokens(request.refresh_token)
+    if not tokens:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return tokens
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Revoke a refresh token (the short-lived access token expires on its own)"""
+    auth_service = AuthService(db)
+    await auth_service.logout(request.refresh_token)
+
+
+@router.post("/password", status_code=status.HTTP_204_NO_CONTENT)
+async def change_password(
+    request: Request,
+    password_data: PasswordChangeRequest,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Change the current user's password; all of its refresh tokens are revoked"""
+    await enforce_auth_rate_limit(request, current_user.username)
+    try:
+        auth_service = AuthService(db)
+        changed = await auth_service.change_password(
+            current_user.username, password_data.current_password, password_data.new_password
+        )
+    except PasswordHashingBusy as e:
+        raise too_many_requests(1, detail=str(e))
+    if not changed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Current password is incorrect"
+        )
+
+
+@router.get("/me", response_model=UserResponse)
+async def read_current_user(current_user: UserResponse = Depends(get_current_user)):
+    """Current authenticated user"""
+    return current_user
+
+
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate_current_user(
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Deactivate the current account; its tokens stop working immediately"""
+    auth_service = AuthService(db)
+    await auth_service.set_user_active(current_user.username, False)
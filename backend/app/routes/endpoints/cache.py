@@ -2,19 +2,31 @@
 Cache management routes for temporary property data and images
 """
 
-from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Request, status, UploadFile, File, Form
 from typing import List
 import uuid
 import json
+import logging
 import os
 from datetime import datetime
 
+from app.core.http_cache import CACHE_PRIVATE, conditional_json_response, strong_etag
+from app.core.metrics import memory_store_entries, registry, upload_bytes
+
 # 临时存储（在实际生产环境中应该使用Redis）
 property_cache = {}
 image_cache = {}
 
+
+@registry.collector
+def _collect_store_sizes():
+    memory_store_entries.set(len(property_cache), store="property_cache")
+    memory_store_entries.set(sum(len(images) for images in list(image_cache.values())), store="image_cache")
+
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 
 @router.post("/property-data", status_code=status.HTTP_201_CREATED)
 async def cache_property_data(property_data: dict):
@@ -40,7 +52,7 @@ async def cache_property_data(property_data: dict):
 
 
 @router.get("/property-data/{property_id}")
-async def get_cached_property_data(property_id: str):
+async def get_cached_property_data(request: Request, property_id: str):
     """Get cached property data"""
     try:
         if property_id not in property_cache:
@@ -49,7 +61,9 @@ async def get_cached_property_data(property_id: str):
                 detail="Property data not found in cache"
             )
         
-        return property_cache[property_id]
+        cached = property_cache[property_id]
+        etag = strong_etag(f"{property_id}-{cached['updated_at']}")
+        return conditional_json_response(request, cached, CACHE_PRIVATE, etag=etag)
     except HTTPException:
         raise
     except Exception as e:
@@ -67,10 +81,10 @@ async def cache_property_images(
 ):
     """Cache property images temporarily"""
     try:
-        print(f"Received request for property_id: {property_id}")
-        print(f"Number of images: {len(images) if images else 0}")
-        print(f"Image categories: {image_categories}")
-        print(f"Image categories type: {type(image_categories)}")
+        logger.debug(
+            "Caching %d images for property %s, categories: %s",
+            len(images) if images else 0, property_id, image_categories
+        )
         
         # 验证输入参数
         if not property_id:
@@ -86,7 +100,7 @@ async def cache_property_images(
             )
         
         if property_id not in property_cache:
-            print(f"Property {property_id} not found in cache. Available properties: {list(property_cache.keys())}")
+            logger.info("Property %s not found in cache (%d cached properties)", property_id, len(property_cache))
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Property data not found in cache"
@@ -113,15 +127,16 @@ async def cache_property_images(
             try:
                 # 读取上传的文件内容
                 content = await image.read()
+                upload_bytes.inc(len(content), kind="cached_image")
                 
                 # 写入到文件系统
                 with open(file_path, "wb") as f:
                     f.write(content)
                 
-                print(f"Saved image: {file_path}")
+                logger.debug("Saved image: %s", file_path)
                 
             except Exception as e:
-                print(f"Error saving image {filename}: {str(e)}")
+                logger.warning("Error saving image %s: %s", filename, e)
                 continue
             
             # 生成图片URL（相对于静态文件根目录）
@@ -132,7 +147,7 @@ async def cache_property_images(
             if image_categories and i < len(image_categories) and image_categories[i].strip():
                 category = image_categories[i].strip()
 
-            print(f"Processing image {i}: category={category}")  # 添加调试日志
+            logger.debug("Processing image %d: category=%s", i, category)
             
             image_data = {
                 "id": str(uuid.uuid4()),
@@ -2,12 +2,18 @@
 Expose generation routes for creating professional property presentations
 """
 
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Request, status, BackgroundTasks
 from fastapi.responses import Response
 import uuid
 from datetime import datetime
 import asyncio
+import logging
 import os
+import time
+
+from app.core.http_cache import CACHE_PRIVATE, conditional_json_response
+from app.core.metrics import memory_store_entries, registry, work_queue_depth
+from app.core.tracing import current_traceparent, span, trace_job
 
 # 临时存储（在实际生产环境中应该使用Redis或数据库）
 expose_status = {}
@@ -18,6 +24,23 @@ from .cache import property_cache, image_cache
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+expose_stage_duration = registry.histogram(
+    "expose_stage_duration_seconds", "Time spent in each exposé generation stage"
+)
+expose_jobs = registry.counter(
+    "expose_jobs_total", "Finished exposé generation jobs by outcome (completed, failed)"
+)
+
+
+@registry.collector
+def _collect_expose_stores():
+    statuses = [entry.get("status") for entry in list(expose_status.values())]
+    memory_store_entries.set(len(statuses), store="expose_status")
+    memory_store_entries.set(len(expose_preview_data), store="expose_preview_data")
+    work_queue_depth.set(sum(1 for s in statuses if s in ("pending", "processing")), queue="expose")
+
 
 @router.post("/generate/{property_id}", status_code=status.HTTP_201_CREATED)
 async def generate_expose(
@@ -28,8 +51,6 @@ async def generate_expose(
     try:
         # 清除之前的expose状态（保留当前房源数据）
         await clear_previous_expose_data()
-        print(f"Cleared previous expose data for new generation")
-        
         # 生成expose ID
         expose_id = str(uuid.uuid4())
         
@@ -48,7 +69,8 @@ async def generate_expose(
         background_tasks.add_task(
             simulate_expose_generation,
             expose_id,
-            property_id
+            property_id,
+            current_traceparent()
         )
         
         return {
@@ -84,7 +106,7 @@ async def get_expose_status(expose_id: str):
 
 
 @router.get("/preview/{expose_id}")
-async def get_expose_preview(expose_id: str):
+async def get_expose_preview(request: Request, expose_id: str):
     """Get expose preview data"""
     try:
         if expose_id not in expose_preview_data:
@@ -93,7 +115,7 @@ async def get_expose_preview(expose_id: str):
                 detail="Expose preview not found"
             )
         
-        return expose_preview_data[expose_id]
+        return conditional_json_response(request, expose_preview_data[expose_id], CACHE_PRIVATE)
     except HTTPException:
         raise
     except Exception as e:
@@ -132,17 +154,22 @@ async def clear_previous_expose_data():
         
         # 不要删除图片文件，因为它们是房源数据的一部分
         # 图片文件应该由专门的清理任务或过期机制来管理
-        print("Previous expose data cleared successfully (images preserved)")
+        logger.debug("Previous expose data cleared (images preserved)")
     except Exception as e:
-        print(f"Error clearing previous expose data: {e}")
+        logger.warning("Error clearing previous expose data: %s", e)
 
 
-async def simulate_expose_generation(expose_id: str, property_id: str):
+async def simulate_expose_generation(expose_id: str, property_id: str, traceparent: str = None):
     """Simulate the expose generation process"""
+    with trace_job("expose.generate", traceparent, **{"expose.id": expose_id, "property.id": property_id}):
+        await _generate_expose(expose_id, property_id)
+
+
+async def _generate_expose(expose_id: str, property_id: str):
     try:
         # 确保expose_status中存在这个expose_id的记录
         if expose_id not in expose_status:
-            print(f"Warning: expose_id {expose_id} not found in expose_status, creating new entry")
+            logger.warning("Expose %s not found in expose_status, creating new entry", expose_id)
             expose_status[expose_id] = {
                 "id": expose_id,
                 "propertyId": property_id,
@@ -157,22 +184,25 @@ async def simulate_expose_generation(expose_id: str, property_id: str):
         expose_status[expose_id]["status"] = "processing"
         expose_status[expose_id]["progress"] = 10
         
-        # 模拟处理步骤
+        # 模拟处理步骤 (stage key for metrics, display name, progress)
         steps = [
-            ("分析房源数据", 20),
-            ("优化图片质量", 40),
-            ("生成描述文本", 60),
-            ("应用专业模板", 80),
-            ("生成最终文档", 100)
+            ("analyze", "分析房源数据", 20),
+            ("images", "优化图片质量", 40),
+            ("text", "生成描述文本", 60),
+            ("template", "应用专业模板", 80),
+            ("render", "生成最终文档", 100)
         ]
         
-        for step_name, progress in steps:
-            # 模拟处理时间
-            await asyncio.sleep(2)
+        for stage, step_name, progress in steps:
+            stage_start = time.perf_counter()
+            with span(f"expose.{stage}"):
+                # 模拟处理时间
+                await asyncio.sleep(2)
+            expose_stage_duration.observe(time.perf_counter() - stage_start, stage=stage)
             
             # 更新进度
             expose_status[expose_id]["progress"] = progress
-            print(f"Expose {expose_id}: {step_name} - {progress}%")
+            logger.debug("Expose %s: %s - %d%%", expose_id, step_name, progress)
         
         # 完成
         expose_status[expose_id]["status"] = "completed"
@@ -237,17 +267,19 @@ async def simulate_expose_generation(expose_id: str, property_id: str):
             ]
         }
         
-        print(f"Expose {expose_id} generation completed successfully")
-        print(f"Preview data: {expose_preview_data[expose_id]}")
+        expose_jobs.inc(outcome="completed")
+        logger.info("Expose %s generation completed", expose_id)
+        logger.debug("Preview data for %s: %s", expose_id, expose_preview_data[expose_id])
         
     except Exception as e:
-        print(f"Error generating expose {expose_id}: {str(e)}")
+        expose_jobs.inc(outcome="failed")
+        logger.exception("Error generating expose %s", expose_id)
         # 确保expose_status存在再更新状态
         if expose_id in expose_status:
             expose_status[expose_id]["status"] = "failed"
             expose_status[expose_id]["progress"] = 0
         else:
-            print(f"Could not update status for {expose_id} - not found in expose_status")
+            logger.warning("Could not update status for %s - not found in expose_status", expose_id)
 
 
 async def cleanup_expired_images(property_id: str = None):
@@ -271,9 +303,9 @@ async def cleanup_expired_images(property_id: str = None):
                         try:
                             if os.path.isfile(file_path):
                                 os.remove(file_path)
-                                print(f"Deleted expired image: {filename}")
+                                logger.debug("Deleted expired image: %s", filename)
                         except Exception as e:
-                            print(f"Error deleting expired image {filename}: {e}")
+                            logger.warning("Error deleting expired image %s: %s", filename, e)
         else:
             # 清理所有不在缓存中的图片文件
             all_cached_filenames = set()
@@ -287,13 +319,13 @@ async def cleanup_expired_images(property_id: str = None):
                     try:
                         if os.path.isfile(file_path):
                             os.remove(file_path)
-                            print(f"Deleted orphaned image: {filename}")
+                            logger.debug("Deleted orphaned image: %s", filename)
                     except Exception as e:
-                        print(f"Error deleting orphaned image {filename}: {e}")
+                        logger.warning("Error deleting orphaned image %s: %s", filename, e)
         
-        print("Image cleanup completed successfully")
+        logger.info("Image cleanup completed")
     except Exception as e:
-        print(f"Error during image cleanup: {e}")
+        logger.warning("Error during image cleanup: %s", e)
 
 
 # 添加一个定期清理任务（可选）
@@ -303,7 +335,7 @@ async def schedule_image_cleanup():
         # 清理超过24小时的过期图片
         await cleanup_expired_images()
     except Exception as e:
-        print(f"Error in scheduled image cleanup: {e}")
+        logger.warning("Error in scheduled image cleanup: %s", e)
 
 
 @router.get("/download/{expose_id}")
@@ -2,11 +2,12 @@
 Image management routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.core.database import get_db
+from app.core.http_cache import CACHE_SHORT, conditional_json_response
 from app.schemas.image import ImageResponse
 from app.services.image_service import ImageService
 
@@ -23,7 +24,7 @@ async def upload_image(
     try:
         image_service = ImageService(db)
         image_obj = await image_service.upload_image(property_id, file)
-        return ImageResponse.from_orm(image_obj)
+        return ImageResponse.model_validate(image_obj)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -33,14 +34,15 @@ async def upload_image(
 
 @router.get("/{property_id}", response_model=List[ImageResponse])
 async def get_property_images(
+    request: Request,
     property_id: int,
     db: AsyncSession = Depends(get_db)
 ):
     """Get all images for a property"""
     try:
         image_service = ImageService(db)
-        images = await image_service.get_property_images(property_id)
-        return [ImageResponse.from_orm(img) for img in images]
+        images = await image_service.get_property_images_response(property_id)
+        return conditional_json_response(request, images, CACHE_SHORT)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
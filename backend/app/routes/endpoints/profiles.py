@@ -0,0 +1,31 @@
+"""
+Stored request profile routes (see app.core.profiling)
+"""
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import FileResponse
+from typing import Optional
+import re
+
+from app.core.profiling import is_profiling_token, profile_path
+
+router = APIRouter()
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, x_profile_token: Optional[str] = Header(None)):
+    """Download a stored profile; requires the profiling token in X-Profile-Token
+
+    (A separate header from X-Profile, so fetching a profile is not profiled itself.)
+    """
+    # 没有令牌时与不存在的 profile 返回相同的 404，不暴露该接口
+    path = profile_path(profile_id) if PROFILE_ID_PATTERN.match(profile_id) and is_profiling_token(x_profile_token) else None
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    media_type = "text/html" if path.endswith(".html") else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=f"profile-{profile_id}{path[path.rfind('.'):]}")
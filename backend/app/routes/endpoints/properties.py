@@ -2,28 +2,66 @@
 Property management routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Dict, List, Optional
+from datetime import datetime
 import json
+import os
+import uuid
 
+from app.core.auth import get_current_user, get_optional_user
+from app.core.config import settings
 from app.core.database import get_db, Property, PropertyImage
-from app.schemas.property import PropertyCreate, PropertyUpdate, PropertyResponse, LocationDescriptionRequest
+from app.core.http_cache import CACHE_REVALIDATE, conditional_json_response, strong_etag
+from app.core.metrics import memory_store_entries, registry, upload_bytes, work_queue_depth
+from app.core.serialization import ORJSONResponse, list_adapter
+from app.core.tracing import current_traceparent
+from app.jobs.property_import import IMPORT_FORMATS, ImportJobStore, ImportProgress, PropertyImportJob, detect_format
+from app.schemas.property import (
+    PropertyCreate,
+    PropertyUpdate,
+    PropertyResponse,
+    PropertyDetailResponse,
+    PropertyListItem,
+    PropertyPage,
+    LocationDescriptionRequest
+)
+from app.schemas.auth import UserResponse
+from app.services.export_service import EXPORT_FORMATS, ExportService
 from app.services.property_service import PropertyService
 
 router = APIRouter()
 
+MAX_DETAIL_IDS = 100
+
+# Import jobs running in this worker by job id; progress for all workers is in import_store
+import_jobs: Dict[str, PropertyImportJob] = {}
+import_store = ImportJobStore()
+
+IMPORT_CHUNK_SIZE = 1024 * 1024
+
+
+@registry.collector
+def _collect_import_jobs():
+    jobs = [job.progress for job in list(import_jobs.values())]
+    memory_store_entries.set(len(jobs), store="import_jobs")
+    work_queue_depth.set(sum(1 for job in jobs if job.status in ("pending", "running")), queue="import")
+
 
 @router.post("/", response_model=PropertyResponse, status_code=status.HTTP_201_CREATED)
 async def create_property(
     property_data: PropertyCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[UserResponse] = Depends(get_optional_user)
 ):
-    """Create a new property"""
+    """Create a new property (owned by the authenticated user, if any)"""
     try:
         property_service = PropertyService(db)
-        property_obj = await property_service.create_property(property_data)
-        return PropertyResponse.from_orm(property_obj)
+        owner_id = current_user.id if current_user else 1
+        property_obj = await property_service.create_property(property_data, owner_id=owner_id)
+        return PropertyResponse.model_validate(property_obj)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -31,17 +69,178 @@ async def create_property(
         )
 
 
-@router.get("/", response_model=List[PropertyResponse])
+async def _run_import(job: PropertyImportJob):
+    """Run an import job in the background and remove its upload afterwards"""
+    try:
+        await job.run()
+    finally:
+        import_jobs.pop(job.progress.job_id, None)
+        if os.path.exists(job.path):
+            os.remove(job.path)
+
+
+@router.post("/import", response_model=ImportProgress, status_code=status.HTTP_202_ACCEPTED)
+async def import_properties(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Start a bulk import of a CSV, NDJSON or OpenImmo XML file into the authenticated user's account
+    
+    Poll GET /properties/import/{job_id} for progress and per-row errors.
+    """
+    try:
+        import_format = format or detect_format(file.filename or "")
+        if import_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format: {import_format}")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    try:
+        # Spool the upload to disk in chunks so large files never sit in memory
+        job_id = str(uuid.uuid4())
+        os.makedirs(settings.IMPORT_DIR, exist_ok=True)
+        path = os.path.join(settings.IMPORT_DIR, f"{job_id}.{import_format}")
+        with open(path, "wb") as buffer:
+            while chunk := await file.read(IMPORT_CHUNK_SIZE):
+                buffer.write(chunk)
+                upload_bytes.inc(len(chunk), kind="import")
+        
+        await import_store.prune()
+        progress = ImportProgress(job_id=job_id, format=import_format)
+        job = PropertyImportJob(
+            path, progress, owner_id=current_user.id, traceparent=current_traceparent(), store=import_store
+        )
+        # Published before responding, so a poll that reaches another worker finds the job
+        await import_store.save(current_user.id, progress)
+        import_jobs[job_id] = job
+        background_tasks.add_task(_run_import, job)
+        return progress
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/import/{job_id}", response_model=ImportProgress)
+async def get_import_progress(job_id: str, current_user: UserResponse = Depends(get_current_user)):
+    """Get the progress of one of the authenticated user's bulk imports (from any worker)"""
+    stored = await import_store.load(job_id)
+    # 别人的任务也返回 404，不暴露任务是否存在
+    if stored is None or stored.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+    return stored.progress
+
+
+@router.get("/export")
+async def export_properties(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|zip)$"),
+    status_: Optional[str] = Query(None, alias="status"),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Stream the authenticated user's properties as NDJSON, CSV or a ZIP including image files"""
+    export_service = ExportService(owner_id=current_user.id, status=status_)
+    filename = f"properties-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        export_service.stream(format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/", response_model=PropertyPage)
 async def get_properties(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get properties newest first, paginated with an opaque cursor
+
+    Deprecated: requests with ?skip= still get the old response, a plain list
+    of full properties in id order paginated with OFFSET, marked with a
+    Deprecation header. Clients should move to the cursor pages.
+    """
+    try:
+        property_service = PropertyService(db)
+        if skip is not None:
+            properties = await property_service.get_properties_offset(skip=skip, limit=limit)
+            adapter = list_adapter(PropertyResponse)
+            return ORJSONResponse(
+                adapter.dump_python(adapter.validate_python(properties), mode="json"),
+                headers={"Deprecation": "true"}
+            )
+        rows, next_cursor = await property_service.get_properties(limit=limit, cursor=cursor)
+        page = PropertyPage(
+            items=list_adapter(PropertyListItem).validate_python(rows),
+            next_cursor=next_cursor
+        )
+        return conditional_json_response(request, page, CACHE_REVALIDATE)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/details", response_model=List[PropertyDetailResponse])
+async def get_properties_details(
+    ids: List[int] = Query(...),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all properties with pagination"""
+    """Get several properties with images and exposes (e.g. ?ids=1&ids=2)
+
+    Validated once with the cached list adapter and returned as a response,
+    so FastAPI does not validate the list a second time against response_model.
+    """
+    if len(ids) > MAX_DETAIL_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_DETAIL_IDS} ids per request"
+        )
     try:
         property_service = PropertyService(db)
-        properties = await property_service.get_properties(skip=skip, limit=limit)
-        return [PropertyResponse.from_orm(p) for p in properties]
+        properties = await property_service.get_properties_details(ids)
+        adapter = list_adapter(PropertyDetailResponse)
+        return ORJSONResponse(adapter.dump_python(adapter.validate_python(properties), mode="json"))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/{property_id}/details", response_model=PropertyDetailResponse)
+async def get_property_details(
+    property_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a property together with its images and exposes in one request"""
+    try:
+        property_service = PropertyService(db)
+        property_obj = await property_service.get_property_details(property_id)
+        if not property_obj:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Property not found"
+            )
+        return ORJSONResponse(PropertyDetailResponse.model_validate(property_obj))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -51,19 +250,23 @@ async def get_properties(
 
 @router.get("/{property_id}", response_model=PropertyResponse)
 async def get_property(
+    request: Request,
     property_id: int,
     db: AsyncSession = Depends(get_db)
 ):
     """Get a specific property by ID"""
     try:
         property_service = PropertyService(db)
-        property_obj = await property_service.get_property(property_id)
-        if not property_obj:
+        property_response = await property_service.get_property_response(property_id)
+        if not property_response:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Property not found"
             )
-        return PropertyResponse.from_orm(property_obj)
+        # The version counter identifies the representation, so a matching
+        # If-None-Match is answered without encoding the body
+        etag = strong_etag(f"property-{property_id}-v{property_response.version}")
+        return conditional_json_response(request, property_response, CACHE_REVALIDATE, etag=etag)
     except HTTPException:
         raise
     except Exception as e:
@@ -88,7 +291,7 @@ async def update_property(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Property not found"
             )
-        return PropertyResponse.from_orm(property_obj)
+        return PropertyResponse.model_validate(property_obj)
     except HTTPException:
         raise
     except Exception as e:
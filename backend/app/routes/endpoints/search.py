@@ -0,0 +1,150 @@
+"""
+Property search routes
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.core.database import get_db
+from app.schemas.search import PropertyNearbyHit, PropertySearchFilters, PropertySearchHit, PropertySearchResponse
+from app.services.property_service import PropertyService
+from app.services.search_service import SearchService
+
+router = APIRouter()
+
+
+@router.get("/fulltext", response_model=List[PropertySearchHit])
+async def full_text_search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """Ranked full-text search with highlighted snippets"""
+    try:
+        property_service = PropertyService(db)
+        return await property_service.search_properties(q, limit=limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/properties", response_model=PropertySearchResponse)
+async def search_properties(
+    city: Optional[str] = None,
+    plz: Optional[str] = None,
+    property_type: List[str] = Query([]),
+    status_: List[str] = Query([], alias="status"),
+    price_min: Optional[float] = Query(None, ge=0),
+    price_max: Optional[float] = Query(None, ge=0),
+    area_min: Optional[float] = Query(None, ge=0),
+    area_max: Optional[float] = Query(None, ge=0),
+    rooms_min: Optional[int] = Query(None, ge=0),
+    rooms_max: Optional[int] = Query(None, ge=0),
+    year_built_min: Optional[int] = Query(None, ge=1800),
+    year_built_max: Optional[int] = Query(None, le=2030),
+    energy_class: List[str] = Query([]),
+    features: List[str] = Query([], description="Required features, e.g. ?features=balkon&features=aufzug"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Filter properties and return facet counts for every dimension"""
+    try:
+        filters = PropertySearchFilters(
+            city=city,
+            plz=plz,
+            property_type=property_type,
+            status=status_,
+            price_min=price_min,
+            price_max=price_max,
+            area_min=area_min,
+            area_max=area_max,
+            rooms_min=rooms_min,
+            rooms_max=rooms_max,
+            year_built_min=year_built_min,
+            year_built_max=year_built_max,
+            energy_class=energy_class,
+            features=features
+        )
+        search_service = SearchService(db)
+        return await search_service.filtered_search(filters, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/nearby", response_model=List[PropertyNearbyHit])
+async def nearby_properties(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    property_id: Optional[int] = None,
+    radius_km: float = Query(5.0, gt=0, le=100),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Properties within radius_km of a point (lat/lon) or of another property, nearest first"""
+    try:
+        if property_id is not None:
+            property_obj = await PropertyService(db).get_property(property_id)
+            if not property_obj:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Property not found"
+                )
+            if property_obj.latitude is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Property has no coordinates"
+                )
+            lat, lon = property_obj.latitude, property_obj.longitude
+        elif lat is None or lon is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Either lat and lon or property_id is required"
+            )
+
+        search_service = SearchService(db)
+        hits = await search_service.nearby(lat, lon, radius_km, limit=limit + 1)
+        return [hit for hit in hits if hit.id != property_id][:limit]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/bbox", response_model=List[PropertyNearbyHit])
+async def properties_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Properties inside a map viewport, nearest to its centre first"""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_lat/min_lon must not exceed max_lat/max_lon"
+        )
+    try:
+        search_service = SearchService(db)
+        return await search_service.within_bbox(min_lat, min_lon, max_lat, max_lon, limit=limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
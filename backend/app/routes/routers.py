@@ -5,7 +5,9 @@ from .endpoints import (
     cache,
     expose_generation,
     properties,
-    images
+    images,
+    profiles,
+    search
 )
 
 # Create the main router without prefix for root routes
@@ -31,6 +33,8 @@ api_router.include_router(cache.router, prefix="/cache", tags=["cache"])
 api_router.include_router(expose_generation.router, prefix="/expose_generation", tags=["expose_generation"])
 api_router.include_router(properties.router, prefix="/properties", tags=["properties"])
 api_router.include_router(images.router, prefix="/images", tags=["images"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(profiles.router, prefix="/profiles", tags=["profiling"])
 
 # Include the API router in the main router
 router.include_router(api_router) 
\ No newline at end of file
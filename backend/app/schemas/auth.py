@@ -28,7 +28,20 @@ class UserLogin(BaseModel):
 class TokenResponse(BaseModel):
     """Token response model"""
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
+    expires_in: Optional[int] = None  # access token lifetime in seconds
+
+
+class RefreshTokenRequest(BaseModel):
+    """Refresh token exchange model"""
+    refresh_token: str
+
+
+class PasswordChangeRequest(BaseModel):
+    """Password change model"""
+    current_password: str
+    new_password: str = Field(..., min_length=8, max_length=100)
 
 
 class UserResponse(UserBase):
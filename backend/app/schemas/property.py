@@ -2,9 +2,13 @@
 Property data models and schemas
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Optional, List
 from datetime import datetime
+import json
+
+from app.schemas.expose import ExposeResponse
+from app.schemas.image import ImageResponse
 
 class AgentInfo(BaseModel):
     companyLogo: Optional[str] = None
@@ -14,6 +18,31 @@ class AgentInfo(BaseModel):
     phone: str = Field(..., max_length=20)
     userType: str = "agent"
 
+MAX_FEATURES = 50
+
+
+def normalize_features(value: Any) -> Optional[List[str]]:
+    """Coerce features given as list, dict, JSON string or comma list into lower-case names
+    
+    {"balkon": true, "garten": false} -> ["balkon"]; "Balkon, Aufzug" -> ["balkon", "aufzug"]
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.split(",")
+    if isinstance(value, dict):
+        value = [key for key, enabled in value.items() if enabled]
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        raise ValueError("features must be a list of feature names")
+    names = [str(item).strip().lower() for item in value if str(item).strip()]
+    return list(dict.fromkeys(names))
+
+
 class PropertyBase(BaseModel):
     """Base property model"""
     title: str = Field(..., min_length=1, max_length=200)
@@ -56,7 +85,7 @@ class PropertyBase(BaseModel):
     floor: Optional[int] = Field(None, ge=0)  # Floor number
     
     # Features
-    features: Optional[str] = None  # JSON string
+    features: Optional[List[str]] = Field(None, max_length=MAX_FEATURES)  # e.g. ["balkon", "aufzug"]
     energy_class: Optional[str] = Field(None, pattern="^[A-G]$")
     
     # Contact info
@@ -69,6 +98,8 @@ class PropertyBase(BaseModel):
 
     # Agent information (optional)
     agentInfo: Optional[AgentInfo] = None
+    
+    _normalize_features = field_validator("features", mode="before")(normalize_features)
 
 
 class PropertyCreate(PropertyBase):
@@ -118,7 +149,7 @@ class PropertyUpdate(BaseModel):
     floor: Optional[int] = Field(None, ge=0)  # Floor number
     
     # Features
-    features: Optional[str] = Field(None, max_length=500)
+    features: Optional[List[str]] = Field(None, max_length=MAX_FEATURES)
     energy_class: Optional[str] = Field(None, pattern="^[A-G]$")
     
     # Contact info
@@ -128,6 +159,8 @@ class PropertyUpdate(BaseModel):
     contact_person2: Optional[str] = Field(None, max_length=100)
     contact_phone2: Optional[str] = Field(None, max_length=50)
     contact_email2: Optional[str] = Field(None, max_length=255)
+    
+    _normalize_features = field_validator("features", mode="before")(normalize_features)
 
 
 class PropertyResponse(PropertyBase):
@@ -136,6 +169,7 @@ class PropertyResponse(PropertyBase):
     owner_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = 1
     
     class Config:
         from_attributes = True
@@ -143,6 +177,40 @@ class PropertyResponse(PropertyBase):
             datetime: lambda v: v.isoformat()
         }
 
+
+class PropertyDetailResponse(PropertyResponse):
+    """Property with its images and exposes, for rendering a listing page"""
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    images: List[ImageResponse] = []
+    exposes: List[ExposeResponse] = []
+
+
+class PropertyListItem(BaseModel):
+    """Slim property projection used for list pages and cards"""
+    id: int
+    title: str
+    property_type: str
+    status: Optional[str] = None
+    address: str
+    city: str
+    plz: Optional[str] = None
+    price: Optional[float] = None
+    price_type: Optional[str] = None
+    area_sqm: Optional[float] = None
+    rooms: Optional[int] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class PropertyPage(BaseModel):
+    """One page of a keyset-paginated property list"""
+    items: List[PropertyListItem]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to get the next page
+
+
 class LocationDescriptionRequest(BaseModel):
     """Minimal schema for location description generation"""
     city: str = Field(..., min_length=1, max_length=100)
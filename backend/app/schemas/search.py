@@ -0,0 +1,61 @@
+"""
+Search schemas
+"""
+
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+from app.schemas.property import PropertyListItem
+
+
+class PropertySearchHit(BaseModel):
+    """Full-text search result with rank and highlighted snippet"""
+    id: int
+    title: str
+    property_type: str
+    status: Optional[str] = None
+    address: str
+    city: str
+    plz: Optional[str] = None
+    price: Optional[float] = None
+    rank: float
+    snippet: Optional[str] = None  # matched words wrapped in <mark></mark>
+
+
+class PropertySearchFilters(BaseModel):
+    """Filters for the faceted property search"""
+    city: Optional[str] = None
+    plz: Optional[str] = None
+    property_type: List[str] = []
+    status: List[str] = []
+    price_min: Optional[float] = Field(None, ge=0)
+    price_max: Optional[float] = Field(None, ge=0)
+    area_min: Optional[float] = Field(None, ge=0)
+    area_max: Optional[float] = Field(None, ge=0)
+    rooms_min: Optional[int] = Field(None, ge=0)
+    rooms_max: Optional[int] = Field(None, ge=0)
+    year_built_min: Optional[int] = Field(None, ge=1800)
+    year_built_max: Optional[int] = Field(None, le=2030)
+    energy_class: List[str] = []
+    features: List[str] = []  # every listed feature must be present
+
+
+class FacetBucket(BaseModel):
+    """Number of matching properties for one facet value"""
+    value: str
+    count: int
+
+
+class PropertySearchResponse(BaseModel):
+    """Filtered property page with facet counts"""
+    items: List[PropertyListItem]
+    next_cursor: Optional[str] = None
+    total: int
+    facets: Dict[str, List[FacetBucket]]
+
+
+class PropertyNearbyHit(PropertyListItem):
+    """Property with its coordinates and distance from the search centre"""
+    latitude: float
+    longitude: float
+    distance_km: float
@@ -0,0 +1,218 @@
+"""
+Production server launcher
+
+Usage:
+    python -m app.server
+
+Binds one listening socket and runs SERVER_WORKERS uvicorn worker processes
+on it (default: one per available CPU), using uvloop and httptools when
+installed. Each worker retires after SERVER_MAX_REQUESTS requests (plus a
+random jitter, so workers do not restart together) and the supervisor starts
+a replacement. On SIGTERM/SIGINT every worker stops accepting connections,
+finishes in-flight requests and background work such as running exposé
+jobs, and exits; workers still busy after SERVER_GRACEFUL_TIMEOUT are killed.
+
+A worker that fails within WORKER_MIN_UPTIME of starting (e.g. a broken
+import or config) is restarted with exponential backoff; after
+MAX_STARTUP_FAILURES such failures in a row the server shuts down and exits
+with status 1 instead of restarting it forever.
+
+Metrics are kept per worker too: with several workers the launcher points
+METRICS_MULTIPROCESS_DIR at a fresh temporary directory (unless set), and a
+scrape of /metrics on the shared port returns every worker's series with a
+worker="<pid>" label.
+
+Note that the temporary in-memory stores (cache routes, exposé status,
+import progress) are per worker process. Cache invalidations only reach
+other workers through Redis, so with several workers and
+CACHE_REDIS_ENABLED off the in-process cache tier is disabled.
+"""
+
+from multiprocessing.context import SpawnProcess
+from typing import List, Optional
+import copy
+import glob
+import importlib.util
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from uvicorn import Config, Server
+from uvicorn._subprocess import get_subprocess
+
+from app.core.config import settings
+from app.core.logs import configure_logging
+
+logger = logging.getLogger("app.server")
+
+SUPERVISE_INTERVAL = 0.5  # seconds between worker liveness checks
+WORKER_MIN_UPTIME = 10.0  # a worker failing sooner than this counts as a failed start
+RESPAWN_BACKOFF_MAX = 30.0  # seconds, cap of the doubling delay after failed starts
+MAX_STARTUP_FAILURES = 5  # failed starts in a row before the server gives up
+
+
+def worker_count() -> int:
+    """SERVER_WORKERS, or the number of CPUs this process may run on"""
+    if settings.SERVER_WORKERS > 0:
+        return settings.SERVER_WORKERS
+    if hasattr(os, "sched_getaffinity"):
+        # 容器里 CPU 配额可能小于宿主机核数
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def build_config() -> Config:
+    """uvicorn configuration shared by all workers"""
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    if loop != "uvloop" or http != "httptools":
+        logger.warning("uvloop/httptools not installed, falling back to loop=%s http=%s", loop, http)
+    return Config(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        loop=loop,
+        http=http,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        log_level="debug" if settings.DEBUG else "info",
+        # uvicorn's loggers propagate to the queued handlers set up by the app
+        log_config=None,
+    )
+
+
+class Supervisor:
+    """Keeps a fixed number of worker processes serving one socket"""
+
+    def __init__(self, config: Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.processes: List[Optional[SpawnProcess]] = []  # None while a slot waits out its backoff
+        self.started_at: List[float] = []
+        self.failures: List[int] = []  # consecutive failed starts per slot
+        self.respawn_at: List[float] = []
+        self.socket: Optional[socket.socket] = None
+        self.should_exit = threading.Event()
+        self.exit_code = 0
+
+    def _spawn(self) -> SpawnProcess:
+        config = copy.copy(self.config)
+        if settings.SERVER_MAX_REQUESTS > 0:
+            config.limit_max_requests = settings.SERVER_MAX_REQUESTS + random.randint(0, settings.SERVER_MAX_REQUESTS_JITTER)
+        process = get_subprocess(config, target=Server(config).run, sockets=[self.socket])
+        process.start()
+        return process
+
+    def _start(self, index: int):
+        self.processes[index] = self._spawn()
+        self.started_at[index] = time.monotonic()
+
+    def _handle_exit(self, sig, frame):
+        self.should_exit.set()
+
+    def _worker_exited(self, index: int, process: SpawnProcess):
+        """Restart a worker that exited: at once after a normal run, with backoff after a failed start"""
+        uptime = time.monotonic() - self.started_at[index]
+        if process.exitcode != 0 and uptime < WORKER_MIN_UPTIME:
+            self.failures[index] += 1
+        else:
+            self.failures[index] = 0
+
+        if self.failures[index] >= MAX_STARTUP_FAILURES:
+            logger.error(
+                "Worker %s exited with code %s, %d failed starts in a row, shutting down",
+                process.pid, process.exitcode, self.failures[index]
+            )
+            self.exit_code = 1
+            self.should_exit.set()
+        elif self.failures[index]:
+            delay = min(RESPAWN_BACKOFF_MAX, SUPERVISE_INTERVAL * 2 ** self.failures[index])
+            logger.warning(
+                "Worker %s exited with code %s after %.1fs, starting a replacement in %.1fs",
+                process.pid, process.exitcode, uptime, delay
+            )
+            self.processes[index] = None
+            self.respawn_at[index] = time.monotonic() + delay
+        else:
+            logger.info("Worker %s exited with code %s, starting a replacement", process.pid, process.exitcode)
+            self._start(index)
+
+    def run(self):
+        self.socket = self.config.bind_socket()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_exit)
+
+        logger.info("Starting %d workers on %s:%d (pid %d)", self.workers, self.config.host, self.config.port, os.getpid())
+        self.processes = [None] * self.workers
+        self.started_at = [0.0] * self.workers
+        self.failures = [0] * self.workers
+        self.respawn_at = [0.0] * self.workers
+        for index in range(self.workers):
+            self._start(index)
+
+        while not self.should_exit.wait(SUPERVISE_INTERVAL):
+            for index, process in enumerate(self.processes):
+                if process is None:
+                    if time.monotonic() >= self.respawn_at[index]:
+                        self._start(index)
+                elif not process.is_alive():
+                    process.join()
+                    self._worker_exited(index, process)
+                if self.should_exit.is_set():
+                    break
+
+        self.shutdown()
+
+    def shutdown(self):
+        """Ask every worker to drain, then kill the ones that overrun the grace period"""
+        processes = [process for process in self.processes if process is not None]
+        logger.info("Draining %d workers (up to %ss)", len(processes), settings.SERVER_GRACEFUL_TIMEOUT)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        # Workers cancel leftover tasks at the timeout themselves; the margin covers lifespan shutdown
+        deadline = time.monotonic() + settings.SERVER_GRACEFUL_TIMEOUT + 5
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Worker %s did not stop in time, killing it", process.pid)
+                process.kill()
+                process.join()
+        self.socket.close()
+
+
+def run():
+    """Run the production server until SIGTERM/SIGINT"""
+    configure_logging()
+    workers = worker_count()
+    if workers > 1 and not settings.CACHE_REDIS_ENABLED:
+        logger.warning(
+            "%d workers without CACHE_REDIS_ENABLED: disabling the in-process cache tier, "
+            "invalidations could not reach the other workers", workers
+        )
+        # Spawned workers read their settings from the inherited environment
+        os.environ["CACHE_LOCAL_SIZE"] = "0"
+    if workers > 1:
+        metrics_dir = settings.METRICS_MULTIPROCESS_DIR or tempfile.mkdtemp(prefix="metrics-")
+        # 清掉上次运行留下的快照，避免 pid 复用时混入旧数据
+        for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+            os.remove(path)
+        os.environ["METRICS_MULTIPROCESS_DIR"] = metrics_dir
+    supervisor = Supervisor(build_config(), workers)
+    supervisor.run()
+    if supervisor.exit_code:
+        sys.exit(supervisor.exit_code)
+
+
+if __name__ == "__main__":
+    run()
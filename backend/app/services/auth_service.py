@@ -3,18 +3,36 @@ Authentication service for user management
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from passlib.context import CryptContext
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
-from typing import Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+import logging
+import uuid
 
-from app.core.database import User
+from app.core.auth import decode_token, encode_token, user_cache
+from app.core.database import RefreshToken, User
 from app.core.config import settings
-from app.schemas.auth import UserCreate
+from app.core.passwords import dummy_verify, hash_password, verify_password
+from app.schemas.auth import TokenResponse, UserCreate
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# Unique column -> error message for duplicate registrations
+UNIQUE_USER_FIELDS = {
+    "email": "Email already registered",
+    "username": "Username already taken",
+}
+
+
+def _violated_user_field(error: IntegrityError) -> Optional[str]:
+    """Name of the users column whose unique constraint was violated, if any"""
+    message = str(error.orig)
+    for column in UNIQUE_USER_FIELDS:
+        # Postgres constraint/index names, SQLite "UNIQUE constraint failed: users.<column>"
+        if any(marker in message for marker in (f"users_{column}_key", f"ix_users_{column}", f"users.{column}")):
+            return column
+    return None
 
 
 class AuthService:
@@ -23,13 +41,13 @@ class AuthService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password against its hash, returning a replacement hash if it is outdated"""
+        return await verify_password(plain_password, hashed_password)
     
-    def get_password_hash(self, password: str) -> str:
+    async def get_password_hash(self, password: str) -> str:
         """Hash a password"""
-        return pwd_context.hash(password)
+        return await hash_password(password)
     
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token"""
@@ -39,23 +57,39 @@ class AuthService:
         else:
             expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        to_encode.update({"exp": expire, "type": "access"})
+        encoded_jwt = encode_token(to_encode)
         return encoded_jwt
     
-    async def register_user(self, user_data: UserCreate) -> str:
-        """Register a new user"""
-        # Check if user already exists
-        existing_user = await self.get_user_by_email(user_data.email)
-        if existing_user:
-            raise ValueError("Email already registered")
-        
-        existing_username = await self.get_user_by_username(user_data.username)
-        if existing_username:
-            raise ValueError("Username already taken")
+    def create_refresh_token(self, data: dict, jti: str, expire: datetime) -> str:
+        """Create a long-lived JWT refresh token"""
+        to_encode = data.copy()
+        to_encode.update({"exp": expire, "type": "refresh", "jti": jti})
+        return encode_token(to_encode)
+    
+    async def issue_tokens(self, user: User) -> TokenResponse:
+        """Access and refresh token pair for a user, recording the refresh token's jti"""
+        now = datetime.now(timezone.utc)
+        jti = uuid.uuid4().hex
+        expire = now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        # 顺便清理该用户已过期的记录
+        await self.db.execute(delete(RefreshToken).where(RefreshToken.user_id == user.id, RefreshToken.expires_at < now))
+        self.db.add(RefreshToken(jti=jti, user_id=user.id, expires_at=expire))
+        await self.db.commit()
+        return TokenResponse(
+            access_token=self.create_access_token(data={"sub": user.username}),
+            refresh_token=self.create_refresh_token(data={"sub": user.username}, jti=jti, expire=expire),
+            token_type="bearer",
+            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+    
+    async def register_user(self, user_data: UserCreate) -> TokenResponse:
+        """Register a new user
         
-        # Create new user
-        hashed_password = self.get_password_hash(user_data.password)
+        Duplicate emails/usernames are detected by the unique constraints on
+        INSERT instead of separate lookups beforehand.
+        """
+        hashed_password = await self.get_password_hash(user_data.password)
         user = User(
             email=user_data.email,
             username=user_data.username,
@@ -65,28 +99,114 @@ class AuthService:
         )
         
         self.db.add(user)
-        await self.db.commit()
-        await self.db.refresh(user)
+        try:
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            column = _violated_user_field(e)
+            if column is None:
+                raise
+            raise ValueError(UNIQUE_USER_FIELDS[column])
         
-        # Create access token
-        access_token = self.create_access_token(data={"sub": user.username})
-        return access_token
+        return await self.issue_tokens(user)
     
-    async def authenticate_user(self, username: str, password: str) -> Optional[str]:
+    async def authenticate_user(self, username: str, password: str) -> Optional[TokenResponse]:
         """Authenticate a user and return access token"""
         user = await self.get_user_by_username(username)
         if not user:
+            await dummy_verify()
+            return None
+        
+        valid, new_hash = await self.verify_password(password, user.hashed_password)
+        if not valid or not user.is_active:
             return None
         
-        if not self.verify_password(password, user.hashed_password):
+        if new_hash:
+            # Scheme or cost changed since the hash was stored: upgrade it now
+            # that we have the plain password
+            await self.db.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+            await self.db.commit()
+        
+        return await self.issue_tokens(user)
+    
+    async def _consume_refresh_token(self, jti: str) -> Optional[int]:
+        """Revoke a live refresh token, returning its user id (None if unknown, expired or already used)"""
+        now = datetime.now(timezone.utc)
+        result = await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.jti == jti, RefreshToken.revoked_at.is_(None), RefreshToken.expires_at > now)
+            .values(revoked_at=now)
+            .returning(RefreshToken.user_id)
+        )
+        user_id = result.scalar_one_or_none()
+        await self.db.commit()
+        return user_id
+    
+    async def refresh_tokens(self, refresh_token: str) -> Optional[TokenResponse]:
+        """Exchange a refresh token for a new token pair (the user must still be active)
+        
+        Refresh tokens are single use. Presenting one that was already
+        exchanged means it leaked, so every refresh token of its user is
+        revoked and the user has to log in again.
+        """
+        payload = decode_token(refresh_token, token_type="refresh")
+        if payload is None or not payload.get("jti"):
             return None
         
-        if not user.is_active:
+        user_id = await self._consume_refresh_token(payload["jti"])
+        if user_id is None:
+            stored = await self.db.get(RefreshToken, payload["jti"])
+            if stored is not None and stored.revoked_at is not None:
+                logger.warning("Reused refresh token for user %s, revoking all of its refresh tokens", stored.user_id)
+                await self.revoke_refresh_tokens(stored.user_id)
             return None
         
-        # Create access token
-        access_token = self.create_access_token(data={"sub": user.username})
-        return access_token
+        user = await self.db.get(User, user_id)
+        if not user or not user.is_active or user.username != payload["sub"]:
+            return None
+        
+        return await self.issue_tokens(user)
+    
+    async def revoke_refresh_tokens(self, user_id: int):
+        """Revoke every live refresh token of a user"""
+        await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+        await self.db.commit()
+    
+    async def logout(self, refresh_token: str) -> bool:
+        """Revoke a refresh token; False if it was not a live refresh token"""
+        payload = decode_token(refresh_token, token_type="refresh")
+        if payload is None or not payload.get("jti"):
+            return False
+        return await self._consume_refresh_token(payload["jti"]) is not None
+    
+    async def change_password(self, username: str, current_password: str, new_password: str) -> bool:
+        """Replace a user's password and revoke its refresh tokens; False if current_password is wrong"""
+        user = await self.get_user_by_username(username)
+        if not user:
+            return False
+        valid, _ = await self.verify_password(current_password, user.hashed_password)
+        if not valid:
+            return False
+        
+        hashed_password = await self.get_password_hash(new_password)
+        await self.db.execute(update(User).where(User.id == user.id).values(hashed_password=hashed_password))
+        await self.revoke_refresh_tokens(user.id)
+        return True
+    
+    async def set_user_active(self, username: str, is_active: bool) -> bool:
+        """Activate or deactivate a user and drop its cached record"""
+        query = update(User).where(User.username == username).values(is_active=is_active).returning(User.id)
+        result = await self.db.execute(query)
+        user_id = result.scalar_one_or_none()
+        await self.db.commit()
+        await user_cache.invalidate(username)
+        if user_id is not None and not is_active:
+            await self.revoke_refresh_tokens(user_id)
+        return user_id is not None
     
     async def get_user_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
@@ -99,16 +219,3 @@ class AuthService:
         query = select(User).where(User.username == username)
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
-    
-    async def get_current_user(self, token: str) -> Optional[User]:
-        """Get current user from JWT token"""
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-            username: str = payload.get("sub")
-            if username is None:
-                return None
-        except JWTError:
-            return None
-        
-        user = await self.get_user_by_username(username)
-        return user
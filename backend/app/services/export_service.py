@@ -0,0 +1,185 @@
+"""
+Export service for streaming property portfolios as NDJSON, CSV or ZIP
+"""
+
+from sqlalchemy import select
+from typing import AsyncIterator, BinaryIO, List, Optional, Tuple
+from datetime import date, datetime
+import asyncio
+import csv
+import io
+import json
+import os
+import zipfile
+
+from app.core.config import settings
+from app.core.database import Property, PropertyImage, new_session
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",  # StreamingResponse appends "; charset=utf-8"
+    "zip": "application/zip",
+}
+
+EXPORT_COLUMNS = [column for column in Property.__table__.columns]
+EXPORT_COLUMN_NAMES = [column.name for column in EXPORT_COLUMNS]
+
+# Image formats that are already compressed; deflating them only burns CPU
+STORED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    # JSON columns (features) are written as JSON text
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class _ZipStream:
+    """Write-only, unseekable sink for zipfile; collected bytes are drained by the generator"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _open_image(file_path: str) -> Optional[Tuple[BinaryIO, int]]:
+    """Open an image file for export with its size, None if it is gone"""
+    try:
+        source = open(file_path, "rb")
+    except FileNotFoundError:
+        return None
+    return source, os.fstat(source.fileno()).st_size
+
+
+class ExportService:
+    """Streams every property matching the filters, chunk by chunk
+
+    Rows are read with keyset pagination (id > last id), each chunk in its own
+    short-lived session, so a slow client never holds a database connection
+    between chunks and only one chunk of rows is in memory at a time.
+    """
+
+    def __init__(
+        self,
+        owner_id: Optional[int] = None,
+        status: Optional[str] = None,
+        chunk_size: int = settings.EXPORT_CHUNK_SIZE
+    ):
+        self.owner_id = owner_id
+        self.status = status
+        self.chunk_size = chunk_size
+
+    def _filter(self, query):
+        if self.owner_id is not None:
+            query = query.where(Property.owner_id == self.owner_id)
+        if self.status:
+            query = query.where(Property.status == self.status)
+        return query
+
+    async def _keyset_chunks(self, query, id_column) -> AsyncIterator[list]:
+        """Rows of query in chunks ordered by id_column, one session per chunk"""
+        last_id = 0
+        while True:
+            async with new_session() as session:
+                result = await session.execute(
+                    query.where(id_column > last_id).order_by(id_column).limit(self.chunk_size)
+                )
+                rows = result.mappings().all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][id_column.key]
+
+    def _property_chunks(self) -> AsyncIterator[list]:
+        return self._keyset_chunks(self._filter(select(*EXPORT_COLUMNS)), Property.id)
+
+    def _image_chunks(self) -> AsyncIterator[list]:
+        query = self._filter(
+            select(PropertyImage.id, PropertyImage.property_id, PropertyImage.filename, PropertyImage.file_path, PropertyImage.mime_type)
+            .join(Property, Property.id == PropertyImage.property_id)
+        )
+        return self._keyset_chunks(query, PropertyImage.id)
+
+    async def stream_ndjson(self) -> AsyncIterator[bytes]:
+        """One JSON object per property"""
+        async for rows in self._property_chunks():
+            yield "".join(json.dumps(dict(row), default=_json_default, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+    async def stream_csv(self) -> AsyncIterator[bytes]:
+        """CSV with a header row"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMN_NAMES)
+        async for rows in self._property_chunks():
+            writer.writerows([_csv_value(row[name]) for name in EXPORT_COLUMN_NAMES] for row in rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    async def stream_zip(self) -> AsyncIterator[bytes]:
+        """properties.ndjson plus every image file under images/<property_id>/
+
+        Written as a streaming ZIP (data descriptors, no seeking); images are
+        stored uncompressed since JPEG/PNG/WebP do not deflate.
+        """
+        sink = _ZipStream()
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open("properties.ndjson", mode="w", force_zip64=True) as entry:
+                async for chunk in self.stream_ndjson():
+                    entry.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+
+            async for rows in self._image_chunks():
+                for image in rows:
+                    # 文件 IO 全部放到线程里，避免阻塞事件循环
+                    opened = await asyncio.to_thread(_open_image, image["file_path"])
+                    if opened is None:
+                        continue
+                    source, size = opened
+                    info = zipfile.ZipInfo(f"images/{image['property_id']}/{image['filename']}", date_time=datetime.now().timetuple()[:6])
+                    info.compress_type = zipfile.ZIP_STORED if image["mime_type"] in STORED_MIME_TYPES else zipfile.ZIP_DEFLATED
+                    info.file_size = size
+                    try:
+                        with archive.open(info, mode="w") as entry:
+                            while True:
+                                data = await asyncio.to_thread(source.read, FILE_CHUNK_SIZE)
+                                if not data:
+                                    break
+                                entry.write(data)
+                                yield sink.drain()
+                    finally:
+                        await asyncio.to_thread(source.close)
+                    yield sink.drain()
+        yield sink.drain()
+
+    def stream(self, export_format: str) -> AsyncIterator[bytes]:
+        """Byte stream for one of EXPORT_FORMATS"""
+        if export_format == "ndjson":
+            return self.stream_ndjson()
+        if export_format == "csv":
+            return self.stream_csv()
+        if export_format == "zip":
+            return self.stream_zip()
+        raise ValueError(f"Unsupported export format: {export_format}")
@@ -5,8 +5,9 @@ Expose service for generating property exposes
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
-import openai
 from app.core.config import settings
+from app.core.llm import chat_completion, record_fallback
+from app.core.tracing import span
 
 from app.core.database import Expose, Property
 from app.schemas.expose import ExposeCreate
@@ -17,8 +18,6 @@ class ExposeService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
-        if settings.OPENAI_API_KEY:
-            openai.api_key = settings.OPENAI_API_KEY
     
     async def generate_expose(self, expose_data: ExposeCreate) -> Expose:
         """Generate a new expose for a property"""
@@ -29,7 +28,8 @@ class ExposeService:
         
         # Generate AI description if content is not provided
         if not expose_data.content:
-            content = await self._generate_ai_description(property_obj)
+            with span("expose.describe", **{"property.id": property_obj.id}):
+                content = await self._generate_ai_description(property_obj)
         else:
             content = expose_data.content
         
@@ -86,30 +86,20 @@ class ExposeService:
             Floors: {property_obj.floors}
             Year Built: {property_obj.year_built}
             Energy Class: {property_obj.energy_class}
-            Features: {property_obj.features or 'Standard features'}
+            Features: {', '.join(property_obj.features) if property_obj.features else 'Standard features'}
             """
             
             # Generate AI description
-            response = openai.ChatCompletion.create(
+            return await chat_completion(
+                system_prompt="You are a professional real estate agent. Write an engaging, professional property description in German that highlights the key features and benefits of the property. Make it appealing to potential buyers or renters.",
+                user_prompt=f"Generate a professional property description for this property:\n{property_info}",
                 model=settings.OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a professional real estate agent. Write an engaging, professional property description in German that highlights the key features and benefits of the property. Make it appealing to potential buyers or renters."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Generate a professional property description for this property:\n{property_info}"
-                    }
-                ],
                 max_tokens=500,
-                temperature=0.7
+                operation="expose"
             )
             
-            return response.choices[0].message.content.strip()
-            
         except Exception as e:
-            print(f"AI generation failed: {e}")
+            record_fallback("expose", e)
             # Fallback to template-based description
             return self._generate_template_description(property_obj)
     
@@ -0,0 +1,80 @@
+"""
+Geocoding service with pluggable local geocoders
+"""
+
+from abc import ABC, abstractmethod
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional, Tuple
+import csv
+
+from app.core.config import settings
+from app.core.geo import geohash_encode
+
+Coordinates = Tuple[float, float]
+
+
+class Geocoder(ABC):
+    """Turns a German postal address into coordinates"""
+    name = "base"
+
+    @abstractmethod
+    async def geocode(self, plz: Optional[str], city: Optional[str], address: Optional[str]) -> Optional[Coordinates]:
+        pass
+
+
+class PlzCentroidGeocoder(Geocoder):
+    """Offline geocoder resolving the PLZ (or city) to its centroid"""
+    name = "plz"
+
+    def __init__(self, path: str = settings.GEOCODER_PLZ_FILE):
+        self.by_plz: Dict[str, Coordinates] = {}
+        self.by_city: Dict[str, Coordinates] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            rows = csv.DictReader(line for line in f if not line.startswith("#"))
+            for row in rows:
+                coordinates = (float(row["latitude"]), float(row["longitude"]))
+                self.by_plz[row["plz"].strip()] = coordinates
+                self.by_city.setdefault(row["city"].strip().lower(), coordinates)
+
+    async def geocode(self, plz: Optional[str], city: Optional[str], address: Optional[str]) -> Optional[Coordinates]:
+        if plz and plz.strip() in self.by_plz:
+            return self.by_plz[plz.strip()]
+        if city:
+            return self.by_city.get(city.strip().lower())
+        return None
+
+
+GEOCODERS = {
+    "plz": PlzCentroidGeocoder,
+}
+
+_geocoder: Optional[Geocoder] = None
+
+
+def get_geocoder() -> Geocoder:
+    """Get the configured geocoder (settings.GEOCODER)"""
+    global _geocoder
+    if _geocoder is None:
+        if settings.GEOCODER not in GEOCODERS:
+            raise ValueError(f"Unknown geocoder: {settings.GEOCODER}")
+        _geocoder = GEOCODERS[settings.GEOCODER]()
+    return _geocoder
+
+
+class GeocodingService:
+    """Geocoding business logic service"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def geocode(self, plz: Optional[str], city: Optional[str], address: Optional[str]) -> Optional[Coordinates]:
+        """Geocode an address with the configured geocoder"""
+        return await get_geocoder().geocode(plz, city, address)
+
+    async def locate(self, plz: Optional[str], city: Optional[str], address: Optional[str]) -> dict:
+        """Column values (latitude, longitude, geohash) for a property location"""
+        coordinates = await self.geocode(plz, city, address)
+        if not coordinates:
+            return {"latitude": None, "longitude": None, "geohash": None}
+        latitude, longitude = coordinates
+        return {"latitude": latitude, "longitude": longitude, "geohash": geohash_encode(latitude, longitude)}
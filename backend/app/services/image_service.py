@@ -5,14 +5,31 @@ Image service for image management
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from fastapi import UploadFile
+import logging
 import os
 import uuid
 from typing import List, Optional
-from PIL import Image
 import io
 
+from app.core.cache import ReadThroughCache
 from app.core.database import PropertyImage
+from app.core.metrics import upload_bytes
 from app.core.config import settings
+from app.core.profiling import timed
+from app.core.serialization import list_adapter
+from app.core.tracing import span
+from app.schemas.image import ImageResponse
+
+image_list_adapter = list_adapter(ImageResponse)
+
+logger = logging.getLogger(__name__)
+
+# Image lists by property id, invalidated whenever an image of the property changes
+image_cache: ReadThroughCache[List[ImageResponse]] = ReadThroughCache(
+    "property_images",
+    dumps=lambda value: image_list_adapter.dump_json(value).decode(),
+    loads=image_list_adapter.validate_json
+)
 
 
 class ImageService:
@@ -36,16 +53,20 @@ class ImageService:
         
         # Save file
         file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Get image dimensions
-        try:
-            with Image.open(file_path) as img:
-                width, height = img.size
-        except Exception:
-            width, height = None, None
+        content = await file.read()
+        upload_bytes.inc(len(content), kind="property_image")
+        with timed("io"), span("image.store", **{"image.bytes": len(content), "image.mime_type": file.content_type}):
+            with open(file_path, "wb") as buffer:
+                buffer.write(content)
+            
+            # Get image dimensions (Pillow is imported on first use to keep startup fast)
+            try:
+                from PIL import Image
+                
+                with Image.open(file_path) as img:
+                    width, height = img.size
+            except Exception:
+                width, height = None, None
         
         # Create image record
         image_obj = PropertyImage(
@@ -62,6 +83,7 @@ class ImageService:
         self.db.add(image_obj)
         await self.db.commit()
         await self.db.refresh(image_obj)
+        await image_cache.invalidate(property_id)
         
         return image_obj
     
@@ -71,27 +93,37 @@ class ImageService:
         result = await self.db.execute(query)
         return result.scalars().all()
     
+    async def get_property_images_response(self, property_id: int) -> List[ImageResponse]:
+        """Get the images of a property for API responses through the read-through cache"""
+        async def load() -> List[ImageResponse]:
+            images = await self.get_property_images(property_id)
+            return image_list_adapter.validate_python(images)
+        
+        return await image_cache.get_or_load(property_id, load)
+    
     async def delete_image(self, image_id: int) -> bool:
         """Delete an image"""
-        # Get image record
-        query = select(PropertyImage).where(PropertyImage.id == image_id)
-        result = await self.db.execute(query)
-        image_obj = result.scalar_one_or_none()
+        # Delete database record, returning the file path in the same round trip
+        delete_query = (
+            delete(PropertyImage)
+            .where(PropertyImage.id == image_id)
+            .returning(PropertyImage.property_id, PropertyImage.file_path)
+        )
+        result = await self.db.execute(delete_query)
+        deleted = result.one_or_none()
+        await self.db.commit()
         
-        if not image_obj:
+        if deleted is None:
             return False
+        property_id, file_path = deleted
+        await image_cache.invalidate(property_id)
         
         # Delete file from disk
         try:
-            if os.path.exists(image_obj.file_path):
-                os.remove(image_obj.file_path)
+            if os.path.exists(file_path):
+                os.remove(file_path)
         except Exception as e:
-            print(f"Error deleting file: {e}")
-        
-        # Delete database record
-        delete_query = delete(PropertyImage).where(PropertyImage.id == image_id)
-        await self.db.execute(delete_query)
-        await self.db.commit()
+            logger.warning("Error deleting file %s: %s", file_path, e)
         
         return True
     
@@ -106,8 +138,10 @@ class ImageService:
             return False
         
         try:
+            from PIL import Image
+            
             # Open image
-            with Image.open(image_obj.file_path) as img:
+            with timed("io"), span("image.optimize", **{"image.id": image_id}), Image.open(image_obj.file_path) as img:
                 # Convert to RGB if necessary
                 if img.mode in ('RGBA', 'LA', 'P'):
                     img = img.convert('RGB')
@@ -119,15 +153,16 @@ class ImageService:
                 # Save optimized image
                 optimized_path = image_obj.file_path.replace('.', '_optimized.')
                 img.save(optimized_path, 'JPEG', quality=settings.IMAGE_QUALITY, optimize=True)
-                
-                # Update record
-                image_obj.is_optimized = True
-                await self.db.commit()
-                
-                return True
+            
+            # Update record
+            image_obj.is_optimized = True
+            await self.db.commit()
+            await image_cache.invalidate(image_obj.property_id)
+            
+            return True
                 
         except Exception as e:
-            print(f"Error optimizing image: {e}")
+            logger.warning("Error optimizing image %s: %s", image_id, e)
             return False
     
     async def set_primary_image(self, property_id: int, image_id: int) -> bool:
@@ -145,4 +180,5 @@ class ImageService:
         )
         
         await self.db.commit()
+        await image_cache.invalidate(property_id)
         return True
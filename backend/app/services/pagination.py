@@ -0,0 +1,70 @@
+"""
+Keyset pagination helpers shared by the property list and search endpoints
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, tuple_
+from sqlalchemy.sql import Select
+from typing import Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+from app.core.database import Property, is_sqlite
+
+# Columns needed for list cards; skips the large description/features text
+PROPERTY_LIST_COLUMNS = (
+    Property.id,
+    Property.title,
+    Property.property_type,
+    Property.status,
+    Property.address,
+    Property.city,
+    Property.plz,
+    Property.price,
+    Property.price_type,
+    Property.area_sqm,
+    Property.rooms,
+    Property.created_at,
+)
+
+
+def encode_cursor(created_at: datetime, property_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    raw = json.dumps([created_at.isoformat(), property_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, property_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(property_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+async def paginate(db: AsyncSession, query: Select, limit: int, cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+    """Run a property query newest first, one keyset page at a time
+    
+    The query must select Property.created_at and Property.id. Returns the rows
+    and the cursor for the next page (None on the last page).
+    """
+    query = query.order_by(Property.created_at.desc(), Property.id.desc())
+    if cursor:
+        created_at, property_id = decode_cursor(cursor)
+        column, value = Property.created_at, created_at
+        if is_sqlite():
+            # SQLite stores timestamps as text in mixed formats, compare them numerically
+            column, value = func.julianday(column), func.julianday(value)
+        query = query.where(tuple_(column, Property.id) < tuple_(value, property_id))
+    
+    # 多取一行用于判断是否还有下一页
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
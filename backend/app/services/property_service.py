@@ -5,16 +5,29 @@ Property service for business logic
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
 from sqlalchemy.orm import selectinload
-from typing import List, Optional
-from openai import AsyncOpenAI
-from app.core.config import settings
+from typing import List, Optional, Tuple
+from app.core.cache import ReadThroughCache
+from app.core.llm import chat_completion, record_fallback
 from app.prompts.prompts import BESCHREIBUNG_PROMPT_DE, LOCATION_PROMPT_DE
-import json
 
 
 from app.core.database import Property
-from app.schemas.property import PropertyCreate, PropertyUpdate
+from app.schemas.property import PropertyCreate, PropertyResponse, PropertyUpdate
+from app.schemas.search import PropertySearchHit
+from app.services.geocoding_service import GeocodingService
+from app.services.image_service import image_cache
+from app.services.pagination import PROPERTY_LIST_COLUMNS, paginate
+from app.services.search_service import SearchService
 
+DESCRIPTION_SYSTEM_PROMPT = "Du bist ein erfahrener Immobilien-Texter. Erstelle eine professionelle Immobilienbeschreibung auf Deutsch."
+LOCATION_SYSTEM_PROMPT = "Du bist ein erfahrener Immobilien-Texter. Erstelle eine professionelle Lagebeschreibung auf Deutsch."
+
+# Property responses by id, invalidated on update/delete
+property_cache: ReadThroughCache[PropertyResponse] = ReadThroughCache(
+    "property",
+    dumps=lambda value: value.model_dump_json(),
+    loads=PropertyResponse.model_validate_json
+)
 
 class PropertyService:
     """Property business logic service"""
@@ -24,18 +37,12 @@ class PropertyService:
     
     async def create_property(self, property_data: PropertyCreate, owner_id: int = 1) -> Property:
         """Create a new property"""
-        # Convert features to JSON string if provided
-        features = None
-        if property_data.features:
-            if isinstance(property_data.features, str):
-                features = property_data.features
-            else:
-                features = json.dumps(property_data.features)
+        location = await GeocodingService(self.db).locate(property_data.plz, property_data.city, property_data.address)
         
         # Create property object
         property_obj = Property(
-            **property_data.dict(exclude={'features'}),
-            features=features,
+            **property_data.dict(),
+            **location,
             owner_id=owner_id
         )
         
@@ -49,36 +56,20 @@ class PropertyService:
         """Generate AI description using OpenAI API"""
 
         try:
-            
-            # 创建 OpenAI 客户端
-            client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-            
             # 构建德语 prompt
             prompt = self._build_german_description_prompt(property_data)
             
             # 调用 OpenAI API
-            response = await client.chat.completions.create(
+            return await chat_completion(
+                system_prompt=DESCRIPTION_SYSTEM_PROMPT,
+                user_prompt=prompt,
                 model="gpt-4nano",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Du bist ein erfahrener Immobilien-Texter. Erstelle eine professionelle Immobilienbeschreibung auf Deutsch."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
                 max_tokens=500,
-                temperature=0.7
+                operation="description"
             )
             
-            # 提取生成的描述
-            description = response.choices[0].message.content.strip()
-            return description
-            
         except Exception as e:
-            print(f"OpenAI API 调用失败: {e}")
+            record_fallback("description", e)
             # 如果 API 调用失败，返回默认描述
             return self._generate_fallback_description(property_data, style)
     
@@ -107,7 +98,7 @@ class PropertyService:
             year_built=year_built or "n/a",
             condition=condition,
             equipment=equipment or "n/a",
-            features=features or "n/a",
+            features=", ".join(features) if features else "n/a",
             energy_class=energy_class or "n/a"
         )
         
@@ -117,35 +108,21 @@ class PropertyService:
         """Generate AI location description using OpenAI API"""
         
         try:
-            # 创建 OpenAI 客户端
-            client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-            
             # 构建德语地理位置 prompt
             prompt = self._build_german_location_prompt(property_data, style)
             
             # 调用 OpenAI API
-            response = await client.chat.completions.create(
+            return await chat_completion(
+                system_prompt=LOCATION_SYSTEM_PROMPT,
+                user_prompt=prompt,
                 model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Du bist ein erfahrener Immobilien-Texter. Erstelle eine professionelle Lagebeschreibung auf Deutsch."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
                 max_tokens=400,
-                temperature=0.7
+                operation="location",
+                use_cache=True
             )
             
-            # 提取生成的地理位置描述
-            location_description = response.choices[0].message.content.strip()
-            return location_description
-            
         except Exception as e:
-            print(f"OpenAI API 调用失败: {e}")
+            record_fallback("location", e)
             # 如果 API 调用失败，返回默认地理位置描述
             return self._generate_fallback_location_description(property_data, style)
     
@@ -204,9 +181,17 @@ class PropertyService:
         else:  # formal
             return f"Dieses {property_type} in {address} zeichnet sich durch außergewöhnliche Bauqualität und durchdachtes Design aus. {f'Die Wohnfläche beträgt etwa {area_sqm} m², ' if area_sqm else ''}{f'die Immobilie verfügt über {rooms} Zimmer, ' if rooms else ''}{f'erbaut im Jahr {year_built}, ' if year_built else ''}mit exzellenter Lage im Herzen von {city} und perfekter Infrastruktur."
     
-    async def get_properties(self, skip: int = 0, limit: int = 100) -> List[Property]:
-        """Get properties with pagination"""
-        query = select(Property).offset(skip).limit(limit)
+    async def get_properties(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """Get one page of list rows, newest first, using keyset pagination
+        
+        Returns the rows and the cursor for the next page (None on the last page).
+        """
+        query = select(*PROPERTY_LIST_COLUMNS)
+        return await paginate(self.db, query, limit=limit, cursor=cursor)
+    
+    async def get_properties_offset(self, skip: int = 0, limit: int = 100) -> List[Property]:
+        """Get full property rows with OFFSET pagination (deprecated ?skip= list)"""
+        query = select(Property).order_by(Property.id).offset(skip).limit(limit)
         result = await self.db.execute(query)
         return result.scalars().all()
     
@@ -216,41 +201,86 @@ class PropertyService:
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
     
-    async def update_property(self, property_id: int, property_data: PropertyUpdate) -> Optional[Property]:
-        """Update a property"""
-        # Get existing property
-        property_obj = await self.get_property(property_id)
-        if not property_obj:
-            return None
+    async def get_property_response(self, property_id: int) -> Optional[PropertyResponse]:
+        """Get a property for API responses through the read-through cache"""
+        async def load() -> Optional[PropertyResponse]:
+            property_obj = await self.get_property(property_id)
+            return PropertyResponse.model_validate(property_obj) if property_obj else None
+        
+        return await property_cache.get_or_load(property_id, load)
+    
+    async def get_property_details(self, property_id: int) -> Optional[Property]:
+        """Get a property with its images and exposes eagerly loaded"""
+        properties = await self.get_properties_details([property_id])
+        return properties[0] if properties else None
+    
+    async def get_properties_details(self, property_ids: List[int]) -> List[Property]:
+        """Get several properties with images and exposes in three queries total
         
+        Results follow the order of property_ids; unknown ids are skipped.
+        """
+        query = (
+            select(Property)
+            .where(Property.id.in_(property_ids))
+            .options(selectinload(Property.images), selectinload(Property.exposes))
+        )
+        result = await self.db.execute(query)
+        by_id = {property_obj.id: property_obj for property_obj in result.scalars().all()}
+        return [by_id[property_id] for property_id in dict.fromkeys(property_ids) if property_id in by_id]
+    
+    async def update_property(self, property_id: int, property_data: PropertyUpdate) -> Optional[Property]:
+        """Update a property with a single UPDATE ... RETURNING (None if it does not exist)"""
         # Prepare update data
         update_data = property_data.dict(exclude_unset=True)
+        if not update_data:
+            return await self.get_property(property_id)
         
-        # Handle features field
-        if 'features' in update_data and update_data['features']:
-            if isinstance(update_data['features'], str):
-                update_data['features'] = update_data['features']
-            else:
-                update_data['features'] = json.dumps(update_data['features'])
+        # Re-geocode when the address changes; only a partial address edit
+        # needs the stored values of the other fields
+        address_fields = update_data.keys() & {'plz', 'city', 'address'}
+        if address_fields:
+            current = {}
+            if len(address_fields) < 3:
+                result = await self.db.execute(
+                    select(Property.plz, Property.city, Property.address).where(Property.id == property_id)
+                )
+                row = result.one_or_none()
+                if not row:
+                    return None
+                current = row._asdict()
+            update_data.update(await GeocodingService(self.db).locate(
+                update_data.get('plz', current.get('plz')),
+                update_data.get('city', current.get('city')),
+                update_data.get('address', current.get('address'))
+            ))
         
-        # Update property
-        query = update(Property).where(Property.id == property_id).values(**update_data)
-        await self.db.execute(query)
+        # Update property and read the new row back in the same statement
+        query = (
+            update(Property)
+            .where(Property.id == property_id)
+            .values(**update_data, version=Property.version + 1)
+            .returning(Property)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.db.execute(query)
+        property_obj = result.scalar_one_or_none()
         await self.db.commit()
+        if property_obj:
+            await property_cache.invalidate(property_id)
         
-        # Return updated property
-        return await self.get_property(property_id)
+        return property_obj
     
     async def delete_property(self, property_id: int) -> bool:
-        """Delete a property"""
-        property_obj = await self.get_property(property_id)
-        if not property_obj:
-            return False
-        
-        query = delete(Property).where(Property.id == property_id)
-        await self.db.execute(query)
+        """Delete a property with a single DELETE ... RETURNING"""
+        query = delete(Property).where(Property.id == property_id).returning(Property.id)
+        result = await self.db.execute(query)
+        deleted_id = result.scalar_one_or_none()
         await self.db.commit()
+        if deleted_id is None:
+            return False
         
+        await property_cache.invalidate(property_id)
+        await image_cache.invalidate(property_id)
         return True
     
     async def get_properties_by_owner(self, owner_id: int) -> List[Property]:
@@ -259,13 +289,6 @@ class PropertyService:
         result = await self.db.execute(query)
         return result.scalars().all()
     
-    async def search_properties(self, search_term: str) -> List[Property]:
-        """Search properties by title, description, or address"""
-        query = select(Property).where(
-            Property.title.ilike(f"%{search_term}%") |
-            Property.description.ilike(f"%{search_term}%") |
-            Property.address.ilike(f"%{search_term}%") |
-            Property.city.ilike(f"%{search_term}%")
-        )
-        result = await self.db.execute(query)
-        return result.scalars().all()
+    async def search_properties(self, search_term: str, limit: int = 20) -> List[PropertySearchHit]:
+        """Ranked full-text search over title, description, address and city"""
+        return await SearchService(self.db).full_text_search(search_term, limit=limit)
@@ -0,0 +1,302 @@
+"""
+Search service for indexed property search
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import String, case, cast, exists, func, literal, or_, select, text, union_all
+from sqlalchemy.dialects.postgresql import JSONB
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+import re
+import time
+
+from app.core.config import settings
+from app.core.database import Property, is_sqlite
+from app.core.geo import bounding_box, geohash_cover, haversine_km
+from app.core.serialization import list_adapter
+from app.schemas.property import PropertyListItem
+from app.schemas.search import (
+    FacetBucket, PropertyNearbyHit, PropertySearchFilters, PropertySearchHit, PropertySearchResponse
+)
+from app.services.pagination import PROPERTY_LIST_COLUMNS, paginate
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+
+# Postgres: ranked tsvector match (German stemming) plus trigram similarity on
+# address/city for typos. Snippets are only built for the rows on the page.
+POSTGRES_FULL_TEXT_QUERY = text(f"""
+    WITH q AS (SELECT websearch_to_tsquery('german', :term) AS query),
+    hits AS (
+        SELECT p.id,
+               ts_rank_cd(p.search_vector, q.query)
+                 + greatest(similarity(p.address, :term), similarity(p.city, :term)) AS rank
+        FROM properties p, q
+        WHERE p.search_vector @@ q.query
+           OR p.address % :term
+           OR p.city % :term
+        ORDER BY rank DESC, p.id DESC
+        LIMIT :limit
+    )
+    SELECT p.id, p.title, p.property_type, p.status, p.address, p.city, p.plz, p.price, hits.rank,
+           ts_headline('german', coalesce(p.description, p.title), q.query,
+                       'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxFragments=2, MaxWords=20, MinWords=8') AS snippet
+    FROM hits JOIN properties p ON p.id = hits.id, q
+    ORDER BY hits.rank DESC, p.id DESC
+""")
+
+# SQLite: FTS5 index maintained by triggers (see SQLITE_SCHEMA_DDL)
+SQLITE_FULL_TEXT_QUERY = text(f"""
+    SELECT p.id, p.title, p.property_type, p.status, p.address, p.city, p.plz, p.price,
+           -bm25(properties_fts, 10.0, 1.0, 5.0, 5.0) AS rank,
+           snippet(properties_fts, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 20) AS snippet
+    FROM properties_fts JOIN properties p ON p.id = properties_fts.rowid
+    WHERE properties_fts MATCH :term
+    ORDER BY rank DESC, p.id DESC
+    LIMIT :limit
+""")
+
+
+# Range facets: bucket lower bounds, the last bucket is open-ended
+PRICE_BUCKETS = (0, 100_000, 200_000, 300_000, 500_000, 750_000, 1_000_000)
+AREA_BUCKETS = (0, 40, 60, 80, 100, 150, 200)
+YEAR_BUILT_BUCKETS = (1800, 1950, 1970, 1990, 2000, 2010, 2020)
+MAX_FACET_VALUES = 20
+
+# Upper bound on rows pulled from the geohash index before exact distance filtering
+MAX_GEO_CANDIDATES = 5000
+
+# Facet counts per filter combination: key -> (expires_at, total, facets)
+_facet_cache: "OrderedDict[str, Tuple[float, int, Dict[str, List[FacetBucket]]]]" = OrderedDict()
+
+
+def _range_bucket(column, bounds: Sequence[int]):
+    """SQL expression mapping a numeric column to a "lo-hi" / "lo+" bucket label"""
+    whens = [(column.is_(None), None)]
+    for low, high in zip(bounds, bounds[1:]):
+        whens.append((column < high, f"{low}-{high}"))
+    return case(*whens, else_=f"{bounds[-1]}+")
+
+
+FACET_EXPRESSIONS = {
+    "city": Property.city,
+    "plz": Property.plz,
+    "property_type": Property.property_type,
+    "status": Property.status,
+    "energy_class": Property.energy_class,
+    "rooms": Property.rooms,
+    "price": _range_bucket(Property.price, PRICE_BUCKETS),
+    "area_sqm": _range_bucket(Property.area_sqm, AREA_BUCKETS),
+    "year_built": _range_bucket(Property.year_built, YEAR_BUILT_BUCKETS),
+}
+
+
+def features_conditions(features: List[str]) -> list:
+    """Conditions requiring all of the given features (normalized to lower case like stored values)
+
+    Postgres uses JSONB containment, served by the GIN index; SQLite falls
+    back to one json_each lookup per feature.
+    """
+    features = [feature.strip().lower() for feature in features if feature.strip()]
+    if not is_sqlite():
+        return [Property.features.op("@>")(literal(features, type_=JSONB))]
+    conditions = []
+    for feature in features:
+        element = func.json_each(Property.features).table_valued("value").alias()
+        conditions.append(exists().select_from(element).where(element.c.value == feature))
+    return conditions
+
+
+def build_filter_conditions(filters: PropertySearchFilters) -> Dict[str, list]:
+    """Group the WHERE conditions by the facet dimension they filter on"""
+    conditions = {}
+    if filters.city:
+        conditions["city"] = [Property.city == filters.city]
+    if filters.plz:
+        conditions["plz"] = [Property.plz == filters.plz]
+    if filters.property_type:
+        conditions["property_type"] = [Property.property_type.in_(filters.property_type)]
+    if filters.status:
+        conditions["status"] = [Property.status.in_(filters.status)]
+    if filters.energy_class:
+        conditions["energy_class"] = [Property.energy_class.in_(filters.energy_class)]
+    if filters.features:
+        conditions["features"] = features_conditions(filters.features)
+
+    ranges = {
+        "price": (Property.price, filters.price_min, filters.price_max),
+        "area_sqm": (Property.area_sqm, filters.area_min, filters.area_max),
+        "rooms": (Property.rooms, filters.rooms_min, filters.rooms_max),
+        "year_built": (Property.year_built, filters.year_built_min, filters.year_built_max),
+    }
+    for name, (column, minimum, maximum) in ranges.items():
+        bounds = []
+        if minimum is not None:
+            bounds.append(column >= minimum)
+        if maximum is not None:
+            bounds.append(column <= maximum)
+        if bounds:
+            conditions[name] = bounds
+    return conditions
+
+
+def _all_conditions(conditions: Dict[str, list], exclude: Optional[str] = None) -> list:
+    return [c for name, group in conditions.items() if name != exclude for c in group]
+
+
+def build_fts5_query(search_term: str) -> str:
+    """Turn free text into a safe FTS5 prefix query (every word must match)"""
+    words = re.findall(r"\w+", search_term)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class SearchService:
+    """Property search business logic service"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def full_text_search(self, search_term: str, limit: int = 20) -> List[PropertySearchHit]:
+        """Ranked full-text search over title, description, address and city"""
+        search_term = search_term.strip()
+        if not search_term:
+            return []
+
+        if is_sqlite():
+            term = build_fts5_query(search_term)
+            if not term:
+                return []
+            result = await self.db.execute(SQLITE_FULL_TEXT_QUERY, {"term": term, "limit": limit})
+        else:
+            result = await self.db.execute(POSTGRES_FULL_TEXT_QUERY, {"term": search_term, "limit": limit})
+
+        return list_adapter(PropertySearchHit).validate_python(result.mappings().all())
+
+    async def filtered_search(
+        self,
+        filters: PropertySearchFilters,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> PropertySearchResponse:
+        """Filter properties and count matches per facet value"""
+        conditions = build_filter_conditions(filters)
+        query = select(*PROPERTY_LIST_COLUMNS).where(*_all_conditions(conditions))
+        rows, next_cursor = await paginate(self.db, query, limit=limit, cursor=cursor)
+        total, facets = await self.get_facets(filters, conditions)
+        return PropertySearchResponse(
+            items=list_adapter(PropertyListItem).validate_python(rows),
+            next_cursor=next_cursor,
+            total=total,
+            facets=facets
+        )
+
+    async def get_facets(
+        self,
+        filters: PropertySearchFilters,
+        conditions: Dict[str, list]
+    ) -> Tuple[int, Dict[str, List[FacetBucket]]]:
+        """Facet counts for a filter combination, cached for FACET_CACHE_TTL seconds
+
+        Each dimension is counted with every filter except its own, so the
+        client can show how many results selecting another value would give.
+        All dimensions are computed in a single UNION ALL round trip.
+        """
+        cache_key = filters.model_dump_json()
+        cached = _facet_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            _facet_cache.move_to_end(cache_key)
+            return cached[1], cached[2]
+
+        selects = [
+            select(
+                literal("total").label("facet"),
+                literal("").label("value"),
+                func.count().label("count")
+            ).select_from(Property).where(*_all_conditions(conditions))
+        ]
+        for name, expression in FACET_EXPRESSIONS.items():
+            selects.append(
+                select(
+                    literal(name).label("facet"),
+                    cast(expression, String).label("value"),
+                    func.count().label("count")
+                ).select_from(Property)
+                .where(*_all_conditions(conditions, exclude=name))
+                .group_by(expression)
+            )
+        result = await self.db.execute(union_all(*selects))
+
+        total = 0
+        facets: Dict[str, List[FacetBucket]] = {name: [] for name in FACET_EXPRESSIONS}
+        for facet, value, count in result.all():
+            if facet == "total":
+                total = count
+            elif value is not None:
+                facets[facet].append(FacetBucket(value=value, count=count))
+        for name, buckets in facets.items():
+            buckets.sort(key=lambda bucket: bucket.count, reverse=True)
+            del buckets[MAX_FACET_VALUES:]
+
+        _facet_cache[cache_key] = (time.monotonic() + settings.FACET_CACHE_TTL, total, facets)
+        if len(_facet_cache) > settings.FACET_CACHE_SIZE:
+            _facet_cache.popitem(last=False)
+        return total, facets
+
+    async def nearby(self, latitude: float, longitude: float, radius_km: float, limit: int = 50) -> List[PropertyNearbyHit]:
+        """Properties within radius_km of a point, nearest first"""
+        hits = await self._geo_candidates(*bounding_box(latitude, longitude, radius_km), latitude, longitude)
+        return [hit for hit in hits if hit.distance_km <= radius_km][:limit]
+
+    async def within_bbox(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        limit: int = 200
+    ) -> List[PropertyNearbyHit]:
+        """Properties inside a bounding box (map view), nearest to its centre first"""
+        hits = await self._geo_candidates(min_lat, min_lon, max_lat, max_lon, (min_lat + max_lat) / 2, (min_lon + max_lon) / 2)
+        return hits[:limit]
+
+    async def _geo_candidates(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        center_lat: float,
+        center_lon: float
+    ) -> List[PropertyNearbyHit]:
+        """Rows inside the box, found via geohash prefix range scans, sorted by distance
+
+        The covering prefixes narrow the scan to a few index ranges; the
+        lat/lon predicates then drop the parts of the cells outside the box.
+        The database orders by an equirectangular distance before applying
+        MAX_GEO_CANDIDATES, so the cap only ever drops the farthest rows;
+        the exact haversine distance is computed on what is returned.
+        """
+        cells = geohash_cover(min_lat, min_lon, max_lat, max_lon)
+        # Plain arithmetic (no trig in SQL) so SQLite and Postgres share the query
+        lon_scale = math.cos(math.radians(center_lat))
+        d_lat = Property.latitude - center_lat
+        d_lon = (Property.longitude - center_lon) * lon_scale
+        query = (
+            select(*PROPERTY_LIST_COLUMNS, Property.latitude, Property.longitude)
+            .where(or_(*[Property.geohash.startswith(cell, autoescape=True) for cell in cells]))
+            .where(Property.latitude.between(min_lat, max_lat))
+            .where(Property.longitude.between(min_lon, max_lon))
+            .order_by(d_lat * d_lat + d_lon * d_lon, Property.id.desc())
+            .limit(MAX_GEO_CANDIDATES)
+        )
+        result = await self.db.execute(query)
+        hits = [
+            PropertyNearbyHit(
+                **row,
+                distance_km=round(haversine_km(center_lat, center_lon, row["latitude"], row["longitude"]), 3)
+            )
+            for row in result.mappings()
+        ]
+        hits.sort(key=lambda hit: (hit.distance_km, -hit.id))
+        return hits
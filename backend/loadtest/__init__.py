@@ -0,0 +1 @@
+# Load and startup benchmarking tools (mock OpenAI server, load generator, cold-start and serialization benchmarks)
@@ -0,0 +1,167 @@
+"""
+Local mock of the OpenAI chat completions API
+
+Usage:
+    python -m loadtest.mock_openai --port 8100 --latency lognormal:-0.5,0.4 --tokens-per-second 60 --error-rate 0.02
+
+Point the backend at it with OPENAI_BASE_URL=http://localhost:8100/v1. The
+server answers /v1/chat/completions (plain and streamed) with generated
+German filler text, waiting for a sampled latency plus the time it takes to
+"produce" the completion tokens at the configured rate.
+"""
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from dataclasses import dataclass
+from typing import List
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+import uvicorn
+
+WORDS = (
+    "Die helle Wohnung überzeugt mit einem großzügigen Grundriss, moderner Ausstattung "
+    "und einer ruhigen Lage im Herzen der Stadt. Der sonnige Balkon lädt zum Verweilen ein, "
+    "während die Einbauküche und das elegante Bad keine Wünsche offen lassen."
+).split()
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock server"""
+    latency: str = "fixed:0.2"  # fixed:<s> | uniform:<min>,<max> | lognormal:<mu>,<sigma>
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 180
+    error_rate: float = 0.0
+    error_statuses: List[int] = None
+
+    def sample_latency(self) -> float:
+        kind, _, params = self.latency.partition(":")
+        values = [float(v) for v in params.split(",")] if params else []
+        if kind == "uniform":
+            return random.uniform(values[0], values[1])
+        if kind == "lognormal":
+            return random.lognormvariate(values[0], values[1])
+        return values[0] if values else 0.0
+
+
+config = MockConfig(error_statuses=[429, 500, 503])
+app = FastAPI(title="Mock OpenAI API")
+
+
+def _completion_tokens(max_tokens: int) -> List[str]:
+    count = min(config.completion_tokens, max_tokens or config.completion_tokens)
+    return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+def _prompt_tokens(messages: List[dict]) -> int:
+    # 粗略估算：每 4 个字符约 1 个 token
+    return sum(len(m.get("content") or "") for m in messages) // 4
+
+
+def _error_response() -> JSONResponse:
+    status_code = random.choice(config.error_statuses)
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": f"Injected mock error {status_code}", "type": "mock_error", "code": status_code}}
+    )
+
+
+@app.get("/v1/models")
+async def list_models():
+    """List the models the mock pretends to serve"""
+    return {"object": "list", "data": [{"id": name, "object": "model"} for name in ("gpt-4nano", "gpt-4o", "gpt-4")]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """Answer a chat completion request, optionally streamed"""
+    body = await request.json()
+    model = body.get("model", "gpt-4nano")
+    messages = body.get("messages", [])
+    tokens = _completion_tokens(body.get("max_tokens"))
+    prompt_tokens = _prompt_tokens(messages)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    await asyncio.sleep(config.sample_latency())
+    if random.random() < config.error_rate:
+        return _error_response()
+
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(tokens),
+        "total_tokens": prompt_tokens + len(tokens)
+    }
+    token_delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+    if not body.get("stream"):
+        await asyncio.sleep(token_delay * len(tokens))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+    async def event_stream():
+        def chunk(choices: list, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                **extra
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        def delta(content: dict, finish_reason=None) -> list:
+            return [{"index": 0, "delta": content, "finish_reason": finish_reason}]
+
+        yield chunk(delta({"role": "assistant", "content": ""}))
+        for token in tokens:
+            await asyncio.sleep(token_delay)
+            yield chunk(delta({"content": token}))
+        yield chunk(delta({}, finish_reason="stop"))
+        if include_usage:
+            yield chunk([], usage=usage)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default=config.latency, help="fixed:<s>, uniform:<min>,<max> or lognormal:<mu>,<sigma>")
+    parser.add_argument("--tokens-per-second", type=float, default=config.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=config.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=config.error_rate)
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=config.error_statuses)
+    args = parser.parse_args()
+
+    config.latency = args.latency
+    config.tokens_per_second = args.tokens_per_second
+    config.completion_tokens = args.completion_tokens
+    config.error_rate = args.error_rate
+    config.error_statuses = args.error_statuses
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
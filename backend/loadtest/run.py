@@ -0,0 +1,175 @@
+"""
+Open-loop load test for the generation paths
+
+Usage:
+    python -m loadtest.run --rps 20 --duration 60 --scenario description cache expose
+
+Scenarios are started at a fixed rate regardless of how fast the backend
+answers, so queueing shows up in the latency percentiles instead of silently
+lowering the offered load. Run the backend against the mock server
+(loadtest.mock_openai) to avoid spending real OpenAI quota.
+"""
+
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+import argparse
+import asyncio
+import math
+import random
+import time
+import httpx
+
+Scenario = Callable[[httpx.AsyncClient, "Recorder"], Awaitable[None]]
+
+SAMPLE_PROPERTY = {
+    "title": "Lichtdurchflutete 3-Zimmer-Wohnung",
+    "property_type": "apartment",
+    "status": "for_sale",
+    "address": "Musterstraße 12",
+    "city": "Berlin",
+    "plz": "10115",
+    "price": 450000,
+    "area_sqm": 85.5,
+    "rooms": 3,
+    "bedrooms": 2,
+    "bathrooms": 1,
+    "year_built": 1998,
+    "energy_class": "B",
+    "condition": "gepflegt",
+    "equipment": "Einbauküche, Balkon"
+}
+
+# 最小的合法 JPEG 文件头，足以测试上传路径
+SAMPLE_IMAGE = bytes.fromhex("ffd8ffe000104a46494600010100000100010000ffd9")
+
+
+@dataclass
+class Recorder:
+    """Collects per-request latencies and failures"""
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            raise
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return response
+
+
+async def description_scenario(client: httpx.AsyncClient, recorder: Recorder):
+    await recorder.request(
+        client, "POST /properties/generate-description", "POST",
+        "/properties/generate-description", params={"style": random.choice(["formal", "marketing", "family"])},
+        json=SAMPLE_PROPERTY
+    )
+
+
+async def location_scenario(client: httpx.AsyncClient, recorder: Recorder):
+    await recorder.request(
+        client, "POST /properties/generate-location-description", "POST",
+        "/properties/generate-location-description",
+        json={"city": SAMPLE_PROPERTY["city"], "address": SAMPLE_PROPERTY["address"]}
+    )
+
+
+async def _cache_property(client: httpx.AsyncClient, recorder: Recorder) -> str:
+    response = await recorder.request(client, "POST /cache/property-data", "POST", "/cache/property-data", json=SAMPLE_PROPERTY)
+    return response.json()["id"]
+
+
+async def cache_scenario(client: httpx.AsyncClient, recorder: Recorder):
+    property_id = await _cache_property(client, recorder)
+    await recorder.request(client, "GET /cache/property-data/{id}", "GET", f"/cache/property-data/{property_id}")
+    await recorder.request(
+        client, "POST /cache/property-images/{id}", "POST", f"/cache/property-images/{property_id}",
+        files=[("images", ("wohnzimmer.jpg", SAMPLE_IMAGE, "image/jpeg"))],
+        data={"image_categories": "wohnzimmer"}
+    )
+    await recorder.request(client, "GET /cache/property-images/{id}", "GET", f"/cache/property-images/{property_id}")
+
+
+async def expose_scenario(client: httpx.AsyncClient, recorder: Recorder):
+    property_id = await _cache_property(client, recorder)
+    response = await recorder.request(
+        client, "POST /expose_generation/generate/{id}", "POST", f"/expose_generation/generate/{property_id}"
+    )
+    expose_id = response.json()["exposeId"]
+    await recorder.request(client, "GET /expose_generation/status/{id}", "GET", f"/expose_generation/status/{expose_id}")
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "description": description_scenario,
+    "location": location_scenario,
+    "cache": cache_scenario,
+    "expose": expose_scenario,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def print_report(recorder: Recorder, elapsed: float, started: int, completed: int):
+    print(f"\nScenarios started: {started}, completed: {completed}, elapsed: {elapsed:.1f}s, "
+          f"throughput: {completed / elapsed:.1f} scenarios/s")
+    print(f"{'request':<48}{'count':>7}{'err':>6}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, values in sorted(recorder.latencies.items()):
+        print(
+            f"{name:<48}{len(values):>7}{recorder.errors.get(name, 0):>6}{len(values) / elapsed:>8.1f}"
+            f"{percentile(values, 50) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}{percentile(values, 99) * 1000:>9.1f}"
+        )
+
+
+async def run_load(base_url: str, scenarios: List[str], rps: float, duration: float, timeout: float):
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    completed = 0
+
+    async def run_one(scenario: Scenario):
+        nonlocal completed
+        try:
+            await scenario(client, recorder)
+            completed += 1
+        except (httpx.HTTPError, KeyError, ValueError):
+            pass
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        tasks = []
+        start = time.perf_counter()
+        interval = 1.0 / rps
+        started = 0
+        while time.perf_counter() - start < duration:
+            # 按计划时间发起请求，不等待前一个完成（开环负载）
+            tasks.append(asyncio.create_task(run_one(SCENARIOS[scenarios[started % len(scenarios)]])))
+            started += 1
+            next_start = start + started * interval
+            await asyncio.sleep(max(0.0, next_start - time.perf_counter()))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    print_report(recorder, elapsed, started, completed)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Load-test the generation endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000/app/endpoints")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=["description", "cache", "expose"])
+    parser.add_argument("--rps", type=float, default=10.0, help="Scenarios started per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep starting scenarios")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    asyncio.run(run_load(args.base_url, args.scenario, args.rps, args.duration, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
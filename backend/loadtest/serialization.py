@@ -0,0 +1,113 @@
+"""
+Micro-benchmark for response serialization of a 1,000-property page
+
+Usage:
+    python -m loadtest.serialization --rows 1000 --repeat 20
+
+Compares the previous path (per-row from_orm, FastAPI's response
+serialization, stdlib JSONResponse) with the current one (one cached
+TypeAdapter call per list, orjson response class) for full property
+responses, and the conditional-GET path for list pages (jsonable_encoder +
+JSONResponse vs ORJSONResponse taking the models directly). Rows are plain
+attribute objects standing in for ORM instances, so no database is needed.
+"""
+
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+import argparse
+import asyncio
+import statistics
+import time
+import warnings
+
+from app.core.serialization import ORJSONResponse, list_adapter
+from app.schemas.property import PropertyListItem, PropertyPage, PropertyResponse
+
+
+def make_rows(count: int) -> List[SimpleNamespace]:
+    """ORM-like property objects with realistic field values"""
+    created = datetime(2024, 1, 1, 12, 0, 0)
+    rows = []
+    for i in range(count):
+        values = {name: None for name in PropertyResponse.model_fields}
+        values.update(
+            id=i + 1, owner_id=1, version=1,
+            title=f"Helle {i % 5 + 1}-Zimmer-Wohnung mit Balkon in ruhiger Lage",
+            description="Die helle Wohnung überzeugt mit einem großzügigen Grundriss und moderner Ausstattung. " * 3,
+            property_type=("apartment", "house", "villa")[i % 3], status="for_sale", price_type="total",
+            address=f"Musterstraße {i}", city=("Berlin", "München", "Hamburg", "Köln")[i % 4], plz=f"{10115 + i % 900}",
+            country="Germany", price=150000.0 + i * 1250, area_sqm=45.0 + i % 120, rooms=i % 6 + 1,
+            bedrooms=i % 4, bathrooms=i % 2 + 1, year_built=1950 + i % 70, energy_class="ABCDEFG"[i % 7],
+            heating_system="Fernwärme", energy_source="Gas", features=["balkon", "aufzug", "einbaukueche"][: i % 4],
+            contact_person="Erika Mustermann", contact_email="kontakt@example.de",
+            created_at=created + timedelta(minutes=i), updated_at=created + timedelta(minutes=i, seconds=30),
+        )
+        rows.append(SimpleNamespace(**values))
+    return rows
+
+
+def measure(func: Callable[[], bytes], repeat: int) -> float:
+    """Median milliseconds per call"""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark response serialization")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    response_field = create_response_field(name="Response_list", type_=List[PropertyResponse])
+    loop = asyncio.new_event_loop()
+
+    def fastapi_body(content, response_class) -> bytes:
+        # What FastAPI does with a handler result: validate against the
+        # response model, dump to JSON-compatible data, render
+        serialized = loop.run_until_complete(
+            serialize_response(field=response_field, response_content=content, is_coroutine=True)
+        )
+        return response_class(serialized).body
+
+    def before_full() -> bytes:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            items = [PropertyResponse.from_orm(row) for row in rows]
+        return fastapi_body(items, JSONResponse)
+
+    def after_full() -> bytes:
+        return fastapi_body(list_adapter(PropertyResponse).validate_python(rows), ORJSONResponse)
+
+    def before_page() -> bytes:
+        page = PropertyPage(items=[PropertyListItem.model_validate(row) for row in rows])
+        return JSONResponse(content=jsonable_encoder(page)).body
+
+    def after_page() -> bytes:
+        page = PropertyPage(items=list_adapter(PropertyListItem).validate_python(rows))
+        return ORJSONResponse(content=page).body
+
+    results: Dict[str, tuple] = {
+        f"PropertyResponse list ({args.rows} rows)": (measure(before_full, args.repeat), measure(after_full, args.repeat)),
+        f"PropertyPage conditional GET ({args.rows} rows)": (measure(before_page, args.repeat), measure(after_page, args.repeat)),
+    }
+    loop.close()
+
+    print(f"{'path':<46}{'before ms':>11}{'after ms':>10}{'speedup':>9}")
+    for name, (before, after) in results.items():
+        print(f"{name:<46}{before:>11.2f}{after:>10.2f}{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
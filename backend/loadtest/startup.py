@@ -0,0 +1,159 @@
+"""
+Cold-start benchmark: import time of app.main and time to a healthy /health
+
+Usage:
+    python -m loadtest.startup --runs 5 --max-import-ms 1500 --max-ready-ms 3000
+    python -m loadtest.startup --save-baseline loadtest/startup_baseline.json
+    python -m loadtest.startup --baseline loadtest/startup_baseline.json --tolerance 0.25
+
+Every run starts a fresh interpreter, so nothing is warm except the OS page
+cache. The process exits non-zero if the median exceeds the absolute budgets
+or the baseline (plus tolerance), or if importing app.main loads one of the
+heavy dependencies that must stay deferred until first use.
+"""
+
+from typing import Dict, List, Optional
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only imported by the code paths that need them (LLM calls, auth, image processing, __main__)
+DEFERRED_MODULES = ("openai", "langchain_openai", "passlib", "jose", "PIL", "uvicorn", "redis")
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"import_ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED_MODULES,)
+
+
+def _env(with_database: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    if not with_database:
+        env["DATABASE_ENABLED"] = "false"
+    return env
+
+
+def measure_import(with_database: bool) -> dict:
+    """Import app.main in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=BACKEND_DIR, env=_env(with_database), capture_output=True, text=True, check=True
+    ).stdout
+    # Logging goes to stderr, so stdout only holds the probe result
+    return json.loads(output)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_ready(with_database: bool, timeout: float) -> float:
+    """Milliseconds from spawning uvicorn until /health answers 200"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(with_database), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode} before becoming healthy")
+            try:
+                with urllib.request.urlopen(url, timeout=0.5) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"/health not ready within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run_benchmark(runs: int, with_database: bool, timeout: float) -> dict:
+    imports: List[float] = []
+    readies: List[float] = []
+    loaded = set()
+    for _ in range(runs):
+        probe = measure_import(with_database)
+        imports.append(probe["import_ms"])
+        loaded.update(probe["loaded"])
+        readies.append(measure_ready(with_database, timeout))
+    return {
+        "import_ms": round(statistics.median(imports), 1),
+        "ready_ms": round(statistics.median(readies), 1),
+        "import_ms_min": round(min(imports), 1),
+        "ready_ms_min": round(min(readies), 1),
+        "eagerly_loaded": sorted(loaded),
+    }
+
+
+def check(result: dict, max_import_ms: float, max_ready_ms: float, baseline: Optional[dict], tolerance: float) -> List[str]:
+    """Regression messages; empty when the run is within budget"""
+    failures = []
+    if result["eagerly_loaded"]:
+        failures.append(f"app.main imports deferred modules: {', '.join(result['eagerly_loaded'])}")
+    for key, budget in (("import_ms", max_import_ms), ("ready_ms", max_ready_ms)):
+        if budget and result[key] > budget:
+            failures.append(f"{key} {result[key]:.0f} exceeds budget {budget:.0f}")
+        if baseline and key in baseline:
+            limit = baseline[key] * (1 + tolerance)
+            if result[key] > limit:
+                failures.append(f"{key} {result[key]:.0f} exceeds baseline {baseline[key]:.0f} (+{tolerance:.0%})")
+    return failures
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Measure backend cold-start time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=1500.0, help="0 disables the check")
+    parser.add_argument("--max-ready-ms", type=float, default=3000.0, help="0 disables the check")
+    parser.add_argument("--baseline", help="JSON file from --save-baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown relative to the baseline")
+    parser.add_argument("--save-baseline", help="Write the measured medians to this file")
+    parser.add_argument("--with-database", action="store_true", help="Keep DATABASE_ENABLED (includes pool warm-up)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    result = run_benchmark(args.runs, args.with_database, args.timeout)
+    print(json.dumps(result, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"import_ms": result["import_ms"], "ready_ms": result["ready_ms"]}, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    failures = check(result, args.max_import_ms, args.max_ready_ms, baseline, args.tolerance)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Test fixtures: the application on a scratch SQLite database with a few listings
+"""
+
+from datetime import datetime
+import atexit
+import os
+import shutil
+import tempfile
+
+# Settings are read when app.core.config is imported, so configure them first
+_tmp_dir = tempfile.mkdtemp(prefix="property-backend-tests-")
+atexit.register(shutil.rmtree, _tmp_dir, ignore_errors=True)
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + os.path.join(_tmp_dir, "test.db")
+os.environ["DATABASE_ENABLED"] = "true"
+os.environ["CACHE_REDIS_ENABLED"] = "false"
+os.environ["REGENERATION_CHECKPOINT_DIR"] = os.path.join(_tmp_dir, "jobs")
+os.environ["UPLOAD_DIR"] = os.path.join(_tmp_dir, "uploads")
+os.environ["IMPORT_DIR"] = os.path.join(_tmp_dir, "imports")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from app.core.auth import get_current_user
+from app.core.database import Property, User, new_session
+from app.main import app
+from app.schemas.auth import UserResponse
+
+API = "/app/endpoints"
+
+# Listing ids follow this order (1-5). The first one is the newest, the last
+# three share a timestamp, so pagination has to break ties by id.
+LISTINGS = [
+    dict(
+        title="Altbauwohnung mit Balkon", description="Ruhige Lage, großer Balkon zum Hof",
+        property_type="apartment", address="Torstraße 1", city="Berlin", plz="10115",
+        price=350000, area_sqm=80, rooms=3, features=["balkon"],
+        created_at=datetime(2024, 3, 1, 12, 0, 0)
+    ),
+    dict(
+        title="Einfamilienhaus mit Garten", description="Garten und Garage am Stadtrand",
+        property_type="house", address="Lindenweg 5", city="München", plz="80331",
+        price=850000, area_sqm=140, rooms=5, features=["garten", "garage"],
+        created_at=datetime(2024, 2, 1, 12, 0, 0)
+    ),
+    dict(
+        title="Penthouse über den Dächern", description="Dachterrasse mit Blick über die Stadt",
+        property_type="penthouse", address="Friedrichstraße 20", city="Berlin", plz="10117",
+        price=1200000, area_sqm=160, rooms=4, features=["aufzug", "dachterrasse"],
+        created_at=datetime(2024, 1, 1, 12, 0, 0)
+    ),
+    dict(
+        title="Studio nahe Universität", description="Möbliert, ideal für Studierende",
+        property_type="studio", status="for_rent", address="Grindelallee 3", city="Hamburg", plz="20146",
+        price=150000, area_sqm=30, rooms=1, features=[],
+        created_at=datetime(2024, 1, 1, 12, 0, 0)
+    ),
+    dict(
+        title="Wohnung am Park", description="Balkon und Einbauküche",
+        property_type="apartment", address="Parkstraße 9", city="Berlin", plz="10115",
+        price=420000, area_sqm=75, rooms=3, features=["balkon", "einbauküche"],
+        created_at=datetime(2024, 1, 1, 12, 0, 0)
+    ),
+]
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client with the schema created and the listings seeded"""
+    with TestClient(app) as test_client:
+        async def seed():
+            async with new_session() as session:
+                session.add(User(email="owner@example.com", username="owner", hashed_password="x"))
+                await session.flush()
+                for listing in LISTINGS:
+                    session.add(Property(owner_id=1, **listing))
+                await session.commit()
+
+        test_client.portal.call(seed)
+        yield test_client
+
+
+@pytest.fixture
+def run(client):
+    """Run a coroutine function on the application's event loop"""
+    return client.portal.call
+
+
+@pytest.fixture
+def as_user(client):
+    """Authenticate requests as a given user id (the seeded owner is 1)"""
+    def authenticate(user_id: int = 1):
+        app.dependency_overrides[get_current_user] = lambda: UserResponse(
+            id=user_id, email=f"user{user_id}@example.com", username=f"user{user_id}", is_active=True
+        )
+    yield authenticate
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.fixture
+def scratch_properties(run):
+    """Delete properties a test added, so other tests keep seeing only LISTINGS"""
+    yield
+
+    async def cleanup():
+        async with new_session() as session:
+            await session.execute(delete(Property).where(Property.id > len(LISTINGS)))
+            await session.commit()
+
+    run(cleanup)
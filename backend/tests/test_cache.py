@@ -0,0 +1,294 @@
+"""
+Read-through cache: local and Redis tiers, versioned invalidation and singleflight loads
+"""
+
+from io import BytesIO
+import asyncio
+
+from starlette.datastructures import Headers, UploadFile
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import ReadThroughCache, cache_requests
+from app.core.config import settings
+from app.core.database import Property, new_session
+from app.schemas.property import PropertyUpdate
+from app.services.image_service import ImageService, image_cache
+from app.services.property_service import PropertyService, property_cache
+
+
+class FakeRedis:
+    """The part of redis.asyncio the cache uses, shared by the "workers" of a test"""
+
+    def __init__(self):
+        self.data = {}
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key) or 0) + 1
+        return self.data[key]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cache_module, "get_redis", lambda: fake)
+    return fake
+
+
+def make_cache(namespace="test", **options) -> ReadThroughCache[str]:
+    return ReadThroughCache(namespace, dumps=str, loads=str, **options)
+
+
+class CountingLoader:
+    def __init__(self, value="value"):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def hits(namespace):
+    return {
+        result: cache_requests.value(cache=namespace, result=result)
+        for result in ("hit_local", "hit_redis", "miss")
+    }
+
+
+def test_local_tier_serves_repeated_reads():
+    async def scenario():
+        cache = make_cache("local_hits")
+        loader = CountingLoader()
+        for _ in range(3):
+            assert await cache.get_or_load(1, loader) == "value"
+        assert loader.calls == 1
+
+    asyncio.run(scenario())
+    assert hits("local_hits") == {"hit_local": 2, "hit_redis": 0, "miss": 1}
+
+
+def test_local_tier_evicts_least_recently_used():
+    async def scenario():
+        cache = make_cache(max_size=2)
+        loaders = {key: CountingLoader(f"value {key}") for key in (1, 2, 3)}
+        for key in (1, 2, 1, 3):
+            await cache.get_or_load(key, loaders[key])
+        # 2 was the least recently used entry when 3 came in
+        await cache.get_or_load(1, loaders[1])
+        await cache.get_or_load(2, loaders[2])
+        return {key: loader.calls for key, loader in loaders.items()}
+
+    assert asyncio.run(scenario()) == {1: 1, 2: 2, 3: 1}
+
+
+def test_none_is_not_cached():
+    async def scenario():
+        cache = make_cache()
+        loader = CountingLoader(None)
+        assert await cache.get_or_load(1, loader) is None
+        assert await cache.get_or_load(1, loader) is None
+        return loader.calls
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_invalidate_bumps_the_version():
+    async def scenario():
+        cache = make_cache()
+        loader = CountingLoader()
+        await cache.get_or_load(1, loader)
+        await cache.invalidate(1)
+        await cache.get_or_load(1, loader)
+        await cache.get_or_load(2, loader)
+        await cache.get_or_load(1, loader)
+        return loader.calls
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_redis_tier_is_shared_between_workers(redis, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_VERSION_TTL", 0.0)
+
+    async def scenario():
+        worker_a, worker_b = make_cache("shared"), make_cache("shared")
+        loader_a, loader_b = CountingLoader("old"), CountingLoader("new")
+
+        assert await worker_a.get_or_load(1, loader_a) == "old"
+        assert await worker_b.get_or_load(1, loader_b) == "old"
+        assert (loader_a.calls, loader_b.calls) == (1, 0)
+
+        # An invalidation in one worker reaches the other one's local tier
+        await worker_a.invalidate(1)
+        assert await worker_b.get_or_load(1, loader_b) == "new"
+        assert loader_b.calls == 1
+
+    asyncio.run(scenario())
+    assert hits("shared") == {"hit_local": 0, "hit_redis": 1, "miss": 2}
+
+
+def test_local_hits_reuse_the_redis_version(redis, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_VERSION_TTL", 60.0)
+
+    async def scenario():
+        cache = make_cache("version_ttl")
+        for _ in range(5):
+            await cache.get_or_load(1, CountingLoader())
+
+    asyncio.run(scenario())
+    # One version read plus one payload read for the first miss
+    assert redis.gets == 2
+    assert hits("version_ttl")["hit_local"] == 4
+
+
+def add_property(run) -> int:
+    async def insert():
+        async with new_session() as session:
+            property_obj = Property(
+                owner_id=1, title="Cache-Testobjekt", property_type="house", address="Testweg 1", city="Köln"
+            )
+            session.add(property_obj)
+            await session.commit()
+            return property_obj.id
+    return run(insert)
+
+
+def with_session(run, action):
+    async def call():
+        async with new_session() as session:
+            return await action(session)
+    return run(call)
+
+
+def test_property_update_and_delete_invalidate(run):
+    property_id = add_property(run)
+    get = lambda session: PropertyService(session).get_property_response(property_id)
+    local_hits = cache_requests.value(cache=property_cache.namespace, result="hit_local")
+
+    assert with_session(run, get).title == "Cache-Testobjekt"
+    with_session(run, lambda session: PropertyService(session).update_property(property_id, PropertyUpdate(title="Neu")))
+    assert with_session(run, get).title == "Neu"
+
+    assert with_session(run, lambda session: PropertyService(session).delete_property(property_id))
+    assert with_session(run, get) is None
+    # Every read after a write had to miss
+    assert cache_requests.value(cache=property_cache.namespace, result="hit_local") == local_hits
+
+
+def test_image_upload_and_delete_invalidate(run):
+    property_id = add_property(run)
+    get = lambda session: ImageService(session).get_property_images_response(property_id)
+    upload = UploadFile(
+        BytesIO(b"not really a jpeg"), filename="front.jpg", headers=Headers({"content-type": "image/jpeg"})
+    )
+
+    local_hits = cache_requests.value(cache=image_cache.namespace, result="hit_local")
+
+    assert with_session(run, get) == []
+    image = with_session(run, lambda session: ImageService(session).upload_image(property_id, upload))
+    assert [item.id for item in with_session(run, get)] == [image.id]
+    assert [item.id for item in with_session(run, get)] == [image.id]
+
+    assert with_session(run, lambda session: ImageService(session).delete_image(image.id))
+    assert with_session(run, get) == []
+    assert cache_requests.value(cache=image_cache.namespace, result="hit_local") == local_hits + 1
+    with_session(run, lambda session: PropertyService(session).delete_property(property_id))
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = make_cache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(cache.get_or_load(1, loader) for _ in range(10)))
+        assert results == ["value"] * 10
+        assert len(calls) == 1
+        assert not cache._inflight
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_load_is_retried_by_a_waiter():
+    async def scenario():
+        cache = make_cache()
+        started = asyncio.Event()
+        calls = []
+
+        async def hanging_loader():
+            calls.append("leader")
+            started.set()
+            await asyncio.sleep(10)
+
+        async def loader():
+            calls.append("waiter")
+            return "value"
+
+        leader = asyncio.create_task(cache.get_or_load(1, hanging_loader))
+        await started.wait()
+        waiters = [asyncio.create_task(cache.get_or_load(1, loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+        # e.g. the client of the first request disconnected
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await asyncio.gather(*waiters) == ["value"] * 3
+        assert calls == ["leader", "waiter"]
+        assert not cache._inflight
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_the_load():
+    async def scenario():
+        cache = make_cache()
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.create_task(cache.get_or_load(1, loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load(1, loader))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+
+        assert await leader == "value"
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(scenario())
+
+
+def test_loader_errors_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        cache = make_cache()
+
+        async def failing_loader():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("database down")
+
+        results = await asyncio.gather(*(cache.get_or_load(1, failing_loader) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        async def loader():
+            return "value"
+
+        assert await cache.get_or_load(1, loader) == "value"
+
+    asyncio.run(scenario())
@@ -0,0 +1,87 @@
+"""
+Bulk description regeneration against the mock generator
+"""
+
+from sqlalchemy import select
+
+import pytest
+
+from app.core.database import Property, new_session
+from app.jobs.description_regeneration import (
+    DescriptionRegenerationJob, RegenerationCheckpoint, RegenerationFilter, generate_with_mock
+)
+
+# Listings whose descriptions the other test modules do not search for
+IDS = [3, 4]
+
+
+def fetch(run, ids):
+    async def load():
+        async with new_session() as session:
+            result = await session.execute(
+                select(Property.id, Property.description, Property.version).where(Property.id.in_(ids))
+            )
+            return {row.id: (row.description, row.version) for row in result}
+    return run(load)
+
+
+def make_job(tmp_path, filters=None, generate=generate_with_mock, job_id="test"):
+    return DescriptionRegenerationJob(
+        job_id=job_id, filters=filters, generate=generate, batch_size=1, checkpoint_dir=str(tmp_path)
+    )
+
+
+def test_regeneration_writes_descriptions_and_bumps_versions(run, tmp_path):
+    before = fetch(run, IDS)
+    job = make_job(tmp_path, RegenerationFilter(ids=IDS))
+    checkpoint = run(job.run)
+
+    assert checkpoint.finished
+    assert (checkpoint.processed, checkpoint.updated, checkpoint.failed) == (2, 2, 0)
+    assert checkpoint.last_id == 4
+    after = fetch(run, IDS)
+    for property_id in IDS:
+        description, version = after[property_id]
+        assert description.startswith("Dieses ")
+        assert version == before[property_id][1] + 1
+    # The checkpoint on disk matches the returned one
+    assert RegenerationCheckpoint.model_validate_json((tmp_path / "regeneration_test.json").read_text()) == checkpoint
+
+
+def test_failed_properties_are_recorded_and_retried(run, tmp_path):
+    async def fail_for_studio(property_obj):
+        if property_obj.id == 4:
+            raise RuntimeError("LLM unavailable")
+        return await generate_with_mock(property_obj)
+
+    checkpoint = run(make_job(tmp_path, RegenerationFilter(ids=IDS), generate=fail_for_studio).run)
+    assert (checkpoint.updated, checkpoint.failed, checkpoint.failed_ids) == (1, 1, [4])
+    version = fetch(run, [4])[4][1]
+
+    # Resuming without filters keeps the job's own and only regenerates the failures
+    job = make_job(tmp_path)
+    assert job.checkpoint.filters.ids == IDS
+    checkpoint = run(job.retry_failed)
+    assert (checkpoint.updated, checkpoint.failed, checkpoint.failed_ids) == (2, 0, [])
+    assert fetch(run, [4])[4][1] == version + 1
+
+
+def test_resume_skips_processed_pages(run, tmp_path):
+    job = make_job(tmp_path, RegenerationFilter(ids=IDS))
+    job.checkpoint.last_id = 3
+    job._save_checkpoint()
+    before = fetch(run, IDS)
+
+    checkpoint = run(make_job(tmp_path, RegenerationFilter(ids=IDS)).run)
+    assert checkpoint.processed == 1
+    after = fetch(run, IDS)
+    assert after[3][1] == before[3][1]
+    assert after[4][1] == before[4][1] + 1
+
+
+def test_resume_with_other_filters_is_rejected(tmp_path):
+    make_job(tmp_path, RegenerationFilter(city="Hamburg"))._save_checkpoint()
+
+    with pytest.raises(ValueError, match="started with filters"):
+        make_job(tmp_path, RegenerationFilter(city="Berlin"))
+    assert make_job(tmp_path, RegenerationFilter(city="Hamburg")).checkpoint.filters.city == "Hamburg"
@@ -0,0 +1,117 @@
+"""
+Streaming export of a user's portfolio as NDJSON, CSV and ZIP
+"""
+
+import csv
+import io
+import json
+import os
+import zipfile
+
+import pytest
+from sqlalchemy import delete
+
+from app.core.database import PropertyImage, new_session
+from app.services.export_service import ExportService
+from tests.conftest import API, LISTINGS
+
+JPEG = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 300  # larger than one FILE_CHUNK_SIZE read
+TEXT = b"Grundriss\n" * 50
+
+
+@pytest.fixture
+def images(run, tmp_path):
+    """A JPEG and a text attachment on listing 1, plus a row whose file is gone"""
+    files = [("photo.jpg", "image/jpeg", JPEG), ("plan.txt", "text/plain", TEXT), ("missing.jpg", "image/jpeg", None)]
+
+    async def add():
+        async with new_session() as session:
+            for filename, mime_type, content in files:
+                file_path = os.path.join(tmp_path, filename)
+                if content is not None:
+                    with open(file_path, "wb") as f:
+                        f.write(content)
+                session.add(PropertyImage(
+                    property_id=1, filename=filename, original_filename=filename, file_path=file_path,
+                    file_size=len(content or b""), mime_type=mime_type
+                ))
+            await session.commit()
+
+    async def remove():
+        async with new_session() as session:
+            await session.execute(delete(PropertyImage))
+            await session.commit()
+
+    run(add)
+    yield
+    run(remove)
+
+
+def collect(run, stream):
+    async def read():
+        return b"".join([chunk async for chunk in stream])
+
+    return run(read)
+
+
+def test_ndjson_export(client, as_user):
+    as_user(1)
+    response = client.get(f"{API}/properties/export", params={"status": "for_rent"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"].endswith('.ndjson"')
+
+    listings = [json.loads(line) for line in response.text.splitlines()]
+    assert [(listing["id"], listing["title"], listing["features"]) for listing in listings] == [(4, "Studio nahe Universität", [])]
+    assert listings[0]["created_at"] == "2024-01-01T12:00:00"
+
+
+def test_csv_export(client, as_user):
+    as_user(1)
+    response = client.get(f"{API}/properties/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["title"] for row in rows] == [listing["title"] for listing in LISTINGS]
+    assert json.loads(rows[1]["features"]) == ["garten", "garage"]
+    assert rows[0]["description"] == "Ruhige Lage, großer Balkon zum Hof"
+
+
+def test_export_only_includes_own_properties(client, as_user):
+    as_user(2)
+    assert client.get(f"{API}/properties/export").text == ""
+    rows = list(csv.reader(io.StringIO(client.get(f"{API}/properties/export", params={"format": "csv"}).text)))
+    assert len(rows) == 1 and "title" in rows[0]
+    assert client.get(f"{API}/properties/export", params={"format": "xml"}).status_code == 422
+
+
+def test_zip_export_round_trips(client, as_user, images):
+    as_user(1)
+    response = client.get(f"{API}/properties/export", params={"format": "zip"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        entries = {info.filename: info for info in archive.infolist()}
+        assert sorted(entries) == ["images/1/photo.jpg", "images/1/plan.txt", "properties.ndjson"]
+
+        # Streamed entries carry data descriptors; images are stored as they are
+        assert all(info.flag_bits & 0x08 for info in entries.values())
+        assert entries["images/1/photo.jpg"].compress_type == zipfile.ZIP_STORED
+        assert entries["images/1/plan.txt"].compress_type == zipfile.ZIP_DEFLATED
+        assert archive.read("images/1/photo.jpg") == JPEG
+        assert archive.read("images/1/plan.txt") == TEXT
+
+        listings = [json.loads(line) for line in archive.read("properties.ndjson").decode().splitlines()]
+        assert [listing["id"] for listing in listings] == [1, 2, 3, 4, 5]
+
+
+def test_export_reads_keyset_chunks(run, images):
+    # Chunks smaller than the result must neither skip nor repeat rows
+    ndjson = collect(run, ExportService(owner_id=1, chunk_size=2).stream("ndjson"))
+    assert [json.loads(line)["title"] for line in ndjson.decode().splitlines()] == [listing["title"] for listing in LISTINGS]
+
+    archive = zipfile.ZipFile(io.BytesIO(collect(run, ExportService(owner_id=1, chunk_size=1).stream("zip"))))
+    assert sorted(archive.namelist()) == ["images/1/photo.jpg", "images/1/plan.txt", "properties.ndjson"]
@@ -0,0 +1,152 @@
+"""
+Bulk import API and job: shared progress, format detection and per-row errors
+"""
+
+import json
+import os
+import uuid
+
+import pytest
+from sqlalchemy import event, select, text
+
+from app.core.database import Property, get_engine, new_session
+from app.jobs.property_import import ImportJobStore, ImportProgress, PropertyImportJob, detect_format
+from app.routes.endpoints import properties as property_routes
+from tests.conftest import API
+
+CSV = (
+    "title;property_type;address;city;plz;price\n"
+    "Reihenhaus am See;house;Seeweg 2;Potsdam;14467;480000\n"
+    "Loft im Hafen;apartment;Kai 7;Hamburg;20457;690000\n"
+)
+
+
+def start_import(client, content, filename, **data):
+    response = client.post(f"{API}/properties/import", files={"file": (filename, content)}, data=data)
+    assert response.status_code == 202, response.text
+    return response.json()["job_id"]
+
+
+def test_progress_is_served_by_any_worker(client, as_user, scratch_properties, monkeypatch):
+    as_user(1)
+    job_id = start_import(client, CSV, "listings.csv")
+
+    # Another worker: no in-process job object and its own store instance
+    assert job_id not in property_routes.import_jobs
+    monkeypatch.setattr(property_routes, "import_store", ImportJobStore())
+    response = client.get(f"{API}/properties/import/{job_id}")
+    assert response.status_code == 200
+    progress = response.json()
+    assert (progress["status"], progress["processed"], progress["imported"], progress["failed"]) == ("completed", 2, 2, 0)
+
+
+def test_progress_is_private_and_expires(client, as_user, scratch_properties, monkeypatch):
+    as_user(1)
+    job_id = start_import(client, CSV, "listings.csv")
+
+    as_user(2)
+    assert client.get(f"{API}/properties/import/{job_id}").status_code == 404
+
+    as_user(1)
+    monkeypatch.setattr(property_routes, "import_store", ImportJobStore(ttl=-1))
+    assert client.get(f"{API}/properties/import/{job_id}").status_code == 404
+    assert client.get(f"{API}/properties/import/not-a-job").status_code == 404
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("listings.csv", "csv"),
+    ("LISTINGS.CSV", "csv"),
+    ("feed.ndjson", "ndjson"),
+    ("feed.jsonl", "ndjson"),
+    ("openimmo.xml", "openimmo"),
+])
+def test_detect_format(filename, expected):
+    assert detect_format(filename) == expected
+
+
+def test_detect_format_rejects_unknown_extensions():
+    with pytest.raises(ValueError):
+        detect_format("listings.xlsx")
+
+
+def listing(title, **fields):
+    return {"title": title, "property_type": "apartment", "address": "Markt 1", "city": "Leipzig", "plz": "04109", "price": 200000, **fields}
+
+
+def run_import(run, tmp_path, lines, batch_size):
+    path = os.path.join(tmp_path, "listings.ndjson")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    progress = ImportProgress(job_id=str(uuid.uuid4()), format="ndjson")
+    return run(PropertyImportJob(path, progress, batch_size=batch_size).run)
+
+
+def imported_titles(run):
+    async def load():
+        async with new_session() as session:
+            result = await session.execute(select(Property.title).where(Property.id > 5).order_by(Property.id))
+            return result.scalars().all()
+
+    return run(load)
+
+
+def test_invalid_records_are_reported_by_row(run, tmp_path, scratch_properties):
+    progress = run_import(run, tmp_path, [
+        json.dumps(listing("Eins")),
+        "{not json",
+        json.dumps(listing("Drei", property_type="castle")),
+        json.dumps([1, 2]),
+        json.dumps(listing("Fünf")),
+    ], batch_size=2)
+
+    assert (progress.status, progress.processed, progress.imported, progress.failed) == ("completed", 5, 2, 3)
+    assert [error.row for error in progress.errors] == [2, 3, 4]
+    assert progress.errors[1].errors[0].startswith("property_type:")
+    assert imported_titles(run) == ["Eins", "Fünf"]
+
+
+@pytest.fixture
+def reject_city(run):
+    """Make the database refuse inserts of listings in one city"""
+    async def execute(statement):
+        async with new_session() as session:
+            await session.execute(text(statement))
+            await session.commit()
+
+    run(execute, """
+        CREATE TRIGGER reject_city BEFORE INSERT ON properties WHEN NEW.city = 'Nirgendwo'
+        BEGIN SELECT RAISE(ABORT, 'city rejected'); END
+    """)
+    yield "Nirgendwo"
+    run(execute, "DROP TRIGGER reject_city")
+
+
+def test_failed_insert_only_loses_offending_rows(run, tmp_path, scratch_properties, reject_city):
+    titles = ["Eins", "Zwei", "Drei", "Vier", "Fünf", "Sechs"]
+    progress = run_import(run, tmp_path, [
+        json.dumps(listing(title, city=reject_city if title in ("Zwei", "Fünf") else "Leipzig")) for title in titles
+    ], batch_size=6)
+
+    assert (progress.status, progress.imported, progress.failed) == ("completed", 4, 2)
+    assert [error.row for error in progress.errors] == [2, 5]
+    assert "city rejected" in progress.errors[0].errors[0]
+    assert imported_titles(run) == ["Eins", "Drei", "Vier", "Sechs"]
+
+
+def test_batches_are_inserted_with_executemany(run, tmp_path, scratch_properties):
+    inserts = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO properties"):
+            inserts.append((executemany, len(parameters) if executemany else 1))
+
+    engine = get_engine().sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        progress = run_import(run, tmp_path, [json.dumps(listing(f"Objekt {i}")) for i in range(5)], batch_size=2)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert progress.imported == 5
+    # One statement per batch; a single leftover row needs no executemany
+    assert inserts == [(True, 2), (True, 2), (False, 1)]
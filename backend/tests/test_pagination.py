@@ -0,0 +1,70 @@
+"""
+Keyset cursors for the property list and search pages
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.services.pagination import decode_cursor, encode_cursor
+from tests.conftest import API
+
+# created_at descending, ties broken by id descending (see LISTINGS)
+NEWEST_FIRST = [1, 2, 5, 4, 3]
+
+
+def collect_pages(client, path, limit, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = {"limit": limit, **params}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get(path, params=query)
+        assert response.status_code == 200
+        body = response.json()
+        ids.extend(item["id"] for item in body["items"])
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 1, 1, 12, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "zzz", encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5])
+def test_property_list_pages_cover_every_row_once(client, limit):
+    ids, pages = collect_pages(client, f"{API}/properties/", limit)
+    assert ids == NEWEST_FIRST
+    assert pages == -(-len(NEWEST_FIRST) // limit)
+
+
+def test_search_pages_follow_the_same_order(client):
+    ids, _ = collect_pages(client, f"{API}/search/properties", 1, city="Berlin")
+    assert ids == [1, 5, 3]
+
+
+def test_property_list_rejects_bad_cursor(client):
+    response = client.get(f"{API}/properties/", params={"cursor": "zzz"})
+    assert response.status_code == 400
+
+
+def test_skip_still_returns_the_legacy_list(client):
+    response = client.get(f"{API}/properties/", params={"skip": 1, "limit": 3})
+    assert response.status_code == 200
+    assert response.headers["deprecation"] == "true"
+    body = response.json()
+    assert [item["id"] for item in body] == [2, 3, 4]
+    assert body[0]["description"] == "Garten und Garage am Stadtrand"
+
+    assert "deprecation" not in client.get(f"{API}/properties/").headers
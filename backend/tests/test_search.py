@@ -0,0 +1,68 @@
+"""
+Full-text and faceted property search on SQLite (FTS5 index, facet counts)
+"""
+
+from app.services.search_service import build_fts5_query
+from tests.conftest import API
+
+
+def fulltext(client, q, **params):
+    response = client.get(f"{API}/search/fulltext", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_fts5_query_quotes_words_as_prefixes():
+    assert build_fts5_query('balkon "berlin" OR-') == '"balkon"* "berlin"* "OR"*'
+    assert build_fts5_query("!!!") == ""
+
+
+def test_fulltext_requires_every_word(client):
+    hits = fulltext(client, "balkon berlin")
+    assert {hit["id"] for hit in hits} == {1, 5}
+
+
+def test_fulltext_matches_prefixes_and_ignores_diacritics(client):
+    assert {hit["id"] for hit in fulltext(client, "garag")} == {2}
+    assert {hit["id"] for hit in fulltext(client, "munchen")} == {2}
+
+
+def test_fulltext_ranks_and_highlights(client):
+    hits = fulltext(client, "balkon", limit=1)
+    assert len(hits) == 1
+    assert "<mark>" in hits[0]["snippet"]
+    assert hits[0]["rank"] > 0
+
+
+def test_fulltext_without_words_returns_nothing(client):
+    assert fulltext(client, "!!!") == []
+
+
+def test_faceted_search_filters_and_counts(client):
+    response = client.get(f"{API}/search/properties", params={"city": "Berlin"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert {item["id"] for item in body["items"]} == {1, 3, 5}
+
+    facets = {name: {bucket["value"]: bucket["count"] for bucket in buckets} for name, buckets in body["facets"].items()}
+    # A dimension is counted without its own filter, the others still apply
+    assert facets["city"] == {"Berlin": 3, "München": 1, "Hamburg": 1}
+    assert facets["property_type"] == {"apartment": 2, "penthouse": 1}
+    assert facets["price"] == {"300000-500000": 2, "1000000+": 1}
+
+
+def test_faceted_search_combines_ranges_and_features(client):
+    response = client.get(
+        f"{API}/search/properties",
+        params={"property_type": ["apartment", "house"], "price_max": 900000, "features": ["Balkon"]}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 2
+    assert {item["id"] for item in body["items"]} == {1, 5}
+
+
+def test_faceted_search_rejects_bad_cursor(client):
+    response = client.get(f"{API}/search/properties", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
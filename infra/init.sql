@@ -9,6 +9,7 @@
 
 -- Create extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Create users table
 CREATE TABLE IF NOT EXISTS users (
@@ -36,6 +37,9 @@ CREATE TABLE IF NOT EXISTS properties (
     city VARCHAR(100) NOT NULL,
     plz VARCHAR(20),
     country VARCHAR(100) DEFAULT 'Germany',
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    geohash VARCHAR(12),
     
     -- Property details
     price DECIMAL(12,2),
@@ -48,7 +52,7 @@ CREATE TABLE IF NOT EXISTS properties (
     year_built INTEGER CHECK (year_built >= 1800 AND year_built <= 2030),
     
     -- Features
-    features TEXT, -- JSON string
+    features JSONB, -- list of lower-case feature names, e.g. ["balkon", "aufzug"]
     energy_class VARCHAR(10) CHECK (energy_class ~ '^[A-G]$'),
     
     -- Owner info
@@ -58,7 +62,15 @@ CREATE TABLE IF NOT EXISTS properties (
     
     -- Timestamps
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    version INTEGER NOT NULL DEFAULT 1,
+    
+    -- Full-text search document (German stemming, weighted by field)
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('german', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('german', coalesce(city, '') || ' ' || coalesce(address, '')), 'B') ||
+        setweight(to_tsvector('german', coalesce(description, '')), 'C')
+    ) STORED
 );
 
 -- Create property_images table
@@ -88,11 +100,37 @@ CREATE TABLE IF NOT EXISTS exposes (
     is_published BOOLEAN DEFAULT FALSE
 );
 
+-- Create refresh_tokens table (single-use refresh tokens by JWT id)
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    jti VARCHAR(32) PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    revoked_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id ON refresh_tokens(user_id);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_properties_owner_id ON properties(owner_id);
 CREATE INDEX IF NOT EXISTS idx_properties_city ON properties(city);
 CREATE INDEX IF NOT EXISTS idx_properties_property_type ON properties(property_type);
 CREATE INDEX IF NOT EXISTS idx_properties_status ON properties(status);
+CREATE INDEX IF NOT EXISTS idx_properties_created_at_id ON properties(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_properties_search_vector ON properties USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_properties_address_trgm ON properties USING GIN (address gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_properties_city_trgm ON properties USING GIN (city gin_trgm_ops);
+-- Faceted search: composite indexes for the common filter combinations and
+-- partial indexes restricted to listings that are still on the market
+CREATE INDEX IF NOT EXISTS idx_properties_city_type_price ON properties(city, property_type, price);
+CREATE INDEX IF NOT EXISTS idx_properties_plz_type_price ON properties(plz, property_type, price);
+CREATE INDEX IF NOT EXISTS idx_properties_type_area_rooms ON properties(property_type, area_sqm, rooms);
+CREATE INDEX IF NOT EXISTS idx_properties_year_built_energy ON properties(year_built, energy_class);
+CREATE INDEX IF NOT EXISTS idx_properties_active_type_price ON properties(property_type, price)
+    WHERE status IN ('for_sale', 'for_rent');
+CREATE INDEX IF NOT EXISTS idx_properties_active_created_at_id ON properties(created_at DESC, id DESC)
+    WHERE status IN ('for_sale', 'for_rent');
+CREATE INDEX IF NOT EXISTS idx_properties_geohash ON properties(geohash text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_properties_features ON properties USING GIN (features jsonb_path_ops);
 CREATE INDEX IF NOT EXISTS idx_property_images_property_id ON property_images(property_id);
 CREATE INDEX IF NOT EXISTS idx_exposes_property_id ON exposes(property_id);
 
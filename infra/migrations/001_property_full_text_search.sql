@@ -0,0 +1,13 @@
+-- Full-text search for properties (for databases created before init.sql had it)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('german', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('german', coalesce(city, '') || ' ' || coalesce(address, '')), 'B') ||
+    setweight(to_tsvector('german', coalesce(description, '')), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_properties_search_vector ON properties USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_properties_address_trgm ON properties USING GIN (address gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_properties_city_trgm ON properties USING GIN (city gin_trgm_ops);
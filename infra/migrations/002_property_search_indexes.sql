@@ -0,0 +1,10 @@
+-- Indexes backing the faceted property search (GET /search/properties)
+
+CREATE INDEX IF NOT EXISTS idx_properties_city_type_price ON properties(city, property_type, price);
+CREATE INDEX IF NOT EXISTS idx_properties_plz_type_price ON properties(plz, property_type, price);
+CREATE INDEX IF NOT EXISTS idx_properties_type_area_rooms ON properties(property_type, area_sqm, rooms);
+CREATE INDEX IF NOT EXISTS idx_properties_year_built_energy ON properties(year_built, energy_class);
+CREATE INDEX IF NOT EXISTS idx_properties_active_type_price ON properties(property_type, price)
+    WHERE status IN ('for_sale', 'for_rent');
+CREATE INDEX IF NOT EXISTS idx_properties_active_created_at_id ON properties(created_at DESC, id DESC)
+    WHERE status IN ('for_sale', 'for_rent');
@@ -0,0 +1,13 @@
+-- Coordinates and geohash index for radius/bbox search
+
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS geohash VARCHAR(12);
+
+-- Geohash prefix search (LIKE 'u33d%') needs a pattern-ops btree
+CREATE INDEX IF NOT EXISTS idx_properties_geohash ON properties(geohash text_pattern_ops);
+
+-- Optional: with PostGIS available, a GiST index serves the same queries
+-- CREATE EXTENSION IF NOT EXISTS postgis;
+-- CREATE INDEX IF NOT EXISTS idx_properties_geog ON properties
+--     USING GIST ((ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography));
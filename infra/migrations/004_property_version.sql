@@ -0,0 +1,4 @@
+-- Version counter per property, bumped by the application on every update
+-- and exposed as the ETag of GET /properties/{id}
+
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,35 @@
+-- Convert properties.features from a JSON string (TEXT) to JSONB and index it
+-- for containment filters (GET /search/properties?features=balkon&features=aufzug)
+--
+-- Stored shape: a list of lower-case feature names. Legacy values are
+-- normalized: JSON arrays are lower-cased, objects keep their truthy keys,
+-- and free text is split on commas.
+
+CREATE OR REPLACE FUNCTION pg_temp.features_to_jsonb(value TEXT) RETURNS JSONB AS $$
+DECLARE
+    doc JSONB;
+BEGIN
+    IF value IS NULL OR btrim(value) = '' THEN
+        RETURN NULL;
+    END IF;
+    BEGIN
+        doc := value::jsonb;
+    EXCEPTION WHEN others THEN
+        doc := to_jsonb(regexp_split_to_array(btrim(value), '\s*,\s*'));
+    END;
+    IF jsonb_typeof(doc) = 'object' THEN
+        SELECT coalesce(jsonb_agg(lower(key)), '[]'::jsonb) INTO doc
+        FROM jsonb_each(doc) WHERE value NOT IN ('false'::jsonb, 'null'::jsonb, '0'::jsonb, '""'::jsonb);
+    ELSIF jsonb_typeof(doc) = 'array' THEN
+        SELECT coalesce(jsonb_agg(DISTINCT lower(btrim(element))), '[]'::jsonb) INTO doc
+        FROM jsonb_array_elements_text(doc) AS element WHERE btrim(element) <> '';
+    ELSE
+        doc := to_jsonb(regexp_split_to_array(lower(btrim(doc #>> '{}')), '\s*,\s*'));
+    END IF;
+    RETURN doc;
+END
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE properties ALTER COLUMN features TYPE JSONB USING pg_temp.features_to_jsonb(features);
+
+CREATE INDEX IF NOT EXISTS idx_properties_features ON properties USING GIN (features jsonb_path_ops);